@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+Plant Alerts (email)
+Health-state transitions from the rule engine become email alerts
+without the sensor loop ever waiting on SMTP:
+- submit() is a non-blocking queue put (a full queue drops and counts)
+- a worker thread coalesces: alerts arriving within `batch_delay` of
+  each other go out as one digest, and a plant that changes several
+  times before then is reported once, in its latest state
+- dedupe: a plant back in the state it was last reported in is news to
+  no one; a plant flapping back into a state reported less than
+  `window` s ago is held until the window passes (then sent if it stuck)
+- rate limit: at most `max_per_hour` emails, the rest wait and merge
+- one SMTP connection is kept open and reused across digests, and
+  closed after `idle_close` s without mail
+
+Usage:
+  python3 alerts.py smtp-server --port 8025            # local stand-in, prints mail
+  python3 plant_monitor.py --alert-email me@example.com --smtp localhost:8025
+  python3 alerts.py demo                                # flapping plants vs stand-in server
+"""
+
+import argparse
+import asyncio
+import collections
+import email
+import email.message
+import email.policy
+import logging
+import queue
+import smtplib
+import socket
+import sys
+import threading
+import time
+
+import health_rules
+import monitor_log
+
+Alert = collections.namedtuple("Alert", "plant old new issues ts")
+
+_STOP = object()
+
+log = monitor_log.get("alerts")
+
+class SmtpSender:
+    """smtplib with one connection reused across sends (reconnects once if the
+    connection was lost; SMTP errors such as a failed login or refused
+    recipients are raised as they are)"""
+
+    def __init__(self, host="localhost", port=25, sender=None, recipients=(),
+                 user=None, password=None, starttls=False, timeout=10.0, idle_close=120.0):
+        self.host, self.port = host, port
+        self.sender = sender or f"plant-monitor@{socket.gethostname()}"
+        self.recipients = list(recipients)
+        self.user, self.password = user, password
+        self.starttls = starttls
+        self.timeout = timeout
+        self.idle_close = idle_close
+        self.smtp = None
+        self.last_used = 0.0
+        self.connections = 0
+
+    def _connect(self):
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            smtp.starttls()
+        if self.user:
+            smtp.login(self.user, self.password or "")
+        self.connections += 1
+        return smtp
+
+    def send(self, subject, body):
+        msg = email.message.EmailMessage()
+        msg["From"] = self.sender
+        msg["To"] = ", ".join(self.recipients)
+        msg["Subject"] = subject
+        msg.set_content(body)
+        for attempt in (0, 1):
+            try:
+                if self.smtp is None:
+                    self.smtp = self._connect()
+                self.smtp.send_message(msg)
+                self.last_used = time.monotonic()
+                return
+            except OSError as e:
+                # SMTPException is an OSError too, but only a lost connection
+                # is worth a reconnect
+                if isinstance(e, smtplib.SMTPException) and \
+                        not isinstance(e, smtplib.SMTPServerDisconnected):
+                    raise
+                # The server (or a NAT) dropped the idle connection: retry once fresh
+                self.close()
+                if attempt:
+                    raise
+
+    def idle(self, now):
+        if self.smtp is not None and now - self.last_used > self.idle_close:
+            self.close()
+
+    def close(self):
+        if self.smtp is not None:
+            try:
+                self.smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.smtp = None
+
+class AlertQueue:
+    """Non-blocking front, coalescing/deduping/rate-limited worker behind"""
+
+    def __init__(self, sender, batch_delay=30.0, window=900.0, max_per_hour=6,
+                 maxsize=1000, clock=time.monotonic, threaded=True):
+        self.sender = sender
+        self.batch_delay = batch_delay
+        self.window = window
+        self.max_per_hour = max_per_hour
+        self.clock = clock
+        self.inbox = queue.Queue(maxsize=maxsize)
+        self.pending = {}      # plant -> [Alert (latest), changes coalesced, first old]
+        self.reported = {}     # plant -> state last emailed
+        self.reported_at = {}  # (plant, state) -> when it was emailed
+        self.flush_at = None
+        self.tokens = float(max_per_hour)
+        self.refilled = clock()
+        self.backoff = 5.0
+        self.stats = collections.Counter()
+        # threaded=False: the owner drives step() itself (replay.py, on virtual time)
+        self.thread = None
+        if threaded:
+            self.thread = threading.Thread(target=self._run, name="alerts", daemon=True)
+            self.thread.start()
+
+    # === Sensor-loop side ===
+    def submit(self, transition):
+        """Queue a health_rules.Transition; never blocks"""
+        alert = make_alert(transition, time.time())
+        if alert is None:
+            return
+        try:
+            self.inbox.put_nowait(alert)
+            self.stats["submitted"] += 1
+        except queue.Full:
+            self.stats["dropped"] += 1
+
+    def close(self, timeout=5.0):
+        """Send what is pending (best effort) and stop the worker"""
+        if self.thread is None:
+            self._deliver(self.clock(), final=True)
+            self.sender.close()
+            return
+        try:
+            self.inbox.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self.thread.join(timeout)
+
+    # === Worker ===
+    def _run(self):
+        while True:
+            now = self.clock()
+            wait = None if self.flush_at is None else max(0.0, self.flush_at - now)
+            try:
+                item = self.inbox.get(timeout=wait if wait is not None else self.sender.idle_close)
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                self._deliver(self.clock(), final=True)
+                self.sender.close()
+                return
+            self.step(item, self.clock())
+
+    def step(self, alert, now):
+        """Take one Alert (or None) at `now` and send whatever has come due"""
+        if alert is not None:
+            self._add(alert, now)
+        if self.flush_at is not None and now >= self.flush_at:
+            self._deliver(now)
+        self.sender.idle(now)
+
+    def _add(self, alert, now):
+        if alert.old is not None:
+            # The state it left is the baseline: a flap back to it is no news
+            self.reported.setdefault(alert.plant, (alert.old, ()))
+        entry = self.pending.get(alert.plant)
+        if entry is None:
+            self.pending[alert.plant] = [alert, 1, alert.old]
+        else:
+            entry[0] = alert  # keep the latest state, the oldest "from"
+            entry[1] += 1
+            self.stats["coalesced"] += 1
+        if self.flush_at is None:
+            self.flush_at = now + self.batch_delay
+
+    def _state(self, alert):
+        return (alert.new, alert.issues)
+
+    def _deliver(self, now, final=False):
+        self.flush_at = None
+        ready, hold_until = [], None
+        for plant, (alert, changes, first_old) in list(self.pending.items()):
+            state = self._state(alert)
+            if self.reported.get(plant) == state:
+                # Flapped back to what was last reported
+                self.stats["deduped"] += changes
+                del self.pending[plant]
+                continue
+            sent_at = self.reported_at.get((plant, state))
+            if sent_at is not None and now - sent_at < self.window and not final:
+                hold_until = min(hold_until or float("inf"), sent_at + self.window)
+                continue
+            ready.append((plant, alert, changes, first_old))
+        if ready:
+            self.tokens = min(self.max_per_hour,
+                              self.tokens + (now - self.refilled) * self.max_per_hour / 3600)
+            self.refilled = now
+            if self.tokens < 1 and not final:
+                self.stats["rate_limited"] += 1
+                hold_until = now + (1 - self.tokens) * 3600 / self.max_per_hour
+            else:
+                subject, body = compose(ready)
+                try:
+                    self.sender.send(subject, body)
+                except (smtplib.SMTPException, OSError) as e:
+                    self.stats["send_errors"] += 1
+                    monitor_log.event(log, logging.WARNING, "alert_error", error=str(e),
+                                      retry_s=self.backoff)
+                    hold_until = now + self.backoff
+                    self.backoff = min(self.backoff * 2, 600.0)
+                else:
+                    self.tokens -= 1
+                    self.backoff = 5.0
+                    self.stats["emails"] += 1
+                    for plant, alert, _, _ in ready:
+                        state = self._state(alert)
+                        self.reported[plant] = state
+                        self.reported_at[(plant, state)] = now
+                        del self.pending[plant]
+        if self.pending and hold_until is not None:
+            self.flush_at = hold_until
+
+def make_alert(transition, ts):
+    """Transition -> Alert stamped with wall time `ts` (None for a healthy start-up)"""
+    if transition.old is None and transition.new == "happy":
+        return None
+    return Alert(transition.plant, transition.old, transition.new, tuple(transition.issues), ts)
+
+def compose(ready):
+    """[(plant, alert, changes, first_old)] -> (subject, body)"""
+    lines = []
+    for plant, alert, changes, first_old in sorted(ready):
+        when = time.strftime("%H:%M:%S", time.localtime(alert.ts))
+        issues = ", ".join(alert.issues) or "no issues"
+        extra = f" ({changes} changes)" if changes > 1 else ""
+        lines.append(f"{health_rules.EMOJI[alert.new]} plant {plant}: {first_old or 'start'} -> "
+                     f"{alert.new.upper()} at {when}: {issues}{extra}")
+    if len(ready) == 1:
+        plant, alert = ready[0][:2]
+        subject = f"Plant {plant} is {alert.new.upper()}" + (f": {alert.issues[0]}" if alert.issues else "")
+    else:
+        subject = f"{len(ready)} plants changed health state"
+    return subject, "\n".join(lines) + "\n"
+
+# === Local stand-in SMTP server ===
+class StandInSMTP:
+    """Just enough SMTP (HELO/EHLO, MAIL, RCPT, DATA, RSET, NOOP, QUIT) to
+    receive what SmtpSender sends; messages are kept in self.messages"""
+
+    def __init__(self, echo=False):
+        self.messages = []
+        self.connections = 0
+        self.echo = echo
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+
+        def reply(text):
+            writer.write(f"{text}\r\n".encode())
+
+        reply("220 homeai stand-in ESMTP")
+        rcpts = []
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            verb = line[:4].decode(errors="replace").upper()
+            if verb in ("HELO", "EHLO"):
+                reply("250 homeai")
+            elif verb == "MAIL":
+                rcpts = []
+                reply("250 OK")
+            elif verb == "RCPT":
+                rcpts.append(line[8:].decode().strip())
+                reply("250 OK")
+            elif verb == "DATA":
+                reply("354 End data with <CR><LF>.<CR><LF>")
+                await writer.drain()
+                data = []
+                while True:
+                    chunk = await reader.readline()
+                    if chunk in (b".\r\n", b""):
+                        break
+                    data.append(chunk[1:] if chunk.startswith(b"..") else chunk)
+                message = email.message_from_bytes(b"".join(data), policy=email.policy.default)
+                self.messages.append((rcpts, message))
+                if self.echo:
+                    print(f"📧 to {', '.join(rcpts)}: {message['Subject']}\n{message.get_content()}")
+                reply("250 OK queued")
+            elif verb in ("RSET", "NOOP"):
+                reply("250 OK")
+            elif verb == "QUIT":
+                reply("221 Bye")
+                await writer.drain()
+                break
+            else:
+                reply("502 Command not implemented")
+            await writer.drain()
+        writer.close()
+
+    def serve_in_thread(self, host="127.0.0.1", port=0):
+        """Run on a private event loop thread -> bound port"""
+        started = threading.Event()
+
+        def run():
+            loop = asyncio.new_event_loop()
+            self.loop = loop
+            self.server = loop.run_until_complete(asyncio.start_server(self.handle, host, port))
+            self.port = self.server.sockets[0].getsockname()[1]
+            started.set()
+            loop.run_forever()
+        threading.Thread(target=run, name="smtp-stand-in", daemon=True).start()
+        started.wait()
+        return self.port
+
+def demo():
+    server = StandInSMTP()
+    port = server.serve_in_thread()
+    sender = SmtpSender("127.0.0.1", port, recipients=["grower@example.com"])
+    alerts = AlertQueue(sender, batch_delay=0.5, window=2.0, max_per_hour=3600)
+    T = health_rules.Transition
+    worst = 0.0
+    script = [
+        # plant 0 flaps around the soil threshold: one email, latest state
+        (0.0, T(0, "happy", "neutral", ["soil getting dry"], 0)),
+        (0.1, T(0, "neutral", "happy", [], 0)),
+        (0.2, T(0, "happy", "neutral", ["soil getting dry"], 0)),
+        (0.2, T(1, "happy", "sad", ["too cold", "air too dry"], 0)),
+        # plant 1 recovers and relapses inside the window: held, then sent once
+        (1.0, T(1, "sad", "happy", [], 0)),
+        (1.6, T(1, "happy", "sad", ["too cold", "air too dry"], 0)),
+        # plant 2 goes sad and straight back: deduped, no email at all
+        (1.7, T(2, "happy", "sad", ["too hot"], 0)),
+        (1.8, T(2, "sad", "happy", [], 0)),
+    ]
+    start = time.monotonic()
+    for at, transition in script:
+        time.sleep(max(0.0, start + at - time.monotonic()))
+        t0 = time.perf_counter()
+        alerts.submit(transition)
+        worst = max(worst, time.perf_counter() - t0)
+    time.sleep(4.0)
+    alerts.close()
+    for i, (rcpts, message) in enumerate(server.messages):
+        body = message.get_content().strip().replace("\n", "\n   ")
+        print(f"📧 #{i + 1} {message['Subject']}\n   {body}")
+    print(f"⚡ {dict(alerts.stats)} | SMTP connections: {server.connections} | "
+          f"slowest submit(): {worst * 1e6:.0f}µs")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Plant alert emails")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("smtp-server", help="local stand-in SMTP server that prints mail")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8025)
+    sub.add_parser("demo", help="flapping plants through the queue to a stand-in server")
+    args = parser.parse_args(argv)
+
+    if args.command == "demo":
+        demo()
+        return 0
+
+    async def serve():
+        server = StandInSMTP(echo=True)
+        srv = await asyncio.start_server(server.handle, args.host, args.port)
+        print(f"📮 Stand-in SMTP on {args.host}:{args.port}")
+        async with srv:
+            await srv.serve_forever()
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Streaming Sensor Fault & Anomaly Detection
+O(1) fixed-size state per channel, vectorized across channels:
+- EWMA mean/variance -> z-score outliers (a sustained run relearns the baseline)
+- rate-of-change limit (units per second)
+- flatline counter (stuck sensor repeating the same value; values the
+  driver clamps to, clamp_lo/clamp_hi, repeat legitimately and don't count)
+- saturation counter (disconnected probe pinned at a rail, e.g. 0/1023)
+- hard valid range
+
+Flagged samples should be masked (NaN) before they reach health
+evaluation or storage - see SensorFaultDetector.clean().
+
+Usage:
+  python3 anomaly.py --bench 10000   # throughput with 10k channels
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+# Flag bits
+FAULT_RANGE = 0x01
+FAULT_SATURATED = 0x02
+FAULT_FLATLINE = 0x04
+FAULT_RATE = 0x08
+OUTLIER = 0x10
+FAULT_MASK = FAULT_RANGE | FAULT_SATURATED | FAULT_FLATLINE | FAULT_RATE
+
+FLAG_NAMES = {
+    FAULT_RANGE: "out of range",
+    FAULT_SATURATED: "saturated",
+    FAULT_FLATLINE: "flatline",
+    FAULT_RATE: "rate limit",
+    OUTLIER: "outlier",
+}
+
+# Channel specs for plant_monitor.py: [temp, humidity, light, soil_raw]
+# flatline is a sample count, 0 disables the check. Rails (sat_lo/sat_hi)
+# only for raw ADC channels: 100 %RH is a real reading (misting, condensation),
+# and compensate_humidity clamps to exactly 0/100, so those may repeat
+PLANT_MONITOR_CHANNELS = [
+    dict(name="temp", lo=-40, hi=85, max_rate=0.5, flatline=100),
+    dict(name="humidity", lo=0, hi=100, clamp_lo=0, clamp_hi=100, max_rate=5, flatline=100),
+    # Darkness is legitimately flat at 0 lux all night
+    dict(name="light", lo=0, hi=54613, sat_hi=65535 / 1.2, flatline=0),
+    dict(name="soil_raw", lo=0, hi=1023, sat_lo=0, sat_hi=1023, max_rate=50, flatline=0),
+]
+
+def _spec_array(specs, key, default):
+    return np.array([float(s.get(key, default)) for s in specs])
+
+class SensorFaultDetector:
+    """Per-channel streaming detector; update() takes one sample per channel"""
+
+    def __init__(self, specs, alpha=0.05, z_threshold=6.0, warmup=20,
+                 saturation_samples=3, min_sigma=1e-3, relearn=10):
+        self.names = [s.get("name", f"ch{i}") for i, s in enumerate(specs)]
+        n = len(specs)
+        self.lo = _spec_array(specs, "lo", -np.inf)
+        self.hi = _spec_array(specs, "hi", np.inf)
+        self.sat_lo = _spec_array(specs, "sat_lo", np.nan)
+        self.sat_hi = _spec_array(specs, "sat_hi", np.nan)
+        self.clamp_lo = _spec_array(specs, "clamp_lo", np.nan)
+        self.clamp_hi = _spec_array(specs, "clamp_hi", np.nan)
+        self.max_rate = _spec_array(specs, "max_rate", np.inf)
+        self.flatline_limit = _spec_array(specs, "flatline", 0).astype(np.int64)
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.warmup = warmup
+        self.saturation_limit = saturation_samples
+        self.min_sigma = min_sigma
+        self.relearn = relearn
+
+        # Fixed-size state
+        self.mean = np.zeros(n)
+        self.var = np.zeros(n)
+        self.count = np.zeros(n, dtype=np.int64)
+        self.last = np.full(n, np.nan)
+        self.last_ts = np.full(n, np.nan)
+        self.flat_count = np.zeros(n, dtype=np.int64)
+        self.sat_count = np.zeros(n, dtype=np.int64)
+        self.outlier_run = np.zeros(n, dtype=np.int64)
+        self.flags = np.zeros(n, dtype=np.uint8)
+        self.totals = {bit: 0 for bit in FLAG_NAMES}
+
+    def update(self, values, now=None):
+        """One sample per channel -> uint8 flag array (0 = healthy)"""
+        now = time.monotonic() if now is None else now
+        x = np.asarray(values, dtype=np.float64)
+        flags = self.flags
+        flags[:] = 0
+
+        missing = np.isnan(x)
+        flags[(x < self.lo) | (x > self.hi)] |= FAULT_RANGE
+
+        at_rail = (x == self.sat_lo) | (x == self.sat_hi)
+        self.sat_count = np.where(at_rail, self.sat_count + 1, 0)
+        flags[self.sat_count >= self.saturation_limit] |= FAULT_SATURATED
+
+        same = (x == self.last) & (x != self.clamp_lo) & (x != self.clamp_hi)
+        self.flat_count = np.where(same, self.flat_count + 1, 0)
+        flags[(self.flatline_limit > 0) & (self.flat_count >= self.flatline_limit)] |= FAULT_FLATLINE
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            dt = now - self.last_ts
+            rate = np.abs(x - self.last) / dt
+        flags[rate > self.max_rate] |= FAULT_RATE
+
+        diff = x - self.mean
+        sigma = np.maximum(np.sqrt(self.var), self.min_sigma)
+        warmed = self.count >= self.warmup
+        outlier = warmed & (np.abs(diff) > self.z_threshold * sigma)
+        # `relearn` outliers in a row are a level shift (sunrise, watering),
+        # not noise: restart the baseline there instead of masking the
+        # channel until the signal happens to come back
+        self.outlier_run = np.where(outlier, self.outlier_run + 1,
+                                    np.where(missing, self.outlier_run, 0))
+        shifted = self.outlier_run >= self.relearn
+        if shifted.any():
+            self.count[shifted] = 0
+            self.outlier_run[shifted] = 0
+            outlier &= ~shifted
+        flags[outlier] |= OUTLIER
+
+        # Only clean samples feed the statistics, so a fault can't drag
+        # the baseline toward itself
+        good = (flags == 0) & ~missing
+        first = good & (self.count == 0)
+        incr = self.alpha * diff
+        self.mean = np.where(good, self.mean + incr, self.mean)
+        self.var = np.where(good, (1 - self.alpha) * (self.var + diff * incr), self.var)
+        self.mean[first] = x[first]
+        self.var[first] = 0.0
+        self.count += good
+
+        seen = ~missing
+        self.last[seen] = x[seen]
+        self.last_ts[seen] = now
+
+        if flags.any():
+            for bit in FLAG_NAMES:
+                self.totals[bit] += int(np.count_nonzero(flags & bit))
+        return flags
+
+    def clean(self, values, flags=None):
+        """Copy of values with every flagged sample replaced by NaN"""
+        flags = self.flags if flags is None else flags
+        return np.where(flags != 0, np.nan, np.asarray(values, dtype=np.float64))
+
+    def describe(self, flags=None):
+        """Human-readable list like ['soil_raw: saturated']"""
+        flags = self.flags if flags is None else flags
+        out = []
+        for i in np.flatnonzero(flags):
+            reasons = [name for bit, name in FLAG_NAMES.items() if flags[i] & bit]
+            out.append(f"{self.names[i]}: {', '.join(reasons)}")
+        return out
+
+def bench(channels, samples):
+    """Synthetic throughput test: slow sine + noise, with injected faults"""
+    specs = [dict(name=f"ch{i}", lo=-100, hi=100, sat_lo=-100, sat_hi=100,
+                  max_rate=50, flatline=50) for i in range(channels)]
+    det = SensorFaultDetector(specs)
+    rng = np.random.default_rng(0)
+    phase = rng.uniform(0, 2 * np.pi, channels)
+    stuck = rng.choice(channels, max(1, channels // 100), replace=False)
+
+    start = time.perf_counter()
+    for step in range(samples):
+        x = 20 * np.sin(phase + step * 0.01) + rng.normal(0, 0.2, channels)
+        if step > samples // 2:
+            x[stuck] = 100  # probes falling off the rail mid-run
+        det.update(x, now=step * 0.1)
+    elapsed = time.perf_counter() - start
+
+    rate = channels * samples / elapsed
+    print(f"⚡ {channels} channels x {samples} samples in {elapsed * 1000:.1f}ms "
+          f"-> {rate / 1e6:.2f}M channel-samples/s ({elapsed / samples * 1e6:.1f}µs per update)")
+    for bit, name in FLAG_NAMES.items():
+        print(f"   {name:13s} {det.totals[bit]}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Streaming sensor fault detector")
+    parser.add_argument("--bench", type=int, default=1000, metavar="CHANNELS")
+    parser.add_argument("--samples", type=int, default=1000)
+    args = parser.parse_args(argv)
+    bench(args.bench, args.samples)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
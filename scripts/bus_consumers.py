@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Readings Bus Consumers
+Independent processes fed from the shared-memory ring that the sensor
+daemon (plant_monitor.py --publish --no-oled) writes. Each one runs at
+its own rate and can crash or restart without touching acquisition.
+
+- display:   redraws the OLED face when the published emotion changes
+- inference: scores windows of readings with the learned health model
+- export:    appends readings to a CSV (same columns health_model.py trains on)
+
+Usage:
+  python3 bus_consumers.py display
+  python3 bus_consumers.py inference --model /home/root/models/health_mlp.npz
+  python3 bus_consumers.py export --output /home/root/readings.csv
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+
+import numpy as np
+
+import health_rules
+import readings_bus
+
+def open_reader(args):
+    print(f"📡 Waiting for readings bus '{args.bus}'...")
+    reader = readings_bus.BusReader(args.bus)
+    print(f"✅ Attached: {', '.join(reader.names)} (writer pid {int(reader.header['writer_pid'])})")
+    return reader
+
+def run_display(args):
+    # The OLED helpers live with the monitor; only this process drives the panel
+    import plant_monitor as pm
+    reader = open_reader(args)
+    emotion_idx = reader.index("emotion")
+    fd = os.open('/dev/i2c-1', os.O_RDWR)
+    pm.init_oled(fd)
+    shown = None
+    try:
+        while True:
+            rec = reader.latest()
+            if rec is not None and not np.isnan(rec["values"][emotion_idx]):
+                emotion = health_rules.EMOTIONS[int(rec["values"][emotion_idx])]
+                if emotion != shown:
+                    pm.draw_emotion(fd, emotion)
+                    shown = emotion
+                    print(f"{health_rules.EMOJI[emotion]} {emotion}")
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pm.clear_oled(fd)
+    finally:
+        os.close(fd)
+        reader.close()
+
+def run_inference(args):
+    import health_model as hm
+    model = hm.load_health_model(args.model, batch_size=1)
+    window = getattr(model, "window", None) or args.window
+    history = hm.WindowBuffer(plants=1, length=window)
+    reader = open_reader(args)
+    cols = [reader.index(c) for c in health_rules.CHANNELS]
+    last = None
+    try:
+        while True:
+            for rec in reader.read_new():
+                values = rec["values"][cols]
+                if not rec["flags"] and not np.isnan(values).any():
+                    history.push(values[None, :])
+            if history.full:
+                emotion, emoji, confidence = hm.classify(model, history.windows())[0]
+                if emotion != last:
+                    print(f"{emoji} model: {emotion.upper()} ({confidence:.0%})")
+                    last = emotion
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.close()
+
+def run_export(args):
+    reader = open_reader(args)
+    cols = [reader.index(c) for c in health_rules.CHANNELS]
+    emotion_idx = reader.index("emotion")
+    new_file = not os.path.exists(args.output)
+    try:
+        with open(args.output, "a", newline="") as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(("plant", "ts_ns") + health_rules.CHANNELS + ("label",))
+            while True:
+                recs = reader.read_new()
+                for rec in recs:
+                    values = rec["values"]
+                    if rec["flags"] or np.isnan(values[cols]).any() or np.isnan(values[emotion_idx]):
+                        continue
+                    writer.writerow([args.plant, int(rec["ts_ns"])]
+                                    + [f"{v:.3f}" for v in values[cols]]
+                                    + [health_rules.EMOTIONS[int(values[emotion_idx])]])
+                if len(recs):
+                    f.flush()
+                if reader.lost:
+                    print(f"⚠️  {reader.lost} readings overwritten before export")
+                    reader.lost = 0
+                time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Readings bus consumers")
+    parser.add_argument("--bus", default=readings_bus.DEFAULT_NAME)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("display", help="OLED emotion face")
+    p.add_argument("--interval", type=float, default=0.5)
+    p.set_defaults(func=run_display)
+
+    p = sub.add_parser("inference", help="learned health model over recent readings")
+    p.add_argument("--model", required=True)
+    p.add_argument("--window", type=int, default=20)
+    p.add_argument("--interval", type=float, default=5.0)
+    p.set_defaults(func=run_inference)
+
+    p = sub.add_parser("export", help="append readings to CSV")
+    p.add_argument("--output", default="readings.csv")
+    p.add_argument("--plant", default="0")
+    p.add_argument("--interval", type=float, default=10.0)
+    p.set_defaults(func=run_export)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+Bus Guard
+Resilience layer for the `i2c` bus seam (see bus_trace.py): every write
+and read is a guarded call for the device the fd currently addresses.
+- deadline per device: retries (with doubling backoff) only while they fit
+  in the device's timeout; a single transfer is bounded by the adapter
+  timeout (I2C_TIMEOUT, adapter-wide: the longest device timeout, set on
+  open; the kernel default is 1 s)
+- retries only for transient errors (NAK, bus error, timeout, lost
+  arbitration), and only while the device has error budget left
+- circuit breaker per device: it opens after `threshold` failed calls in
+  a row or once failed attempts cost more than `budget` seconds of bus
+  time within `window`; open, calls fail at once (DeviceUnavailable, no bus
+  traffic) until `cooldown` passes, then a single trial call decides
+  (cooldown doubles on each failed trial, up to `max_cooldown`)
+- recovery: an fd whose adapter went away (EBADF/ENODEV/ESHUTDOWN), or
+  two devices tripping at once (the bus rather than a device), reopens
+  every fd on the bus and restores its slave address
+
+So within any `window` a failing device costs the others at most
+`budget` + one transfer before tripping, then one trial transfer per
+cooldown: summary() reports that bound next to the worst window seen.
+
+Usage:
+  python3 bus_guard.py demo                       # flaky OLED vs the sensor reads
+  python3 bus_guard.py demo --trace boot.hbt --outage 20 --error-rate 0.01
+"""
+
+import argparse
+import collections
+import errno
+import math
+import os
+import sys
+import threading
+import time
+
+import bus_trace
+
+I2C_TIMEOUT = 0x0702  # adapter timeout, units of 10 ms
+
+TRANSIENT = {errno.EREMOTEIO, errno.ENXIO, errno.EIO, errno.ETIMEDOUT, errno.EAGAIN}
+GONE = {errno.EBADF, errno.ENODEV, errno.ESHUTDOWN}
+
+Policy = collections.namedtuple(
+    "Policy", "timeout retries backoff threshold budget window cooldown max_cooldown",
+    defaults=(0.02, 2, 0.002, 3, 0.05, 10.0, 2.0, 60.0))
+
+DEFAULT_POLICY = Policy()
+# Display traffic is expendable: give up sooner and leave the bus to the sensors
+OLED_POLICY = Policy(timeout=0.01, backoff=0.0005, cooldown=5.0)
+POLICIES = {0x3C: OLED_POLICY, 0x3D: OLED_POLICY}
+
+class DeviceUnavailable(OSError):
+    """Circuit open: the call was refused without touching the bus"""
+
+    def __init__(self, addr, retry_in):
+        super().__init__(errno.EHOSTDOWN, f"0x{addr:02x} circuit open, retry in {retry_in:.1f}s")
+
+class DeviceGuard:
+    """Breaker state and counters for one device address"""
+
+    def __init__(self, addr, policy):
+        self.addr = addr
+        self.policy = policy
+        self.state = "closed"
+        self.failed_in_row = 0
+        self.failed_attempts = collections.deque()  # (time, seconds) within the window
+        self.opened_at = 0.0
+        self.cooldown = policy.cooldown
+        self.calls = self.failures = self.errors = self.retries = self.rejected = self.trips = 0
+        self.bus_s = self.failed_s = self.worst_s = self.worst_window_s = self.spent = 0.0
+
+    def allow(self, now):
+        if self.state == "open":
+            if now - self.opened_at < self.cooldown:
+                self.rejected += 1
+                raise DeviceUnavailable(self.addr, self.cooldown - (now - self.opened_at))
+            self.state = "half-open"
+        return True
+
+    def charge(self, now, seconds):
+        """Time lost to this device's failures (failed transfers, backoff)"""
+        self.failed_s += seconds
+        self.failed_attempts.append((now, seconds))
+        while self.failed_attempts and self.failed_attempts[0][0] < now - self.policy.window:
+            self.failed_attempts.popleft()
+        self.spent = sum(s for _, s in self.failed_attempts)
+        self.worst_window_s = max(self.worst_window_s, self.spent)
+
+    def call_done(self, now, seconds, ok):
+        """-> new breaker state if this call changed it, else None"""
+        self.calls += 1
+        self.worst_s = max(self.worst_s, seconds)
+        if ok:
+            self.failed_in_row = 0
+            if self.state != "closed":
+                self.state = "closed"
+                self.cooldown = self.policy.cooldown
+                return "closed"
+            return None
+        self.failures += 1
+        self.failed_in_row += 1
+        if self.state == "half-open":
+            self.cooldown = min(2 * self.cooldown, self.policy.max_cooldown)
+        elif self.failed_in_row < self.policy.threshold and self.spent < self.policy.budget:
+            return None
+        self.state = "open"
+        self.opened_at = now
+        self.trips += 1
+        return "open"
+
+    def bound(self, transfer):
+        """Most failure time one window can hold, `transfer` = longest single transfer"""
+        p = self.policy
+        return p.budget + transfer + transfer * math.ceil(p.window / p.cooldown)
+
+    def summary(self, transfer):
+        return dict(state=self.state, calls=self.calls, failures=self.failures, errors=self.errors,
+                    retries=self.retries, rejected=self.rejected, trips=self.trips,
+                    bus_ms=round(self.bus_s * 1e3, 2), failed_ms=round(self.failed_s * 1e3, 2),
+                    worst_ms=round(self.worst_s * 1e3, 2),
+                    worst_window_ms=round(self.worst_window_s * 1e3, 2),
+                    bound_ms=round(self.bound(transfer) * 1e3, 1))
+
+class GuardedBus:
+    """Drop-in for the `i2c` seam: same calls, guarded per device"""
+
+    def __init__(self, inner=None, policies=POLICIES, default=DEFAULT_POLICY,
+                 clock=time.monotonic, sleep=time.sleep, recover_interval=10.0):
+        self.inner = inner or bus_trace.OsBus()
+        self.policies = policies
+        self.default = default
+        self.clock = clock
+        self.sleep = sleep
+        self.recover_interval = recover_interval
+        self.devices = {}
+        self.handles = {}  # our fd -> [inner fd, path, flags, slave address]
+        self.recoveries = 0
+        self.last_recovery = -math.inf
+        self.changes = []
+        self.lock = threading.Lock()
+        timeout = max([default.timeout] + [p.timeout for p in policies.values()])
+        self.adapter_timeout = max(1, math.ceil(timeout / 0.01))
+
+    def device(self, addr):
+        guard = self.devices.get(addr)
+        if guard is None:
+            guard = self.devices[addr] = DeviceGuard(addr, self.policies.get(addr, self.default))
+        return guard
+
+    def _open_inner(self, path, flags, addr=None):
+        fd = self.inner.open(path, flags)
+        try:
+            self.inner.ioctl(fd, I2C_TIMEOUT, self.adapter_timeout)
+        except OSError:
+            pass  # not every adapter lets the timeout be set
+        if addr is not None:
+            self.inner.ioctl(fd, bus_trace.I2C_SLAVE, addr)
+        return fd
+
+    # os/fcntl-style bus API
+    def open(self, path, flags=os.O_RDWR):
+        fd = self._open_inner(path, flags)
+        self.handles[fd] = [fd, path, flags, None]
+        return fd
+
+    def close(self, fd):
+        handle = self.handles.pop(fd)
+        self.inner.close(handle[0])
+
+    def ioctl(self, fd, request, arg):
+        handle = self.handles[fd]
+        result = self.inner.ioctl(handle[0], request, arg)
+        if request == bus_trace.I2C_SLAVE:
+            handle[3] = arg
+        return result
+
+    def write(self, fd, data):
+        return self._call(fd, "write", data)
+
+    def read(self, fd, n):
+        return self._call(fd, "read", n)
+
+    def _call(self, fd, op, arg):
+        handle = self.handles[fd]
+        guard = self.device(handle[3] or 0)
+        policy = guard.policy
+        start = self.clock()
+        guard.allow(start)
+        deadline = start + policy.timeout
+        delay = policy.backoff
+        attempt = 0
+        while True:
+            t0 = self.clock()
+            try:
+                result = getattr(self.inner, op)(handle[0], arg)
+            except OSError as e:
+                t1 = self.clock()
+                guard.bus_s += t1 - t0
+                guard.errors += 1
+                guard.charge(t1, t1 - t0)
+                if e.errno in GONE:
+                    self.recover(t1, f"{os.strerror(e.errno)} on 0x{guard.addr:02x}")
+                retry = ((e.errno in TRANSIENT or e.errno in GONE) and attempt < policy.retries
+                         and guard.spent + delay < policy.budget)
+                if not retry or t1 + delay + (t1 - t0) > deadline:
+                    self._done(guard, self.clock(), start, False)
+                    raise
+                attempt += 1
+                guard.retries += 1
+                self.sleep(delay)
+                guard.charge(self.clock(), delay)
+                delay *= 2
+                continue
+            t1 = self.clock()
+            guard.bus_s += t1 - t0
+            self._done(guard, t1, start, True)
+            return result
+
+    def _done(self, guard, now, start, ok):
+        state = guard.call_done(now, now - start, ok)
+        if state is None:
+            return
+        self.changes.append((guard.addr, state))
+        if state == "open" and sum(g.state == "open" for g in self.devices.values()) >= 2:
+            self.recover(now, "several devices failing")
+
+    def recover(self, now, reason):
+        """Reopen every fd on the bus (at most once per recover_interval)"""
+        with self.lock:
+            if now - self.last_recovery < self.recover_interval:
+                return False
+            self.last_recovery = now
+            self.recoveries += 1
+            self.changes.append((None, f"recovery: {reason}"))
+            for handle in self.handles.values():
+                try:
+                    self.inner.close(handle[0])
+                except OSError:
+                    pass
+                try:
+                    handle[0] = self._open_inner(handle[1], handle[2], handle[3])
+                except OSError:
+                    pass  # still gone; the next calls fail and the breakers hold them off
+            return True
+
+    def state_changes(self):
+        """Breaker/recovery changes since the last call -> [(address or None, state)]"""
+        changes, self.changes = self.changes, []
+        return changes
+
+    def summary(self):
+        transfer = self.adapter_timeout * 0.01
+        return {addr: guard.summary(transfer) for addr, guard in sorted(self.devices.items())}
+
+    def render(self):
+        lines = [f"🛡️  Bus guard: {self.recoveries} bus recoveries"]
+        for addr, s in self.summary().items():
+            lines.append(f"   {bus_trace.device_name(addr):8s} {s['state']:9s} {s['calls']:8,d} calls | "
+                         f"{s['failures']} failed, {s['retries']} retries, {s['rejected']} refused, "
+                         f"{s['trips']} trips | lost {s['failed_ms']:.1f}ms, worst "
+                         f"{self.device(addr).policy.window:g}s {s['worst_window_ms']:.1f}ms "
+                         f"(bound {s['bound_ms']:.0f}ms) | worst call {s['worst_ms']:.1f}ms")
+        return "\n".join(lines)
+
+# === Demo: a flaky OLED next to the sensors, on virtual time ===
+class VirtualClock:
+    def __init__(self):
+        self.t = 0.0
+
+    def now(self):
+        return self.t
+
+    def sleep(self, seconds):
+        self.t += seconds
+
+class FlakyBus:
+    """Bus wrapper on a virtual clock: transfers take their 100 kHz wire
+    time; `addr` has a bad connection for `outage` s of every `period` s
+    (each transfer hangs until the adapter timeout: 1 s unless I2C_TIMEOUT
+    set it) and otherwise drops `error_rate` of its transfers with a NAK"""
+
+    def __init__(self, inner, clock, addr, outage=20.0, period=60.0, error_rate=0.005, seed=0):
+        import random
+        self.inner = inner
+        self.clock = clock
+        self.addr = addr
+        self.outage, self.period, self.error_rate = outage, period, error_rate
+        self.random = random.Random(seed)
+        self.address = {}
+        self.adapter_timeout = 1.0
+        self.wire = 0.0  # time in transfers that went through
+
+    def open(self, path, flags=os.O_RDWR):
+        return self.inner.open(path, flags)
+
+    def close(self, fd):
+        self.inner.close(fd)
+
+    def ioctl(self, fd, request, arg):
+        self.clock.sleep(5e-6)
+        if request == bus_trace.I2C_SLAVE:
+            self.address[fd] = arg
+        elif request == I2C_TIMEOUT:
+            self.adapter_timeout = arg * 0.01
+        return self.inner.ioctl(fd, request, arg)
+
+    def _transfer(self, fd, nbytes):
+        if self.address.get(fd) == self.addr:
+            if self.clock.t % self.period < self.outage:
+                self.clock.sleep(self.adapter_timeout)
+                raise OSError(errno.ETIMEDOUT, os.strerror(errno.ETIMEDOUT))
+            if self.random.random() < self.error_rate:
+                self.clock.sleep(1e-4)
+                raise OSError(errno.EREMOTEIO, os.strerror(errno.EREMOTEIO))
+        seconds = (nbytes + 1) * 9 / 100e3
+        self.clock.sleep(seconds)
+        self.wire += seconds
+
+    def write(self, fd, data):
+        self._transfer(fd, len(data))
+        return self.inner.write(fd, data)
+
+    def read(self, fd, n):
+        self._transfer(fd, n)
+        return self.inner.read(fd, n)
+
+def synthetic_trace():
+    """Just enough answers for the monitor's read/draw paths"""
+    T, us = bus_trace.Transaction, 1000
+    return [T(0, 270 * us, bus_trace.OP_WRITE, 0x3C, b"\x40\x00"),
+            T(0, 180 * us, bus_trace.OP_WRITE, 0x76, b"\xf7"),
+            T(0, 810 * us, bus_trace.OP_READ, 0x76, bytes([0x50, 0, 0, 0x7E, 0xED, 0, 0x6C, 0])),
+            T(0, 270 * us, bus_trace.OP_READ, 0x23, b"\x01\x68")]
+
+def demo(trace=None, wakeups=300, interval=1.0, guarded=True, **faults):
+    """Wakeups at `interval`: BME280 + BH1750 reads, then a full OLED redraw
+    (the worst case: the monitor only redraws on emotion changes)
+    -> (sensor reads behind schedule in s, OLED failure time per wakeup in s
+    (failed transfers + backoff), redraws completed, bus)"""
+    import plant_monitor as pm
+    player = bus_trace.Player(bus_trace.read_trace(trace)[1] if trace else synthetic_trace())
+    clock = VirtualClock()
+    bus = flaky = FlakyBus(player, clock, pm.OLED_ADDR, **faults)
+    if guarded:
+        bus = GuardedBus(flaky, clock=clock.now, sleep=clock.sleep)
+    bus_trace.install(pm, bus, player.spi())
+    oled, bme, bh = (pm.open_i2c(addr) for addr in (pm.OLED_ADDR, pm.BME280_ADDR, pm.BH1750_ADDR))
+    cal = pm.read_bme_calibration(bme)
+    latency, lost, drawn = [], [], 0
+    for k in range(wakeups):
+        due = k * interval
+        clock.t = max(clock.t, due)
+        for read in (lambda: pm.read_bme280_calibrated(bme, cal), lambda: pm.read_bh1750(bh)):
+            try:
+                read()
+            except OSError:
+                pass
+        latency.append(clock.t - due)
+        t0, wire0 = clock.t, flaky.wire
+        try:
+            pm.draw_emotion(oled, ("happy", "sad")[k % 2])
+            drawn += 1
+        except OSError:
+            pass
+        # Wire time of the transfers that went through is the redraw's own cost
+        lost.append(clock.t - t0 - (flaky.wire - wire0))
+    return latency, lost, drawn, bus
+
+def _percentiles(values):
+    values = sorted(values) or [0.0]
+    n = len(values)
+    return (f"p50 {values[n // 2] * 1e3:6.1f}ms | p99 {values[int(n * 0.99)] * 1e3:6.1f}ms | "
+            f"max {values[-1] * 1e3:6.1f}ms")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Guarded I2C bus (timeouts, retries, breakers)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("demo", help="sensor read latency next to a flaky OLED, guarded vs not")
+    p.add_argument("--trace", help="bus_trace.py recording to answer from (default: synthetic)")
+    p.add_argument("--wakeups", type=int, default=300)
+    p.add_argument("--outage", type=float, default=20.0,
+                   help="seconds per minute the OLED's transfers hang until the adapter timeout")
+    p.add_argument("--error-rate", type=float, default=0.005, help="NAK rate otherwise")
+    args = parser.parse_args(argv)
+
+    faults = dict(outage=args.outage, error_rate=args.error_rate)
+    print(f"📟 OLED transfers hang {args.outage:g}s/min, {args.error_rate:.1%} NAKs otherwise; "
+          f"full redraw every wakeup")
+    for name, guarded in (("plain bus", False), ("guarded bus", True)):
+        latency, lost, drawn, bus = demo(args.trace, args.wakeups, guarded=guarded, **faults)
+        print(f"   {name}: {drawn}/{len(latency)} redraws completed")
+        print(f"      sensor reads behind schedule   {_percentiles(latency)}")
+        print(f"      lost to OLED errors per wakeup {_percentiles(lost)}")
+        if guarded:
+            print("   " + bus.render().replace("\n", "\n   "))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
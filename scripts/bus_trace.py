@@ -0,0 +1,528 @@
+#!/usr/bin/env python3
+"""
+I2C/SPI Transaction Recorder & Player
+plant_monitor.py talks to its devices through two seams: the module-level
+`i2c` bus (open/close/ioctl/write/read, like os/fcntl on /dev/i2c-N) and
+the `spi` object (spidev's xfer2). Either can be swapped for:
+- Recorder: passes through to the real bus and logs every transaction
+  (op, device address, bytes, start time, duration, errno on failure)
+  to a compact binary trace
+- Player: stands in for the hardware, answering reads from a trace
+
+Traces captured on a real Pi become reproducible benchmarks: `bench`
+runs each driver code path against the player and counts exactly how
+many bus transactions, bytes and syscalls it costs, estimating bus time
+from what the recording measured.
+
+Trace file: header "<4sBxxxQ" (magic HBT1, version, start wall ns), then
+per transaction "<QIBBH" (t_ns since start, duration ns, op, address,
+payload length) + payload. Writes carry the bytes sent, reads the bytes
+received, SPI transfers tx + rx, failures the errno.
+
+Usage:
+  python3 bus_trace.py record boot.hbt -- --fixed-interval 3   # plant_monitor on real hardware
+  python3 bus_trace.py stats boot.hbt
+  python3 bus_trace.py bench boot.hbt --save bus_baseline.json
+  python3 bus_trace.py bench boot.hbt --baseline bus_baseline.json   # exit 1 on regressions
+  python3 bus_trace.py play boot.hbt -- --no-oled                 # plant_monitor without hardware
+"""
+
+import argparse
+import collections
+import errno
+import fcntl
+import json
+import os
+import struct
+import sys
+import threading
+import time
+
+I2C_SLAVE = 0x0703
+I2C_FUNCS = 0x0705
+I2C_SMBUS = 0x0720
+DEVICE_NAMES = {0x3C: "oled", 0x76: "bme280", 0x77: "bme280", 0x23: "bh1750", 0x5C: "bh1750"}
+
+OP_OPEN, OP_CLOSE, OP_ADDRESS, OP_WRITE, OP_READ, OP_XFER, OP_IOCTL = range(1, 8)
+OP_ERROR = 0x80
+OP_NAMES = {OP_OPEN: "open", OP_CLOSE: "close", OP_ADDRESS: "address", OP_WRITE: "write",
+            OP_READ: "read", OP_XFER: "xfer", OP_IOCTL: "ioctl"}
+TRANSFERS = (OP_WRITE, OP_READ, OP_XFER)  # what actually clocks bytes on the bus
+
+MAGIC = b"HBT1"
+VERSION = 1
+_HEADER = struct.Struct("<4sBxxxQ")
+_RECORD = struct.Struct("<QIBBH")
+_ERRNO = struct.Struct("<H")
+
+Transaction = collections.namedtuple("Transaction", "t_ns dur_ns op addr payload")
+
+def device_name(addr, op=OP_WRITE):
+    if op == OP_XFER:
+        return f"spi{addr >> 4}.{addr & 15}"
+    return DEVICE_NAMES.get(addr, f"0x{addr:02x}")
+
+class OsBus:
+    """The real thing: /dev/i2c-N through os and fcntl"""
+
+    def open(self, path, flags=os.O_RDWR):
+        return os.open(path, flags)
+
+    def close(self, fd):
+        os.close(fd)
+
+    def ioctl(self, fd, request, arg):
+        return fcntl.ioctl(fd, request, arg)
+
+    def write(self, fd, data):
+        return os.write(fd, data)
+
+    def read(self, fd, n):
+        return os.read(fd, n)
+
+# === Recording ===
+class TraceWriter:
+    """Appends records; safe to share between threads (init tasks, the bus
+    worker and the main loop all record at once)"""
+
+    def __init__(self, path):
+        self.f = open(path, "wb")
+        self.start = time.monotonic_ns()
+        self.f.write(_HEADER.pack(MAGIC, VERSION, time.time_ns()))
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def add(self, t0, t1, op, addr, payload=b""):
+        # Header and payload in one write, so records never interleave
+        record = _RECORD.pack(t0 - self.start, min(t1 - t0, 0xFFFFFFFF), op, addr & 0xFF,
+                              len(payload)) + payload
+        with self.lock:
+            self.f.write(record)
+            self.count += 1
+
+    def close(self):
+        with self.lock:
+            self.f.close()
+
+def read_trace(path):
+    """-> (start wall ns, [Transaction])"""
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, start = _HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path}: not a bus trace")
+    out, pos = [], _HEADER.size
+    while pos + _RECORD.size <= len(data):
+        t_ns, dur, op, addr, n = _RECORD.unpack_from(data, pos)
+        pos += _RECORD.size
+        out.append(Transaction(t_ns, dur, op, addr, data[pos:pos + n]))
+        pos += n
+    return start, out
+
+class Recorder:
+    """Bus wrapper that logs every call to a TraceWriter"""
+
+    def __init__(self, inner, trace):
+        self.inner = inner
+        self.trace = trace
+        self.address = {}  # fd -> current I2C slave address
+        self.lock = threading.Lock()  # guards `address` against concurrent retargeting
+
+    def _addr(self, fd):
+        with self.lock:
+            return self.address.get(fd, 0)
+
+    def _call(self, op, addr, fn, *args):
+        t0 = time.monotonic_ns()
+        try:
+            result = fn(*args)
+        except OSError as e:
+            self.trace.add(t0, time.monotonic_ns(), op | OP_ERROR, addr, _ERRNO.pack(e.errno or 0))
+            raise
+        return result, t0, time.monotonic_ns()
+
+    def open(self, path, flags=os.O_RDWR):
+        fd, t0, t1 = self._call(OP_OPEN, 0, self.inner.open, path, flags)
+        self.trace.add(t0, t1, OP_OPEN, 0, os.fsencode(path))
+        with self.lock:
+            self.address[fd] = 0
+        return fd
+
+    def close(self, fd):
+        with self.lock:
+            addr = self.address.pop(fd, 0)
+        _, t0, t1 = self._call(OP_CLOSE, addr, self.inner.close, fd)
+        self.trace.add(t0, t1, OP_CLOSE, 0)
+
+    def ioctl(self, fd, request, arg):
+        if request == I2C_SLAVE:
+            with self.lock:
+                result, t0, t1 = self._call(OP_ADDRESS, arg, self.inner.ioctl, fd, request, arg)
+                self.address[fd] = arg
+            self.trace.add(t0, t1, OP_ADDRESS, arg)
+        else:
+            addr = self._addr(fd)
+            result, t0, t1 = self._call(OP_IOCTL, addr, self.inner.ioctl, fd, request, arg)
+            self.trace.add(t0, t1, OP_IOCTL, addr, struct.pack("<I", request))
+        return result
+
+    def write(self, fd, data):
+        addr = self._addr(fd)
+        n, t0, t1 = self._call(OP_WRITE, addr, self.inner.write, fd, data)
+        self.trace.add(t0, t1, OP_WRITE, addr, bytes(data))
+        return n
+
+    def read(self, fd, n):
+        addr = self._addr(fd)
+        data, t0, t1 = self._call(OP_READ, addr, self.inner.read, fd, n)
+        self.trace.add(t0, t1, OP_READ, addr, data)
+        return data
+
+class RecordingSpi:
+    """spidev wrapper logging xfer2 (tx + rx); everything else passes through"""
+
+    def __init__(self, spi, trace, bus=0, device=0):
+        self.spi = spi
+        self.trace = trace
+        self.addr = bus << 4 | device
+
+    def xfer2(self, tx):
+        t0 = time.monotonic_ns()
+        try:
+            rx = self.spi.xfer2(tx)
+        except OSError as e:
+            self.trace.add(t0, time.monotonic_ns(), OP_XFER | OP_ERROR, self.addr,
+                           _ERRNO.pack(e.errno or 0))
+            raise
+        self.trace.add(t0, time.monotonic_ns(), OP_XFER, self.addr, bytes(tx) + bytes(rx))
+        return rx
+
+    def __getattr__(self, name):
+        return getattr(self.spi, name)
+
+# === Playback ===
+class Tally:
+    """Transactions / bytes / syscalls / estimated bus ns per (op, address)"""
+
+    def __init__(self):
+        self.counts = collections.Counter()
+        self.bytes = collections.Counter()
+        self.bus_ns = collections.Counter()
+
+    def add(self, op, addr, nbytes, est_ns):
+        self.counts[op, addr] += 1
+        self.bytes[op, addr] += nbytes
+        self.bus_ns[op, addr] += est_ns
+
+    def summary(self):
+        transfers = sum(n for (op, _), n in self.counts.items() if op in TRANSFERS)
+        return dict(transactions=transfers, bytes=sum(self.bytes.values()),
+                    syscalls=sum(self.counts.values()), bus_ms=round(sum(self.bus_ns.values()) / 1e6, 3))
+
+    def clear(self):
+        self.counts.clear()
+        self.bytes.clear()
+        self.bus_ns.clear()
+
+class Player:
+    """Bus stand-in answering from a recorded trace
+
+    Outcomes are queued per (op, address, context): reads by the register
+    pointer last written to that device, writes in order,
+    SPI transfers by their tx bytes. A queue that runs dry keeps repeating
+    its last good answer, so code can run longer than the recording.
+    Devices never seen in the trace NAK (EREMOTEIO) like absent chips.
+    """
+
+    def __init__(self, transactions):
+        self.queues = collections.defaultdict(collections.deque)
+        self.last_good = {}
+        self.durations = collections.defaultdict(list)
+        self.devices = set()
+        self.address = {}
+        self.pointer = {}
+        self.next_fd = 1000
+        self.tally = Tally()
+        pointer = {}
+        for t in transactions:
+            op, failed = t.op & ~OP_ERROR, bool(t.op & OP_ERROR)
+            if op in TRANSFERS:
+                self.durations[op, t.addr, len(t.payload)].append(t.dur_ns)
+                self.durations[op, t.addr].append(t.dur_ns)
+                if not failed:
+                    self.devices.add((op == OP_XFER, t.addr))
+            if op == OP_WRITE:
+                self.queues[self._key(op, t.addr, None)].append(t.payload if not failed else
+                                                                  _ERRNO.unpack(t.payload)[0])
+                if not failed and len(t.payload) == 1:
+                    pointer[t.addr] = t.payload[0]
+            elif op == OP_READ:
+                self.queues[self._key(op, t.addr, pointer.get(t.addr))].append(
+                    _ERRNO.unpack(t.payload)[0] if failed else t.payload)
+            elif op == OP_IOCTL and not failed and t.payload == struct.pack("<I", I2C_SMBUS):
+                self.devices.add((False, t.addr))  # acked an SMBus quick probe
+            elif op == OP_XFER and not failed:
+                half = len(t.payload) // 2
+                self.queues[self._key(op, t.addr, t.payload[:half])].append(t.payload[half:])
+
+    @classmethod
+    def load(cls, path):
+        return cls(read_trace(path)[1])
+
+    @staticmethod
+    def _key(op, addr, context):
+        return (op, addr, context)
+
+    def _estimate(self, op, addr, n):
+        samples = self.durations.get((op, addr, n)) or self.durations.get((op, addr))
+        return sorted(samples)[len(samples) // 2] if samples else 0
+
+    def _outcome(self, key):
+        queue = self.queues.get(key)
+        if queue:
+            outcome = queue.popleft()
+            if not isinstance(outcome, int):
+                self.last_good[key] = outcome
+            return outcome
+        return self.last_good.get(key)
+
+    def _fail(self, outcome):
+        if isinstance(outcome, int):
+            raise OSError(outcome, os.strerror(outcome))
+
+    # os/fcntl-style bus API
+    def open(self, path, flags=os.O_RDWR):
+        self.next_fd += 1
+        self.address[self.next_fd] = 0
+        self.tally.add(OP_OPEN, 0, 0, 0)
+        return self.next_fd
+
+    def close(self, fd):
+        self.address.pop(fd, None)
+        self.tally.add(OP_CLOSE, 0, 0, 0)
+
+    def ioctl(self, fd, request, arg):
+        if request == I2C_SLAVE:
+            self.address[fd] = arg
+            self.tally.add(OP_ADDRESS, arg, 0, 0)
+            return 0
+        addr = self.address.get(fd, 0)
+        # An SMBus quick command is a zero-length write on the wire
+        self.tally.add(OP_WRITE if request == I2C_SMBUS else OP_IOCTL, addr, 0, 0)
+        if request == I2C_FUNCS:
+            # Plain I2C + SMBus quick, like the Pi's bcm2835 adapter
+            arg[:] = struct.pack("L", 0x00000001 | 0x00010000)
+        elif request == I2C_SMBUS and (False, addr) not in self.devices:
+            raise OSError(errno.EREMOTEIO, os.strerror(errno.EREMOTEIO))
+        return 0
+
+    def write(self, fd, data):
+        addr = self.address.get(fd, 0)
+        if (False, addr) not in self.devices:
+            raise OSError(errno.EREMOTEIO, os.strerror(errno.EREMOTEIO))
+        data = bytes(data)
+        outcome = self.queues[self._key(OP_WRITE, addr, None)]
+        if outcome and isinstance(outcome[0], int):
+            self._fail(outcome.popleft())
+        elif outcome:
+            outcome.popleft()
+        self.tally.add(OP_WRITE, addr, len(data), self._estimate(OP_WRITE, addr, len(data)))
+        if len(data) == 1:
+            self.pointer[addr] = data[0]
+        return len(data)
+
+    def read(self, fd, n):
+        addr = self.address.get(fd, 0)
+        if (False, addr) not in self.devices:
+            raise OSError(errno.EREMOTEIO, os.strerror(errno.EREMOTEIO))
+        outcome = self._outcome(self._key(OP_READ, addr, self.pointer.get(addr)))
+        self.tally.add(OP_READ, addr, n, self._estimate(OP_READ, addr, n))
+        self._fail(outcome)
+        if outcome is None:
+            return bytes(n)
+        return bytes(outcome[:n]).ljust(n, b"\0")
+
+    def spi(self, bus=0, device=0):
+        return PlayerSpi(self, bus << 4 | device)
+
+class PlayerSpi:
+    def __init__(self, player, addr):
+        self.player = player
+        self.addr = addr
+        self.max_speed_hz = 0
+
+    def xfer2(self, tx):
+        key = Player._key(OP_XFER, self.addr, bytes(tx))
+        rx = self.player._outcome(key)
+        self.player.tally.add(OP_XFER, self.addr, 2 * len(tx),
+                              self.player._estimate(OP_XFER, self.addr, 2 * len(tx)))
+        return list(rx) if rx is not None else [0] * len(tx)
+
+    def open(self, bus, device):
+        pass
+
+    def close(self):
+        pass
+
+# === Tools ===
+def install(module, bus, spi):
+    """Point a driver module's `i2c`/`spi` seams at bus/spi"""
+    module.i2c = bus
+    module.spi = spi
+
+def stats(path):
+    start, trace = read_trace(path)
+    if not trace:
+        print(f"📼 {path}: empty")
+        return
+    span = (trace[-1].t_ns - trace[0].t_ns) / 1e9
+    print(f"📼 {path}: {len(trace):,} calls over {span:.1f}s "
+          f"(recorded {time.strftime('%Y-%m-%d %H:%M', time.localtime(start / 1e9))})")
+    rows = collections.defaultdict(lambda: [0, 0, 0, 0])
+    for t in trace:
+        op = t.op & ~OP_ERROR
+        dev = device_name(t.addr, op) if op not in (OP_OPEN, OP_CLOSE) else "i2c"
+        row = rows[dev, OP_NAMES.get(op, str(op))]
+        row[0] += 1
+        row[1] += len(t.payload) if op in TRANSFERS and not t.op & OP_ERROR else 0
+        row[2] += t.dur_ns
+        row[3] += bool(t.op & OP_ERROR)
+    print(f"   {'device':8s} {'op':8s} {'calls':>8s} {'bytes':>9s} {'bus ms':>9s} {'µs/call':>8s} {'errors':>6s}")
+    for (dev, op), (calls, nbytes, dur, errors) in sorted(rows.items()):
+        print(f"   {dev:8s} {op:8s} {calls:8,d} {nbytes:9,d} {dur / 1e6:9.1f} "
+              f"{dur / calls / 1e3:8.1f} {errors:6d}")
+    transfers = sum(r[0] for (_, op), r in rows.items() if op in ("write", "read", "xfer"))
+    print(f"   {transfers / span if span else 0:,.0f} bus transactions/s")
+
+def code_paths(pm):
+    """(name, fn) driver paths of plant_monitor.py (and plant_animated.display_sensors)"""
+    # Opened up front so the paths below count only their own calls
+    fds = {name: pm.open_i2c(addr) for name, addr in
+           (("oled", pm.OLED_ADDR), ("bme", pm.BME280_ADDR), ("bh", pm.BH1750_ADDR))}
+
+    def fd(name, addr):
+        return fds[name]
+
+    cal = {}
+
+    def calibration():
+        cal["bme"] = pm.read_bme_calibration(fd("bme", pm.BME280_ADDR))
+
+    def soil():
+        pm.load_pipeline()
+        pm.mcp3008.MCP3008(pm.get_spi(), [pm.SOIL_CHANNEL], oversample=8).read_mean()
+
+    topology = {}
+
+    def scan():
+        import i2c_discovery
+        topology.update(i2c_discovery.scan(bus=pm.i2c))
+
+    def check_topology():
+        import i2c_discovery
+        i2c_discovery.verify(topology, bus=pm.i2c)
+
+    paths = [
+        ("i2c scan", scan),
+        ("i2c topology check", check_topology),
+        ("init_oled", lambda: pm.init_oled(fd("oled", pm.OLED_ADDR))),
+        ("clear_oled", lambda: pm.clear_oled(fd("oled", pm.OLED_ADDR))),
+        ("draw_emotion", lambda: pm.draw_emotion(fd("oled", pm.OLED_ADDR), "happy")),
+        ("read_bme_calibration", calibration),
+        ("read_bme280_calibrated", lambda: pm.read_bme280_calibrated(fd("bme", pm.BME280_ADDR),
+                                                                     cal["bme"])),
+        ("read_bh1750", lambda: pm.read_bh1750(fd("bh", pm.BH1750_ADDR))),
+        ("soil read_mean x8", soil),
+    ]
+    try:
+        import plant_animated
+    except (ImportError, OSError):
+        plant_animated = None
+    if plant_animated is not None:
+        paths.append(("display_sensors", lambda: plant_animated.display_sensors(
+            fd("oled", pm.OLED_ADDR), 22.5, 48.0, 1234.0, 41.0)))
+    return paths
+
+def bench(path, baseline=None, save=None):
+    import plant_monitor as pm
+    player = Player.load(path)
+    install(pm, player, player.spi())
+    try:
+        import plant_animated
+        install(plant_animated, player, player.spi())
+    except (ImportError, OSError):
+        pass
+
+    results = {}
+    print(f"{'path':24s} {'transactions':>12s} {'bytes':>7s} {'syscalls':>8s} {'est. bus ms':>11s}")
+    for name, fn in code_paths(pm):
+        player.tally.clear()
+        fn()
+        results[name] = player.tally.summary()
+        r = results[name]
+        print(f"{name:24s} {r['transactions']:12,d} {r['bytes']:7,d} {r['syscalls']:8,d} {r['bus_ms']:11.2f}")
+
+    regressions = 0
+    if baseline:
+        with open(baseline) as f:
+            base = json.load(f)
+        for name, r in results.items():
+            if name not in base:
+                continue
+            for key in ("transactions", "bytes", "syscalls"):
+                if r[key] != base[name][key]:
+                    worse = r[key] > base[name][key]
+                    regressions += worse
+                    print(f"{'❌' if worse else '✅'} {name}: {key} {base[name][key]:,} -> {r[key]:,}")
+        print("✅ No regressions" if not regressions else f"❌ {regressions} regressions")
+    if save:
+        with open(save, "w") as f:
+            json.dump(results, f, indent=1)
+        print(f"💾 Baseline -> {save}")
+    return 1 if regressions else 0
+
+def run_monitor(bus, spi, argv):
+    import plant_monitor as pm
+    install(pm, bus, spi)
+    return pm.main(argv)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="I2C/SPI transaction recorder and player")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("record", help="run plant_monitor.py on real hardware, recording the buses")
+    p.add_argument("trace")
+    p.add_argument("args", nargs=argparse.REMAINDER, help="plant_monitor.py arguments (after --)")
+    p = sub.add_parser("play", help="run plant_monitor.py against a recorded trace")
+    p.add_argument("trace")
+    p.add_argument("args", nargs=argparse.REMAINDER)
+    p = sub.add_parser("stats", help="per-device transaction counts and bus time")
+    p.add_argument("trace")
+    p = sub.add_parser("bench", help="transactions/bytes per driver code path")
+    p.add_argument("trace")
+    p.add_argument("--baseline", help="fail if a path got more expensive than this")
+    p.add_argument("--save", metavar="JSON", help="write the results as a baseline")
+    args = parser.parse_args(argv)
+
+    if args.command == "stats":
+        stats(args.trace)
+        return 0
+    if args.command == "bench":
+        return bench(args.trace, args.baseline, args.save)
+
+    monitor_args = args.args[1:] if args.args[:1] == ["--"] else args.args
+    if args.command == "record":
+        import mcp3008
+        trace = TraceWriter(args.trace)
+        try:
+            run_monitor(Recorder(OsBus(), trace), RecordingSpi(mcp3008.open_spi(), trace),
+                        monitor_args)
+        finally:
+            trace.close()
+            print(f"📼 {trace.count:,} bus calls -> {args.trace}")
+    else:
+        player = Player.load(args.trace)
+        run_monitor(player, player.spi(), monitor_args)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Priority-arbitrated Bus Worker
+One thread per I2C adapter runs every bus job, highest priority first
+(FIFO within a priority). A job is one short driver call, e.g. a
+BME280 burst read or one OLED chunk, and it is never interrupted. A full
+display flush is queued as many chunk jobs, so a sensor read waits for at
+most one chunk (~3 ms at 100 kHz) instead of the whole frame.
+
+Jobs must not sleep: settle times belong to the caller, between jobs.
+Per-priority queueing delay (submit -> start) is kept for the report.
+
+Usage:
+  python3 bus_worker.py demo              # sensor queueing delay next to OLED redraws
+  python3 bus_worker.py demo --hz 400000 --seconds 10
+"""
+
+import argparse
+import collections
+import concurrent.futures
+import heapq
+import itertools
+import sys
+import threading
+import time
+
+SENSOR, CONTROL, DISPLAY = 0, 1, 2
+PRIORITY_NAMES = {SENSOR: "sensor", CONTROL: "control", DISPLAY: "display"}
+
+class BusWorker:
+    def __init__(self, name="i2c-1", history=4096):
+        self.name = name
+        self.heap = []
+        self.seq = itertools.count()
+        self.cv = threading.Condition()
+        self.stopping = False
+        self.delays = {p: collections.deque(maxlen=history) for p in PRIORITY_NAMES}
+        self.jobs = collections.Counter()
+        self.busy_s = 0.0
+        self.thread = threading.Thread(target=self._run, name=f"bus-{name}", daemon=True)
+        self.thread.start()
+
+    def submit(self, priority, fn, *args):
+        """Queue fn(*args) -> Future"""
+        future = concurrent.futures.Future()
+        if threading.current_thread() is self.thread:
+            # Already on the bus (a job queueing a job): run it in place
+            self._execute(future, fn, args)
+            return future
+        with self.cv:
+            if self.stopping:
+                raise RuntimeError(f"bus worker {self.name} stopped")
+            heapq.heappush(self.heap, (priority, next(self.seq), time.monotonic(), future, fn, args))
+            self.cv.notify()
+        return future
+
+    def call(self, priority, fn, *args):
+        """Run fn(*args) on the bus thread and wait for it"""
+        return self.submit(priority, fn, *args).result()
+
+    def _execute(self, future, fn, args):
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    def _run(self):
+        while True:
+            with self.cv:
+                while not self.heap and not self.stopping:
+                    self.cv.wait()
+                if not self.heap:
+                    return
+                priority, _, queued, future, fn, args = heapq.heappop(self.heap)
+            start = time.monotonic()
+            self.delays[priority].append(start - queued)
+            self.jobs[priority] += 1
+            self._execute(future, fn, args)
+            self.busy_s += time.monotonic() - start
+
+    def pending(self):
+        with self.cv:
+            return len(self.heap)
+
+    def stop(self, timeout=5.0):
+        """Finish the queued jobs, then end the thread"""
+        with self.cv:
+            self.stopping = True
+            self.cv.notify()
+        self.thread.join(timeout)
+
+    def summary(self):
+        """Per priority: jobs run and queueing delay percentiles (ms)"""
+        out = {}
+        for priority, name in PRIORITY_NAMES.items():
+            delays = sorted(self.delays[priority])
+            if not delays:
+                continue
+            n = len(delays)
+            out[name] = dict(jobs=self.jobs[priority],
+                             p50_ms=round(delays[n // 2] * 1e3, 3),
+                             p99_ms=round(delays[int(n * 0.99)] * 1e3, 3),
+                             max_ms=round(delays[-1] * 1e3, 3))
+        return out
+
+    def render(self):
+        lines = [f"🚦 Bus worker {self.name}: {self.busy_s:.2f}s busy, queueing delay by priority"]
+        for name, s in self.summary().items():
+            lines.append(f"   {name:8s} {s['jobs']:8,d} jobs | p50 {s['p50_ms']:7.2f}ms | "
+                         f"p99 {s['p99_ms']:7.2f}ms | max {s['max_ms']:7.2f}ms")
+        return "\n".join(lines)
+
+# === Demo ===
+class WireBus:
+    """Bus wrapper taking each transfer's wire time for real (time.sleep)"""
+
+    def __init__(self, inner, hz=100e3):
+        self.inner = inner
+        self.hz = hz
+
+    def open(self, path, flags=0):
+        return self.inner.open(path, flags)
+
+    def close(self, fd):
+        self.inner.close(fd)
+
+    def ioctl(self, fd, request, arg):
+        return self.inner.ioctl(fd, request, arg)
+
+    def write(self, fd, data):
+        time.sleep((len(data) + 1) * 9 / self.hz)
+        return self.inner.write(fd, data)
+
+    def read(self, fd, n):
+        time.sleep((n + 1) * 9 / self.hz)
+        return self.inner.read(fd, n)
+
+def legacy_draw(pm, fd, frame):
+    """The pre-chunking redraw: every byte its own write (1,032 transactions)"""
+    for page in range(8):
+        pm.oled_window(fd, 0, 127, page, page)
+        for b in frame[page * 128:(page + 1) * 128]:
+            pm.i2c.write(fd, bytes([0x40, b]))
+
+def demo(mode, seconds=5.0, hz=100e3, sensor_every=0.05, redraw_every=0.5):
+    """A sensor thread reading the BME280 every `sensor_every` s while the
+    face is redrawn in full every `redraw_every` s -> worker"""
+    import bus_guard
+    import bus_trace
+    import plant_monitor as pm
+    player = bus_trace.Player(bus_guard.synthetic_trace())
+    bus_trace.install(pm, WireBus(player, hz), player.spi())
+    oled, bme = pm.open_i2c(pm.OLED_ADDR), pm.open_i2c(pm.BME280_ADDR)
+    cal = pm.read_bme_calibration(bme)
+    worker = BusWorker("demo")
+    stop = threading.Event()
+
+    def sensors():
+        while not stop.is_set():
+            worker.call(SENSOR, pm.read_bme280_calibrated, bme, cal)
+            time.sleep(sensor_every)
+
+    thread = threading.Thread(target=sensors)
+    thread.start()
+    end = time.monotonic() + seconds
+    k = 0
+    while time.monotonic() < end:
+        frame = pm.compose_frame(("happy", "sad")[k % 2])
+        if mode == "legacy":
+            jobs = [worker.submit(DISPLAY, legacy_draw, pm, oled, frame)]
+        elif mode == "frame":
+            jobs = [worker.submit(DISPLAY, pm.flush_frame, oled, frame)]
+        else:
+            jobs = [worker.submit(DISPLAY, pm.write_chunk, oled, page, col, data)
+                    for page, col, data in pm.frame_chunks(frame)]
+        concurrent.futures.wait(jobs)
+        time.sleep(redraw_every)
+        k += 1
+    stop.set()
+    thread.join()
+    worker.stop()
+    return worker
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Priority-arbitrated I2C bus worker")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("demo", help="sensor queueing delay behind OLED redraws")
+    p.add_argument("--seconds", type=float, default=5.0)
+    p.add_argument("--hz", type=float, default=100e3, help="I2C clock")
+    args = parser.parse_args(argv)
+
+    print(f"📟 BME280 read every 50ms + full OLED redraw every 500ms, {args.hz / 1e3:g} kHz bus")
+    for mode, label in (("legacy", "byte-per-write redraw, one job"),
+                        ("frame", "32-byte chunked redraw, one job"),
+                        ("chunks", "32-byte chunks, each its own job")):
+        s = demo(mode, args.seconds, args.hz).summary()
+        sensor, display = s.get("sensor"), s.get("display")
+        print(f"   {label:33s} sensor wait p50 {sensor['p50_ms']:6.2f}ms | "
+              f"p99 {sensor['p99_ms']:6.2f}ms | max {sensor['max_ms']:6.2f}ms "
+              f"({display['jobs']:,} display jobs)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Composable Signal Filters for noisy sensor channels
+All stages work on a (channels,) vector per sample with preallocated
+NumPy state, so one call filters every channel at once.
+
+Stages:
+- OversampleMean: (channels, N) burst of raw reads -> (channels,) mean
+- MedianN:        rolling median of the last N samples (spike killer)
+- EWMA:           exponential moving average
+- Kalman1D:       scalar random-walk Kalman filter per channel
+
+NaN inputs (faulted samples) pass through as NaN and leave state untouched.
+
+Spec strings (for CLI/config): "median:5,kalman:0.01:4" or "ewma:0.3"
+"""
+
+import warnings
+
+import numpy as np
+
+class OversampleMean:
+    """Collapse an oversampled burst (channels, N) to one value per channel"""
+
+    def __init__(self, channels):
+        self._out = np.zeros(channels)
+
+    def process(self, burst):
+        return np.mean(burst, axis=1, out=self._out)
+
+class MedianN:
+    """Rolling median over the last n samples per channel"""
+
+    def __init__(self, channels, n=5):
+        self.n = n
+        self._ring = np.full((channels, n), np.nan)
+        self._head = np.zeros(channels, dtype=np.intp)
+        self._rows = np.arange(channels)
+        self._out = np.zeros(channels)
+
+    def process(self, x):
+        valid = ~np.isnan(x)
+        if not valid.any():
+            self._out[:] = np.nan
+            return self._out
+        # Only real samples enter the window (a gap doesn't push one out);
+        # NaN slots remain only until each channel's window first fills
+        rows = self._rows[valid]
+        self._ring[rows, self._head[rows]] = x[valid]
+        self._head[rows] = (self._head[rows] + 1) % self.n
+        if np.isnan(self._ring).any():
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN rows
+                self._out[:] = np.nanmedian(self._ring, axis=1)
+        else:
+            np.median(self._ring, axis=1, out=self._out)
+        self._out[~valid] = np.nan
+        return self._out
+
+class EWMA:
+    """y += alpha * (x - y); first valid sample initializes y"""
+
+    def __init__(self, channels, alpha=0.3):
+        self.alpha = alpha
+        self._y = np.full(channels, np.nan)
+        self._out = np.zeros(channels)
+
+    def process(self, x):
+        valid = ~np.isnan(x)
+        fresh = valid & np.isnan(self._y)
+        self._y[fresh] = x[fresh]
+        step = valid & ~fresh
+        self._y[step] += self.alpha * (x[step] - self._y[step])
+        np.copyto(self._out, self._y)
+        self._out[~valid] = np.nan
+        return self._out
+
+class Kalman1D:
+    """Random-walk Kalman filter: q = process noise, r = measurement noise (variances)"""
+
+    def __init__(self, channels, q=0.01, r=4.0):
+        self.q = q
+        self.r = r
+        self._x = np.full(channels, np.nan)
+        self._p = np.full(channels, r)
+        self._out = np.zeros(channels)
+
+    def process(self, z):
+        valid = ~np.isnan(z)
+        fresh = valid & np.isnan(self._x)
+        self._x[fresh] = z[fresh]
+        step = valid & ~fresh
+
+        p = self._p[step] + self.q
+        k = p / (p + self.r)
+        self._x[step] += k * (z[step] - self._x[step])
+        self._p[step] = (1 - k) * p
+
+        np.copyto(self._out, self._x)
+        self._out[~valid] = np.nan
+        return self._out
+
+class FilterPipeline:
+    """Chain of stages applied in order; process() returns the last stage's buffer"""
+
+    def __init__(self, stages):
+        self.stages = list(stages)
+
+    def process(self, x):
+        x = np.asarray(x, dtype=np.float64)
+        for stage in self.stages:
+            x = stage.process(x)
+        return x
+
+    @classmethod
+    def from_spec(cls, spec, channels):
+        """Build from 'median:5,ewma:0.3,kalman:0.01:4' ('' or 'none' = passthrough)"""
+        stages = []
+        for part in (spec or "").split(","):
+            part = part.strip()
+            if not part or part == "none":
+                continue
+            name, *params = part.split(":")
+            params = [float(p) for p in params]
+            if name == "median":
+                stages.append(MedianN(channels, int(params[0]) if params else 5))
+            elif name == "ewma":
+                stages.append(EWMA(channels, *params))
+            elif name == "kalman":
+                stages.append(Kalman1D(channels, *params))
+            else:
+                raise ValueError(f"Unknown filter stage '{name}'")
+        return cls(stages)
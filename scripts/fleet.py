@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+"""
+Fleet Uplink
+Every node batches its readings into compact frames and pushes them to
+one aggregator over TCP; the aggregator ingests from all nodes at once
+with asyncio.
+
+Frame (little endian, length-prefixed):
+  u32 length | magic "HAU1", version, flags, node name length, session,
+  seq, channel count | node name | per channel: name length, block
+  length, name, history block
+Each channel's points are a Gorilla-style block (history_blocks.py), so
+a minute of 4 channels at 3 s is ~100 bytes instead of ~1.3 KB raw.
+The aggregator answers every frame with its u64 seq; the node deletes
+a frame from its spool only once acked (at-least-once, and the
+aggregator drops repeats by (node, session, seq)).
+
+Store-and-forward: frames are written to a spool directory before they
+are sent, and a background thread drains it - an outage (or a reboot
+during one) just grows the spool, up to a size cap, and the sampling
+loop never waits on the network.
+
+Usage:
+  python3 fleet.py aggregator --port 7070 --db /srv/homeai/fleet.db
+  python3 plant_monitor.py --uplink aggregator.local:7070
+  python3 fleet.py bench --nodes 300 --frames 20
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import socket
+import struct
+import sys
+import threading
+import time
+
+import numpy as np
+
+import history_blocks
+
+DEFAULT_PORT = 7070
+MAGIC = b"HAU1"
+VERSION = 1
+MAX_FRAME = 4 * 1024 * 1024
+SPOOL_DIR = "/var/spool/homeai/uplink"
+
+_LENGTH = struct.Struct("<I")
+_FRAME = struct.Struct("<4sBBHIQH")  # magic, version, flags, node len, session, seq, channels
+_CHANNEL = struct.Struct("<BI")      # name len, block len
+_ACK = struct.Struct("<Q")
+_RESOLUTION = {s["name"]: s["resolution"] for s in history_blocks.PLANT_MONITOR_HISTORY}
+
+# === Frames ===
+def encode_frame(node, session, seq, series):
+    """{channel: (ts_ns, values)} -> length-prefixed frame bytes"""
+    node_b = node.encode()
+    parts = []
+    for name, (ts, values) in series.items():
+        if len(ts):
+            block, _ = history_blocks.encode_block(ts, values, _RESOLUTION.get(name))
+            name_b = name.encode()
+            parts.append(_CHANNEL.pack(len(name_b), len(block)) + name_b + block)
+    body = _FRAME.pack(MAGIC, VERSION, 0, len(node_b), session, seq, len(parts)) + node_b + b"".join(parts)
+    return _LENGTH.pack(len(body)) + body
+
+def decode_frame(body):
+    """Frame body (after the length) -> (node, session, seq, {channel: (ts_ns, values)})"""
+    magic, version, _, node_len, session, seq, channels = _FRAME.unpack_from(body)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"not an uplink frame (magic {magic!r}, version {version})")
+    pos = _FRAME.size
+    node = bytes(body[pos:pos + node_len]).decode()
+    pos += node_len
+    series = {}
+    for _ in range(channels):
+        name_len, block_len = _CHANNEL.unpack_from(body, pos)
+        pos += _CHANNEL.size
+        name = bytes(body[pos:pos + name_len]).decode()
+        pos += name_len
+        series[name] = history_blocks.decode_block(body[pos:pos + block_len])
+        pos += block_len
+    return node, session, seq, series
+
+# === Node side ===
+class Spool:
+    """Frames waiting for an ack, one file each, oldest dropped past max_bytes
+
+    put() (sampling thread) and remove() (sender thread) share a lock, and
+    either side tolerates a frame the other one already deleted.
+    """
+
+    def __init__(self, path, max_bytes=50 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(path, exist_ok=True)
+        # Every process start is a new session: seq restarts whenever the
+        # spool is empty, and the aggregator would drop those frames as
+        # repeats of the last session's. Spooled frames keep the session
+        # they were encoded with.
+        self.session = random.getrandbits(32)
+        frames = self.pending()
+        self.next_seq = frames[-1][0] + 1 if frames else 0
+        self.dropped = self.quarantined = 0
+        self.lock = threading.Lock()
+
+    def pending(self):
+        """[(seq, path)] oldest first"""
+        names = sorted(n for n in os.listdir(self.path) if n.endswith(".frm"))
+        return [(int(n[:-4]), os.path.join(self.path, n)) for n in names]
+
+    def put(self, frame):
+        seq = self.next_seq
+        self.next_seq += 1
+        path = os.path.join(self.path, f"{seq:016d}.frm")
+        with open(path + ".tmp", "wb") as f:
+            f.write(frame)
+        os.replace(path + ".tmp", path)  # never a half-written frame in the spool
+        with self.lock:
+            sizes = [(p, _size(p)) for _, p in self.pending()]
+            total = sum(size for _, size in sizes)
+            for p, size in sizes[:-1]:
+                if total <= self.max_bytes:
+                    break
+                total -= size
+                if _remove(p):
+                    self.dropped += 1
+        return seq
+
+    def remove(self, path):
+        """Delete an acked frame"""
+        with self.lock:
+            _remove(path)
+
+    def quarantine(self, path):
+        """Set a frame that can't be sent aside as .bad (kept for inspection)"""
+        with self.lock:
+            try:
+                os.replace(path, path[:-4] + ".bad")
+                self.quarantined += 1
+            except FileNotFoundError:
+                pass
+
+def _size(path):
+    try:
+        return os.path.getsize(path)
+    except FileNotFoundError:
+        return 0  # acked and removed since the listing
+
+def _remove(path):
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+def valid_frame(frame):
+    """Length prefix matches and the body starts like an uplink frame"""
+    if len(frame) < _LENGTH.size + _FRAME.size:
+        return False
+    (length,) = _LENGTH.unpack_from(frame)
+    return length == len(frame) - _LENGTH.size and length <= MAX_FRAME and \
+        frame[_LENGTH.size:_LENGTH.size + len(MAGIC)] == MAGIC
+
+class Uplink:
+    """Batches readings per flush interval into spooled frames; a background
+    thread sends them (stop-and-wait on the ack) and retries with backoff"""
+
+    def __init__(self, address, spool_dir=SPOOL_DIR, node=None, flush_interval=60.0,
+                 timeout=5.0, max_backoff=60.0):
+        host, _, port = address.rpartition(":")
+        self.address = (host or address, int(port) if host else DEFAULT_PORT)
+        self.node = node or socket.gethostname()
+        self.spool = Spool(spool_dir)
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+        self.series = {}
+        self.next_flush = time.monotonic() + flush_interval
+        self.sent = self.failures = self.errors = 0
+        self.sock = None
+        self.wake = threading.Event()
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="uplink", daemon=True)
+        self.thread.start()
+
+    def append(self, names, values, ts_ns=None):
+        """One reading per channel at ts_ns (wall clock); NaN = not sampled"""
+        ts_ns = time.time_ns() if ts_ns is None else ts_ns
+        for name, value in zip(names, values):
+            if value == value:
+                ts, vs = self.series.setdefault(name, ([], []))
+                ts.append(ts_ns)
+                vs.append(value)
+        if time.monotonic() >= self.next_flush:
+            self.flush()
+
+    def flush(self):
+        self.next_flush = time.monotonic() + self.flush_interval
+        if self.series:
+            self.spool.put(encode_frame(self.node, self.spool.session, self.spool.next_seq, self.series))
+            self.series = {}
+            self.wake.set()
+
+    def _send(self, seq, path):
+        try:
+            with open(path, "rb") as f:
+                frame = f.read()
+        except FileNotFoundError:
+            return  # dropped from a full spool meanwhile
+        if not valid_frame(frame):
+            # Truncated or corrupt on disk: the aggregator would drop the
+            # connection on it every time and block the frames behind it
+            self.spool.quarantine(path)
+            self.errors += 1
+            return
+        if self.sock is None:
+            self.sock = socket.create_connection(self.address, timeout=self.timeout)
+        self.sock.sendall(frame)
+        ack = b""
+        while len(ack) < _ACK.size:
+            chunk = self.sock.recv(_ACK.size - len(ack))
+            if not chunk:
+                raise ConnectionError("aggregator closed the connection")
+            ack += chunk
+        if _ACK.unpack(ack)[0] != seq:
+            raise ConnectionError("ack out of order")
+        self.spool.remove(path)
+        self.sent += 1
+
+    def _run(self):
+        backoff = 1.0
+        while not self.stopping.is_set():
+            frames = self.spool.pending()
+            if not frames:
+                self.wake.wait()
+                self.wake.clear()
+                continue
+            try:
+                for seq, path in frames:
+                    self._send(seq, path)
+                backoff = 1.0
+            except OSError:
+                self.failures += 1
+                self._disconnect()
+                # Frames stay spooled; try again later (a new frame does not
+                # cut the wait short)
+                self.stopping.wait(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+            except Exception:
+                # Anything else is about this frame, not the network: set it
+                # aside so the thread (and the frames behind it) carry on
+                self.errors += 1
+                self.spool.quarantine(path)
+                self._disconnect()
+
+    def _disconnect(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    def close(self, wait=2.0):
+        """Spool what is buffered and give the sender a moment to deliver it"""
+        self.flush()
+        deadline = time.monotonic() + wait
+        while self.spool.pending() and time.monotonic() < deadline and self.failures == 0:
+            time.sleep(0.05)
+        self.stopping.set()
+        self.wake.set()
+        self.thread.join(timeout=1.0)
+        if self.sock is not None:
+            self.sock.close()
+
+# === Aggregator ===
+class Aggregator:
+    """asyncio TCP server; decoded readings optionally go to a ReadingsDB
+    (channels named "<node>/<channel>") on its own thread"""
+
+    def __init__(self, db_path=None):
+        self.last_seq = {}  # (node, session) -> highest seq ingested
+        self.nodes = set()
+        self.connected = 0
+        self.frames = self.readings = self.bytes = self.duplicates = self.errors = 0
+        self.db = None
+        self.db_executor = None
+        self.db_path = db_path
+
+    async def start(self, host="0.0.0.0", port=DEFAULT_PORT):
+        if self.db_path:
+            import concurrent.futures
+            import readings_db
+            # SQLite connections stay on the thread that made them
+            self.db_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+            self.db = await asyncio.get_running_loop().run_in_executor(
+                self.db_executor, readings_db.ReadingsDB, self.db_path)
+        self.server = await asyncio.start_server(self.handle, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def handle(self, reader, writer):
+        self.connected += 1
+        try:
+            while True:
+                (length,) = _LENGTH.unpack(await reader.readexactly(_LENGTH.size))
+                if length > MAX_FRAME:
+                    raise ValueError(f"frame of {length} bytes")
+                body = await reader.readexactly(length)
+                node, session, seq, series = decode_frame(body)
+                key = (node, session)
+                if seq > self.last_seq.get(key, -1):
+                    await self.ingest(node, series)
+                    self.last_seq[key] = seq
+                    self.nodes.add(node)
+                    self.frames += 1
+                    self.bytes += length + _LENGTH.size
+                else:
+                    self.duplicates += 1
+                writer.write(_ACK.pack(seq))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except (ValueError, struct.error) as e:
+            self.errors += 1
+            print(f"⚠️  Dropping connection: {e}")
+        finally:
+            self.connected -= 1
+            writer.close()
+
+    async def ingest(self, node, series):
+        self.readings += sum(len(ts) for ts, _ in series.values())
+        if self.db is not None:
+            loop = asyncio.get_running_loop()
+            for channel, (ts, values) in series.items():
+                await loop.run_in_executor(self.db_executor, self.db.extend,
+                                           f"{node}/{channel}", ts, values)
+
+    def status(self):
+        return (f"{len(self.nodes)} nodes ({self.connected} connected) | {self.frames} frames | "
+                f"{self.readings} readings | {self.bytes / 1024:.0f} KB | "
+                f"{self.duplicates} repeats | {self.errors} bad")
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+        if self.db is not None:
+            await asyncio.get_running_loop().run_in_executor(self.db_executor, self.db.close)
+            self.db_executor.shutdown()
+
+async def serve(args):
+    aggregator = Aggregator(args.db)
+    port = await aggregator.start(args.host, args.port)
+    print(f"📡 Aggregator listening on {args.host}:{port}" + (f", storing to {args.db}" if args.db else ""))
+    try:
+        while True:
+            await asyncio.sleep(args.status_interval)
+            print(f"📊 {aggregator.status()}")
+    finally:
+        await aggregator.close()
+
+# === Benchmark ===
+def _bench_server(port_queue, expected, result_queue):
+    async def run():
+        aggregator = Aggregator()
+        port_queue.put(await aggregator.start("127.0.0.1", 0))
+        while aggregator.frames + aggregator.duplicates < expected or aggregator.connected:
+            await asyncio.sleep(0.05)
+        result_queue.put((aggregator.frames, aggregator.readings, aggregator.bytes, len(aggregator.nodes)))
+        await aggregator.close()
+    asyncio.run(run())
+
+def _node_frames(i, frames, points, period=3.0):
+    """A node's frames: `points` readings of each channel per frame"""
+    rng = np.random.default_rng(i)
+    start = time.time_ns() - frames * points * int(period * 1e9)
+    base = np.array([22.0, 50.0, 300.0, 55.0])
+    out = []
+    for f in range(frames):
+        ts = start + (f * points + np.arange(points)) * int(period * 1e9)
+        walk = base + np.cumsum(rng.normal(0, [0.02, 0.1, 2.0, 0.05], (points, 4)), axis=0)
+        base = walk[-1]
+        series = {name: (ts, walk[:, c]) for c, name in enumerate(_RESOLUTION)}
+        out.append(encode_frame(f"node{i:04d}", i, f, series))
+    return out
+
+async def _simulate_nodes(port, node_frames):
+    async def node(frames):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        for frame in frames:
+            writer.write(frame)
+            await reader.readexactly(_ACK.size)
+        writer.close()
+    await asyncio.gather(*(node(frames) for frames in node_frames))
+
+def bench(nodes, frames, points):
+    import multiprocessing
+    start = time.perf_counter()
+    node_frames = [_node_frames(i, frames, points) for i in range(nodes)]
+    encode_s = time.perf_counter() - start
+    total_frames = nodes * frames
+    readings = total_frames * points * 4
+    frame_bytes = sum(len(f) for fs in node_frames for f in fs)
+    print(f"⚡ encode: {total_frames / encode_s:,.0f} frames/s, {frame_bytes / readings:.2f} bytes/reading "
+          f"on the wire (raw int64+float64 = 16)")
+
+    port_queue, result_queue = multiprocessing.Queue(), multiprocessing.Queue()
+    server = multiprocessing.Process(target=_bench_server, args=(port_queue, total_frames, result_queue))
+    server.start()
+    port = port_queue.get(timeout=10)
+    start = time.perf_counter()
+    asyncio.run(_simulate_nodes(port, node_frames))
+    frames_in, readings_in, bytes_in, nodes_in = result_queue.get(timeout=60)
+    elapsed = time.perf_counter() - start
+    server.join()
+    print(f"⚡ aggregator: {nodes_in} nodes, {frames_in} frames, {readings_in} readings in {elapsed:.2f}s")
+    print(f"   {frames_in / elapsed:,.0f} frames/s | {readings_in / elapsed:,.0f} readings/s | "
+          f"{bytes_in / elapsed / 1e6:.2f} MB/s")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fleet uplink and aggregator")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("aggregator", help="receive frames from every node")
+    p.add_argument("--host", default="0.0.0.0")
+    p.add_argument("--port", type=int, default=DEFAULT_PORT)
+    p.add_argument("--db", help="store readings in this SQLite file (readings_db.py)")
+    p.add_argument("--status-interval", type=float, default=10.0)
+    p = sub.add_parser("bench", help="simulated nodes against a local aggregator")
+    p.add_argument("--nodes", type=int, default=300)
+    p.add_argument("--frames", type=int, default=20, help="frames per node")
+    p.add_argument("--points", type=int, default=20, help="readings per channel per frame")
+    args = parser.parse_args(argv)
+
+    if args.command == "bench":
+        bench(args.nodes, args.frames, args.points)
+    else:
+        try:
+            asyncio.run(serve(args))
+        except KeyboardInterrupt:
+            print("\n🛑 Aggregator stopped")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
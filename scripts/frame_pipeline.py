@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Real-time Classification Pipeline
+Capture thread -> newest-frame-wins queue -> inference thread
+
+Capture keeps running while invoke() executes (TFLite releases the GIL),
+and when inference lags the stale frame is dropped, not queued.
+
+Usage:
+  python3 frame_pipeline.py --source v4l2:/dev/video0
+  python3 frame_pipeline.py --source dir:/home/root/frames --fps 15 --duration 30
+"""
+
+import argparse
+import collections
+import json
+import sys
+import threading
+import time
+
+import numpy as np
+
+from frame_sources import open_source
+from preprocess import InputPreprocessor
+from scene_gate import SceneGate
+
+MODEL_PATH = "/home/root/models/mobilenet_v1_1.0_224_quant.tflite"
+LABELS_PATH = "/home/root/models/labels_mobilenet_quant_v1_224.txt"
+
+class Frame:
+    __slots__ = ("seq", "data", "capture_ts")
+
+    def __init__(self, seq, data, capture_ts):
+        self.seq = seq
+        self.data = data
+        self.capture_ts = capture_ts
+
+class LatestFrameQueue:
+    """Bounded queue where put() evicts the oldest frame instead of blocking"""
+
+    def __init__(self, maxsize=1):
+        self._items = collections.deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) == self._items.maxlen:
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Next frame, or None once closed and drained (or on timeout)"""
+        with self._cond:
+            if not self._items and not self._closed:
+                self._cond.wait(timeout)
+            if self._items:
+                return self._items.popleft()
+            return None
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+class PipelineStats:
+    """End-to-end latency and throughput counters"""
+
+    def __init__(self, window=1000):
+        self.latencies_ms = collections.deque(maxlen=window)
+        self.captured = 0
+        self.processed = 0
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record(self, latency_ms):
+        with self._lock:
+            self.processed += 1
+            self.latencies_ms.append(latency_ms)
+
+    def summary(self, dropped=0):
+        with self._lock:
+            elapsed = time.monotonic() - self.started
+            lat = np.array(self.latencies_ms) if self.latencies_ms else np.zeros(1)
+            p50, p90, p99 = np.percentile(lat, [50, 90, 99])
+            return {
+                "elapsed_s": round(elapsed, 2),
+                "captured": self.captured,
+                "processed": self.processed,
+                "dropped": dropped,
+                "capture_fps": round(self.captured / elapsed, 2) if elapsed else 0.0,
+                "inference_fps": round(self.processed / elapsed, 2) if elapsed else 0.0,
+                "latency_ms": {"p50": round(float(p50), 2),
+                               "p90": round(float(p90), 2),
+                               "p99": round(float(p99), 2)},
+            }
+
+class ClassificationPipeline:
+    """Owns the capture and inference threads for one source + interpreter"""
+
+    def __init__(self, source, interpreter, queue_size=1, on_result=None, gate=None):
+        self.source = source
+        self.interpreter = interpreter
+        self.preprocessor = InputPreprocessor(interpreter)
+        self.output_index = interpreter.get_output_details()[0]['index']
+        self.queue = LatestFrameQueue(queue_size)
+        self.stats = PipelineStats()
+        self.on_result = on_result
+        self.gate = gate
+        self._stop = threading.Event()
+        self._threads = []
+        self.error = None
+
+    def _capture_loop(self):
+        seq = 0
+        try:
+            while not self._stop.is_set():
+                item = self.source.read()
+                if item is None:
+                    break
+                frame, capture_ts = item
+                self.queue.put(Frame(seq, frame, capture_ts))
+                self.stats.captured += 1
+                seq += 1
+        except Exception as e:
+            self.error = e
+        finally:
+            self.queue.close()
+
+    def classify(self, frame):
+        """Run one frame through preprocess + invoke, return (class_id, score)"""
+        self.preprocessor.load(frame.data)
+        self.interpreter.invoke()
+        scores = self.interpreter.get_tensor(self.output_index)[0]
+        class_id = int(np.argmax(scores))
+        return class_id, float(scores[class_id])
+
+    def _inference_loop(self):
+        try:
+            while not self._stop.is_set():
+                frame = self.queue.get(timeout=0.5)
+                if frame is None:
+                    if self.queue.closed:
+                        break
+                    continue
+                if self.gate is None:
+                    class_id, score = self.classify(frame)
+                elif self.gate.check(frame.data):
+                    class_id, score = self.classify(frame)
+                    self.gate.update((class_id, score))
+                else:
+                    class_id, score = self.gate.last_result
+                latency_ms = (time.monotonic() - frame.capture_ts) * 1000
+                self.stats.record(latency_ms)
+                if self.on_result:
+                    self.on_result(frame, class_id, score, latency_ms)
+        except Exception as e:
+            # Take capture down too: running() must not outlive inference
+            self.error = e
+            self._stop.set()
+            self.queue.close()
+
+    def start(self):
+        self.stats = PipelineStats()
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name="capture", daemon=True),
+            threading.Thread(target=self._inference_loop, name="inference", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self.queue.close()
+        for thread in self._threads:
+            thread.join(timeout=5)
+
+    def running(self):
+        return any(thread.is_alive() for thread in self._threads)
+
+    def summary(self):
+        summary = self.stats.summary(dropped=self.queue.dropped)
+        if self.gate is not None:
+            summary["scene_gate"] = self.gate.metrics()
+        return summary
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Camera -> TFLite classification pipeline")
+    parser.add_argument("--source", default="v4l2:/dev/video0",
+                        help="v4l2:/dev/videoN, dir:/path/to/images or video:/path/file.mp4")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--labels", default=LABELS_PATH)
+    parser.add_argument("--threads", type=int, default=2, help="TFLite num_threads")
+    parser.add_argument("--fps", type=float, default=None, help="pace file sources")
+    parser.add_argument("--loop", action="store_true", help="loop file sources")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--queue-size", type=int, default=1)
+    parser.add_argument("--gate", choices=["diff", "phash"], default=None,
+                        help="skip inference while the scene is unchanged")
+    parser.add_argument("--gate-threshold", type=float, default=None,
+                        help="diff: mean gray-level delta, phash: differing bits")
+    parser.add_argument("--refresh-frames", type=int, default=30,
+                        help="force inference after N skipped frames (0 = never)")
+    parser.add_argument("--refresh-seconds", type=float, default=10.0,
+                        help="force inference after N seconds (0 = never)")
+    parser.add_argument("--duration", type=float, default=None, help="stop after N seconds")
+    parser.add_argument("--report-every", type=float, default=5.0)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    import tflite_runtime.interpreter as tflite
+
+    interpreter = tflite.Interpreter(model_path=args.model, num_threads=args.threads)
+    interpreter.allocate_tensors()
+    with open(args.labels, "r") as f:
+        labels = [line.strip() for line in f.readlines()]
+
+    # Pool must outlive queued frames + the one being classified
+    source = open_source(args.source, fps=args.fps, loop=args.loop,
+                         width=args.width, height=args.height,
+                         pool_size=args.queue_size + 3)
+
+    gate = None
+    if args.gate:
+        # Audits only care whether the top-1 class still matches
+        gate = SceneGate(args.gate, args.gate_threshold,
+                         refresh_frames=args.refresh_frames,
+                         refresh_seconds=args.refresh_seconds,
+                         same_result=lambda a, b: a[0] == b[0])
+
+    latest = {}
+    def on_result(frame, class_id, score, latency_ms):
+        latest.update(seq=frame.seq, label=labels[class_id] if class_id < len(labels)
+                      else str(class_id), score=score, latency_ms=latency_ms)
+
+    print("📷" * 30)
+    print(f"   REAL-TIME CLASSIFICATION - {args.source}")
+    print("📷" * 30)
+
+    with source:
+        pipeline = ClassificationPipeline(source, interpreter, args.queue_size, on_result, gate)
+        pipeline.start()
+        deadline = time.monotonic() + args.duration if args.duration else None
+        next_report = time.monotonic() + args.report_every
+        try:
+            while pipeline.running():
+                time.sleep(0.1)
+                now = time.monotonic()
+                if deadline and now >= deadline:
+                    break
+                if now >= next_report and latest:
+                    s = pipeline.summary()
+                    skip = f"| skip {s['scene_gate']['skip_rate']:4.0%} " if gate else ""
+                    print(f"🎯 #{latest['seq']:<6d} {latest['label']:25s} "
+                          f"| {s['inference_fps']:5.1f} fps {skip}"
+                          f"| e2e p50 {s['latency_ms']['p50']:6.1f}ms "
+                          f"| dropped {s['dropped']}")
+                    next_report = now + args.report_every
+        except KeyboardInterrupt:
+            pass
+        finally:
+            pipeline.stop()
+
+    if pipeline.error:
+        print(f"❌ Pipeline error: {pipeline.error}", file=sys.stderr)
+    print(json.dumps(pipeline.summary(), indent=2))
+    return 1 if pipeline.error else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+Frame sources for the camera pipeline
+- V4L2Source: /dev/videoN capture with mmap buffers (raw ioctl, no OpenCV)
+- DirectorySource: replays .npy/.png/.jpg files (works off-target)
+- VideoFileSource: video files through OpenCV, if installed
+
+Every source returns (frame, capture_ts) from read(), where frame is an
+HxWx3 uint8 RGB array and capture_ts is time.monotonic() at capture.
+read() returns None when the source is exhausted.
+"""
+
+import ctypes
+import fcntl
+import mmap
+import os
+import select
+import time
+
+import numpy as np
+
+IMAGE_EXTENSIONS = (".npy", ".png", ".jpg", ".jpeg", ".bmp", ".ppm")
+
+# === V4L2 ioctl plumbing ===
+_IOC_WRITE = 1
+_IOC_READ = 2
+
+def _IOC(direction, nr, size):
+    return (direction << 30) | (size << 16) | (ord('V') << 8) | nr
+
+class v4l2_pix_format(ctypes.Structure):
+    _fields_ = [
+        ("width", ctypes.c_uint32),
+        ("height", ctypes.c_uint32),
+        ("pixelformat", ctypes.c_uint32),
+        ("field", ctypes.c_uint32),
+        ("bytesperline", ctypes.c_uint32),
+        ("sizeimage", ctypes.c_uint32),
+        ("colorspace", ctypes.c_uint32),
+        ("priv", ctypes.c_uint32),
+        ("flags", ctypes.c_uint32),
+        ("ycbcr_enc", ctypes.c_uint32),
+        ("quantization", ctypes.c_uint32),
+        ("xfer_func", ctypes.c_uint32),
+    ]
+
+class _v4l2_format_union(ctypes.Union):
+    # Kernel union holds pointers (v4l2_window), hence the 8-byte alignment
+    _fields_ = [
+        ("pix", v4l2_pix_format),
+        ("raw_data", ctypes.c_uint8 * 200),
+        ("_align", ctypes.c_void_p),
+    ]
+
+class v4l2_format(ctypes.Structure):
+    _fields_ = [
+        ("type", ctypes.c_uint32),
+        ("fmt", _v4l2_format_union),
+    ]
+
+class v4l2_requestbuffers(ctypes.Structure):
+    _fields_ = [
+        ("count", ctypes.c_uint32),
+        ("type", ctypes.c_uint32),
+        ("memory", ctypes.c_uint32),
+        ("capabilities", ctypes.c_uint32),
+        ("flags", ctypes.c_uint8),
+        ("reserved", ctypes.c_uint8 * 3),
+    ]
+
+class v4l2_timecode(ctypes.Structure):
+    _fields_ = [
+        ("type", ctypes.c_uint32),
+        ("flags", ctypes.c_uint32),
+        ("frames", ctypes.c_uint8),
+        ("seconds", ctypes.c_uint8),
+        ("minutes", ctypes.c_uint8),
+        ("hours", ctypes.c_uint8),
+        ("userbits", ctypes.c_uint8 * 4),
+    ]
+
+class timeval(ctypes.Structure):
+    _fields_ = [("tv_sec", ctypes.c_long), ("tv_usec", ctypes.c_long)]
+
+class _v4l2_buffer_m(ctypes.Union):
+    _fields_ = [
+        ("offset", ctypes.c_uint32),
+        ("userptr", ctypes.c_ulong),
+        ("planes", ctypes.c_void_p),
+        ("fd", ctypes.c_int32),
+    ]
+
+class v4l2_buffer(ctypes.Structure):
+    _fields_ = [
+        ("index", ctypes.c_uint32),
+        ("type", ctypes.c_uint32),
+        ("bytesused", ctypes.c_uint32),
+        ("flags", ctypes.c_uint32),
+        ("field", ctypes.c_uint32),
+        ("timestamp", timeval),
+        ("timecode", v4l2_timecode),
+        ("sequence", ctypes.c_uint32),
+        ("memory", ctypes.c_uint32),
+        ("m", _v4l2_buffer_m),
+        ("length", ctypes.c_uint32),
+        ("reserved2", ctypes.c_uint32),
+        ("request_fd", ctypes.c_int32),
+    ]
+
+VIDIOC_S_FMT = _IOC(_IOC_READ | _IOC_WRITE, 5, ctypes.sizeof(v4l2_format))
+VIDIOC_REQBUFS = _IOC(_IOC_READ | _IOC_WRITE, 8, ctypes.sizeof(v4l2_requestbuffers))
+VIDIOC_QUERYBUF = _IOC(_IOC_READ | _IOC_WRITE, 9, ctypes.sizeof(v4l2_buffer))
+VIDIOC_QBUF = _IOC(_IOC_READ | _IOC_WRITE, 15, ctypes.sizeof(v4l2_buffer))
+VIDIOC_DQBUF = _IOC(_IOC_READ | _IOC_WRITE, 17, ctypes.sizeof(v4l2_buffer))
+VIDIOC_STREAMON = _IOC(_IOC_WRITE, 18, ctypes.sizeof(ctypes.c_int))
+VIDIOC_STREAMOFF = _IOC(_IOC_WRITE, 19, ctypes.sizeof(ctypes.c_int))
+
+V4L2_BUF_TYPE_VIDEO_CAPTURE = 1
+V4L2_MEMORY_MMAP = 1
+V4L2_FIELD_NONE = 1
+V4L2_PIX_FMT_YUYV = int.from_bytes(b"YUYV", "little")
+
+# === YUYV -> RGB ===
+class YUYVConverter:
+    """BT.601 YUYV 4:2:2 -> RGB with preallocated int32 work buffers"""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self._c = np.empty((height, width), dtype=np.int32)
+        self._d = np.empty((height, width), dtype=np.int32)
+        self._e = np.empty((height, width), dtype=np.int32)
+        self._acc = np.empty((height, width), dtype=np.int32)
+        self._tmp = np.empty((height, width), dtype=np.int32)
+
+    def convert(self, raw, out):
+        """raw: flat YUYV bytes view, out: HxWx3 uint8 destination"""
+        yuyv = raw[:self.width * self.height * 2].reshape(self.height, self.width * 2)
+        c, d, e, acc, tmp = self._c, self._d, self._e, self._acc, self._tmp
+
+        # dtype=int32: the uint8 loop would wrap Y < 16 and U, V < 128
+        np.subtract(yuyv[:, 0::2], 16, out=c, dtype=np.int32)
+        np.multiply(c, 298, out=c)
+        np.subtract(yuyv[:, 1::4, None], 128, out=d.reshape(self.height, -1, 2), dtype=np.int32)
+        np.subtract(yuyv[:, 3::4, None], 128, out=e.reshape(self.height, -1, 2), dtype=np.int32)
+
+        for channel, d_gain, e_gain in ((0, 0, 409), (1, -100, -208), (2, 516, 0)):
+            np.add(c, 128, out=acc)
+            if d_gain:
+                np.multiply(d, d_gain, out=tmp)
+                acc += tmp
+            if e_gain:
+                np.multiply(e, e_gain, out=tmp)
+                acc += tmp
+            np.right_shift(acc, 8, out=acc)
+            np.clip(acc, 0, 255, out=acc)
+            out[:, :, channel] = acc
+        return out
+
+# === Sources ===
+class FrameSource:
+    """Base class: context manager + read() -> (frame, capture_ts) | None"""
+
+    def open(self):
+        return self
+
+    def read(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
+
+class V4L2Source(FrameSource):
+    """Capture YUYV frames from a V4L2 device through mmap'd driver buffers
+
+    Converted RGB frames come from a rotating pool of pool_size arrays, so
+    a frame stays valid until pool_size more frames have been read. Size
+    the pool to cover frames queued + frames being processed.
+    """
+
+    def __init__(self, device="/dev/video0", width=640, height=480,
+                 buffers=4, pool_size=4, timeout=2.0):
+        self.device = device
+        self.width = width
+        self.height = height
+        self.buffer_count = buffers
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.fd = None
+        self._maps = []
+        self._pool = []
+        self._next = 0
+        self._converter = None
+        self.sequence = -1
+        self.driver_drops = 0
+
+    def open(self):
+        self.fd = os.open(self.device, os.O_RDWR | os.O_NONBLOCK)
+        try:
+            self._configure()
+        except OSError:
+            self.close()
+            raise
+        return self
+
+    def _configure(self):
+        fmt = v4l2_format()
+        fmt.type = V4L2_BUF_TYPE_VIDEO_CAPTURE
+        fmt.fmt.pix.width = self.width
+        fmt.fmt.pix.height = self.height
+        fmt.fmt.pix.pixelformat = V4L2_PIX_FMT_YUYV
+        fmt.fmt.pix.field = V4L2_FIELD_NONE
+        fcntl.ioctl(self.fd, VIDIOC_S_FMT, fmt)
+        if fmt.fmt.pix.pixelformat != V4L2_PIX_FMT_YUYV:
+            raise OSError(f"{self.device} does not support YUYV capture")
+        # Driver may round to the nearest supported size
+        self.width = fmt.fmt.pix.width
+        self.height = fmt.fmt.pix.height
+
+        req = v4l2_requestbuffers()
+        req.count = self.buffer_count
+        req.type = V4L2_BUF_TYPE_VIDEO_CAPTURE
+        req.memory = V4L2_MEMORY_MMAP
+        fcntl.ioctl(self.fd, VIDIOC_REQBUFS, req)
+
+        for index in range(req.count):
+            buf = self._buffer(index)
+            fcntl.ioctl(self.fd, VIDIOC_QUERYBUF, buf)
+            mm = mmap.mmap(self.fd, buf.length, mmap.MAP_SHARED,
+                           mmap.PROT_READ | mmap.PROT_WRITE, offset=buf.m.offset)
+            self._maps.append(mm)
+            fcntl.ioctl(self.fd, VIDIOC_QBUF, buf)
+
+        self._converter = YUYVConverter(self.width, self.height)
+        self._pool = [np.empty((self.height, self.width, 3), dtype=np.uint8)
+                      for _ in range(self.pool_size)]
+        fcntl.ioctl(self.fd, VIDIOC_STREAMON, ctypes.c_int(V4L2_BUF_TYPE_VIDEO_CAPTURE))
+
+    def _buffer(self, index=0):
+        buf = v4l2_buffer()
+        buf.index = index
+        buf.type = V4L2_BUF_TYPE_VIDEO_CAPTURE
+        buf.memory = V4L2_MEMORY_MMAP
+        return buf
+
+    def read(self):
+        ready, _, _ = select.select([self.fd], [], [], self.timeout)
+        if not ready:
+            raise TimeoutError(f"No frame from {self.device} in {self.timeout}s")
+
+        buf = self._buffer()
+        fcntl.ioctl(self.fd, VIDIOC_DQBUF, buf)
+        capture_ts = time.monotonic()
+        if self.sequence >= 0 and buf.sequence > self.sequence + 1:
+            self.driver_drops += buf.sequence - self.sequence - 1
+        self.sequence = buf.sequence
+
+        try:
+            raw = np.frombuffer(self._maps[buf.index], dtype=np.uint8, count=buf.bytesused)
+            out = self._pool[self._next]
+            self._next = (self._next + 1) % len(self._pool)
+            self._converter.convert(raw, out)
+            del raw  # release the mmap export before the driver refills it
+        finally:
+            fcntl.ioctl(self.fd, VIDIOC_QBUF, buf)
+        return out, capture_ts
+
+    def close(self):
+        if self.fd is None:
+            return
+        try:
+            fcntl.ioctl(self.fd, VIDIOC_STREAMOFF, ctypes.c_int(V4L2_BUF_TYPE_VIDEO_CAPTURE))
+        except OSError:
+            pass
+        for mm in self._maps:
+            mm.close()
+        self._maps = []
+        os.close(self.fd)
+        self.fd = None
+
+class DirectorySource(FrameSource):
+    """Replay image files from a directory, optionally paced to a frame rate"""
+
+    def __init__(self, path, fps=None, loop=False):
+        self.path = path
+        self.fps = fps
+        self.loop = loop
+        self.files = []
+        self._index = 0
+        self._next_ts = None
+
+    def open(self):
+        self.files = sorted(os.path.join(self.path, name) for name in os.listdir(self.path)
+                            if name.lower().endswith(IMAGE_EXTENSIONS))
+        if not self.files:
+            raise FileNotFoundError(f"No images in {self.path}")
+        self._index = 0
+        self._next_ts = time.monotonic()
+        return self
+
+    def _decode(self, path):
+        if path.endswith(".npy"):
+            frame = np.load(path)
+        else:
+            from PIL import Image
+            with Image.open(path) as img:
+                frame = np.asarray(img.convert("RGB"))
+        if frame.ndim == 2:
+            frame = np.repeat(frame[:, :, None], 3, axis=2)
+        return frame
+
+    def read(self):
+        if self._index >= len(self.files):
+            if not self.loop:
+                return None
+            self._index = 0
+
+        if self.fps:
+            delay = self._next_ts - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self._next_ts = max(self._next_ts, time.monotonic() - 1.0) + 1.0 / self.fps
+
+        frame = self._decode(self.files[self._index])
+        self._index += 1
+        return frame, time.monotonic()
+
+class VideoFileSource(FrameSource):
+    """Decode a video file with OpenCV (optional dependency)"""
+
+    def __init__(self, path, fps=None, loop=False):
+        self.path = path
+        self.fps = fps
+        self.loop = loop
+        self._cap = None
+        self._cv2 = None
+        self._next_ts = None
+
+    def open(self):
+        try:
+            import cv2
+        except ImportError:
+            raise RuntimeError("VideoFileSource needs OpenCV (python3-opencv)")
+        self._cv2 = cv2
+        self._cap = cv2.VideoCapture(self.path)
+        if not self._cap.isOpened():
+            raise FileNotFoundError(f"Cannot open video {self.path}")
+        self._next_ts = time.monotonic()
+        return self
+
+    def read(self):
+        ok, bgr = self._cap.read()
+        if not ok and self.loop:
+            self._cap.set(self._cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, bgr = self._cap.read()
+        if not ok:
+            return None
+
+        if self.fps:
+            delay = self._next_ts - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self._next_ts = max(self._next_ts, time.monotonic() - 1.0) + 1.0 / self.fps
+
+        return self._cv2.cvtColor(bgr, self._cv2.COLOR_BGR2RGB), time.monotonic()
+
+    def close(self):
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+
+def open_source(spec, fps=None, loop=False, width=640, height=480, pool_size=4):
+    """Build a source from 'v4l2:/dev/video0', 'dir:/path' or 'video:/file.mp4'"""
+    kind, _, target = spec.partition(":")
+    if not target:
+        # Bare path: guess from what it is
+        kind, target = ("v4l2" if spec.startswith("/dev/video")
+                        else "dir" if os.path.isdir(spec) else "video"), spec
+    if kind == "v4l2":
+        return V4L2Source(target, width=width, height=height, pool_size=pool_size)
+    if kind == "dir":
+        return DirectorySource(target, fps=fps, loop=loop)
+    if kind == "video":
+        return VideoFileSource(target, fps=fps, loop=loop)
+    raise ValueError(f"Unknown frame source '{spec}'")
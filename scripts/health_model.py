@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Learned Plant Health Model
+Scores windows of (temperature, humidity, light, soil) readings for many
+plants in ONE call - a NumPy MLP or a tiny TFLite model.
+
+Models:
+- .npz    -> MLPHealthModel (pure NumPy, trained with `train` below)
+- .tflite -> TFLiteHealthModel (one interpreter, batch dimension resized once)
+
+Usage:
+  python3 health_model.py train readings.csv --output /home/root/models/health_mlp.npz
+  python3 health_model.py score /home/root/models/health_mlp.npz readings.csv
+
+CSV columns: temp,humidity,light,soil[,plant][,label]
+"""
+
+import argparse
+import csv
+import sys
+
+import numpy as np
+
+CHANNELS = ("temp", "humidity", "light", "soil")
+LABELS = ("happy", "neutral", "sad")
+EMOJI = {"happy": "😊", "neutral": "😐", "sad": "😢"}
+FEATURES_PER_CHANNEL = 4  # last, mean, std, slope
+N_FEATURES = len(CHANNELS) * FEATURES_PER_CHANNEL
+
+def window_features(windows):
+    """(plants, samples, 4) readings -> (plants, 16) features, fully vectorized"""
+    windows = np.asarray(windows, dtype=np.float32)
+    # Lux spans 0..65k, compress it so it doesn't dominate
+    light = CHANNELS.index("light")
+    windows = windows.copy()
+    np.log1p(np.maximum(windows[:, :, light], 0), out=windows[:, :, light])
+
+    t = np.arange(windows.shape[1], dtype=np.float32)
+    t -= t.mean()
+    denom = float((t * t).sum()) or 1.0
+
+    last = windows[:, -1, :]
+    mean = windows.mean(axis=1)
+    std = windows.std(axis=1)
+    slope = np.einsum('t,ptc->pc', t, windows) / denom
+    return np.concatenate([last, mean, std, slope], axis=1)
+
+class WindowBuffer:
+    """Preallocated per-plant ring of the last `length` readings"""
+
+    def __init__(self, plants, length):
+        self.data = np.zeros((plants, length, len(CHANNELS)), dtype=np.float32)
+        self.length = length
+        self.count = 0
+        self._head = 0
+        self._order = np.arange(length)
+
+    def push(self, readings):
+        """readings: (plants, 4) - one new sample for every plant"""
+        self.data[:, self._head, :] = readings
+        self._head = (self._head + 1) % self.length
+        self.count += 1
+
+    @property
+    def full(self):
+        return self.count >= self.length
+
+    def windows(self):
+        """Oldest-to-newest windows, shape (plants, length, 4)"""
+        np.add(np.arange(self.length), self._head, out=self._order)
+        np.remainder(self._order, self.length, out=self._order)
+        return self.data.take(self._order, axis=1)
+
+def _softmax(logits):
+    logits = logits - logits.max(axis=1, keepdims=True)
+    np.exp(logits, out=logits)
+    logits /= logits.sum(axis=1, keepdims=True)
+    return logits
+
+class MLPHealthModel:
+    """One-hidden-layer ReLU MLP over window features"""
+
+    def __init__(self, w1, b1, w2, b2, feature_mean, feature_std, window):
+        self.w1 = w1.astype(np.float32)
+        self.b1 = b1.astype(np.float32)
+        self.w2 = w2.astype(np.float32)
+        self.b2 = b2.astype(np.float32)
+        self.feature_mean = feature_mean.astype(np.float32)
+        self.feature_std = feature_std.astype(np.float32)
+        self.window = int(window)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['w1'], data['b1'], data['w2'], data['b2'],
+                       data['feature_mean'], data['feature_std'], data['window'])
+
+    def save(self, path):
+        np.savez(path, w1=self.w1, b1=self.b1, w2=self.w2, b2=self.b2,
+                 feature_mean=self.feature_mean, feature_std=self.feature_std,
+                 window=np.int32(self.window))
+
+    def predict_proba(self, windows):
+        """(plants, samples, 4) -> (plants, 3) probabilities in LABELS order"""
+        x = (window_features(windows) - self.feature_mean) / self.feature_std
+        hidden = np.maximum(x @ self.w1 + self.b1, 0)
+        return _softmax(hidden @ self.w2 + self.b2)
+
+    @classmethod
+    def fit(cls, windows, labels, hidden=16, epochs=500, lr=0.05, seed=0):
+        """Full-batch gradient descent with momentum; labels are LABELS indices"""
+        rng = np.random.default_rng(seed)
+        x = window_features(windows)
+        mean = x.mean(axis=0)
+        std = x.std(axis=0) + 1e-6
+        x = (x - mean) / std
+        y = np.eye(len(LABELS), dtype=np.float32)[labels]
+
+        w1 = rng.normal(0, np.sqrt(2.0 / N_FEATURES), (N_FEATURES, hidden)).astype(np.float32)
+        b1 = np.zeros(hidden, dtype=np.float32)
+        w2 = rng.normal(0, np.sqrt(2.0 / hidden), (hidden, len(LABELS))).astype(np.float32)
+        b2 = np.zeros(len(LABELS), dtype=np.float32)
+        params = [w1, b1, w2, b2]
+        velocity = [np.zeros_like(p) for p in params]
+
+        n = len(x)
+        for _ in range(epochs):
+            h_pre = x @ w1 + b1
+            h = np.maximum(h_pre, 0)
+            probs = _softmax(h @ w2 + b2)
+            d_logits = (probs - y) / n
+            d_h = (d_logits @ w2.T) * (h_pre > 0)
+            grads = [x.T @ d_h, d_h.sum(axis=0), h.T @ d_logits, d_logits.sum(axis=0)]
+            for p, v, g in zip(params, velocity, grads):
+                v *= 0.9
+                v -= lr * g
+                p += v
+
+        return cls(w1, b1, w2, b2, mean, std, np.asarray(windows).shape[1])
+
+class TFLiteHealthModel:
+    """Tiny TFLite classifier, batched: one invoke() scores every plant
+
+    Input may be features (batch, 16) or raw windows (batch, samples, 4);
+    the batch dimension is resized once and reused for every call.
+    """
+
+    def __init__(self, model_path, batch_size=64, num_threads=1):
+        import tflite_runtime.interpreter as tflite
+
+        self.interpreter = tflite.Interpreter(model_path=model_path, num_threads=num_threads)
+        detail = self.interpreter.get_input_details()[0]
+        shape = [int(d) for d in detail['shape']]
+        self.raw_windows = len(shape) == 3
+        self.window = shape[1] if self.raw_windows else None
+        self.batch_size = batch_size
+        self.interpreter.resize_tensor_input(detail['index'], [batch_size] + shape[1:])
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.tensor(detail['index'])
+        self._output_index = self.interpreter.get_output_details()[0]['index']
+
+    def predict_proba(self, windows):
+        windows = np.asarray(windows, dtype=np.float32)
+        x = windows if self.raw_windows else window_features(windows)
+        out = np.empty((len(x), len(LABELS)), dtype=np.float32)
+        for start in range(0, len(x), self.batch_size):
+            chunk = x[start:start + self.batch_size]
+            view = self._input()
+            view[:len(chunk)] = chunk
+            view[len(chunk):] = 0
+            del view
+            self.interpreter.invoke()
+            out[start:start + len(chunk)] = \
+                self.interpreter.get_tensor(self._output_index)[:len(chunk)]
+        return out
+
+def load_health_model(path, batch_size=64):
+    if path.endswith(".tflite"):
+        return TFLiteHealthModel(path, batch_size=batch_size)
+    return MLPHealthModel.load(path)
+
+def classify(model, windows):
+    """Batch scores -> list of (emotion, emoji, confidence) per plant"""
+    probs = model.predict_proba(windows)
+    best = probs.argmax(axis=1)
+    return [(LABELS[i], EMOJI[LABELS[i]], float(probs[row, i]))
+            for row, i in enumerate(best)]
+
+# === CSV helpers ===
+def read_csv(path):
+    """Group CSV rows per plant -> {plant: (readings (N, 4), labels or None)}"""
+    series = {}
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            plant = row.get("plant", "0")
+            readings, labels = series.setdefault(plant, ([], []))
+            readings.append([float(row[c]) for c in CHANNELS])
+            labels.append(row.get("label"))
+    return {plant: (np.array(r, dtype=np.float32), l if all(l) else None)
+            for plant, (r, l) in series.items()}
+
+def sliding_windows(readings, window):
+    """(N, 4) -> (N - window + 1, window, 4) view"""
+    return np.lib.stride_tricks.sliding_window_view(readings, window, axis=0).transpose(0, 2, 1)
+
+def rule_labels(readings):
+    """Label every sample with the rule-based evaluate_plant_health()"""
+    from plant_monitor import evaluate_plant_health
+    return [evaluate_plant_health(*r)[0] for r in readings]
+
+def train(args):
+    windows, labels = [], []
+    for plant, (readings, text_labels) in read_csv(args.csv).items():
+        if text_labels is None:
+            text_labels = rule_labels(readings)
+        w = sliding_windows(readings, args.window)
+        windows.append(w)
+        # A window is labelled by its newest sample
+        labels.extend(LABELS.index(l) for l in text_labels[args.window - 1:])
+    windows = np.concatenate(windows)
+    labels = np.array(labels)
+
+    model = MLPHealthModel.fit(windows, labels, hidden=args.hidden, epochs=args.epochs)
+    accuracy = (model.predict_proba(windows).argmax(axis=1) == labels).mean()
+    model.save(args.output)
+    print(f"✅ Trained on {len(labels)} windows | train accuracy {accuracy:.1%} | saved {args.output}")
+
+def score(args):
+    model = load_health_model(args.model)
+    window = getattr(model, "window", None) or args.window
+    series = read_csv(args.csv)
+    plants = sorted(series)
+    # Score the latest window of every plant in a single batch
+    batch = np.stack([series[p][0][-window:] for p in plants])
+    for plant, (emotion, emoji, conf) in zip(plants, classify(model, batch)):
+        print(f"{emoji} plant {plant:>4s} | {emotion.upper():8s} | {conf:5.1%}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Plant health model")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("train", help="fit a NumPy MLP from a readings CSV")
+    p.add_argument("csv")
+    p.add_argument("--output", default="health_mlp.npz")
+    p.add_argument("--window", type=int, default=20)
+    p.add_argument("--hidden", type=int, default=16)
+    p.add_argument("--epochs", type=int, default=500)
+    p.set_defaults(func=train)
+
+    p = sub.add_parser("score", help="score the latest window of every plant")
+    p.add_argument("model")
+    p.add_argument("csv")
+    p.add_argument("--window", type=int, default=20)
+    p.set_defaults(func=score)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Data-driven Plant Health Rules
+Per-species threshold profiles (profiles/*.json) compiled into NumPy
+arrays and evaluated for every plant at once, with per-rule hysteresis
+bands and minimum dwell times.
+
+Only committed state TRANSITIONS are reported, so a reading hovering on a
+threshold no longer flips the emotion (and redraws the OLED) every cycle.
+
+Profile rule fields:
+  name, channel (temp|humidity|light|soil), op (< or >), threshold,
+  hysteresis (band the value must clear before the rule releases),
+  min_dwell (seconds a new state must persist before it is committed),
+  severity (default 1), suppressed_by (list of rule names)
+"""
+
+import collections
+import json
+import os
+import time
+
+import numpy as np
+
+CHANNELS = ("temp", "humidity", "light", "soil")
+EMOTIONS = ("happy", "neutral", "sad")
+EMOJI = {"happy": "😊", "neutral": "😐", "sad": "😢"}
+PROFILES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles")
+DEFAULT_PROFILE = "default"
+
+Transition = collections.namedtuple("Transition", "plant old new issues ts")
+
+def load_profile(profile=DEFAULT_PROFILE):
+    """Profile by name (profiles/<name>.json), by path, or an already-loaded dict"""
+    if isinstance(profile, dict):
+        return profile
+    path = profile if os.path.exists(profile) else os.path.join(PROFILES_DIR, f"{profile}.json")
+    with open(path, "r") as f:
+        return json.load(f)
+
+class CompiledRules:
+    """Profile rules flattened into parallel arrays (one entry per rule)"""
+
+    def __init__(self, profile):
+        profile = load_profile(profile)
+        rules = profile["rules"]
+        self.species = profile.get("species", "unknown")
+        self.names = [r["name"] for r in rules]
+        self.channel = np.array([CHANNELS.index(r["channel"]) for r in rules], dtype=np.intp)
+        for r in rules:
+            if r["op"] not in ("<", ">"):
+                raise ValueError(f"Rule '{r['name']}': op must be '<' or '>'")
+        # margin = sign * (value - threshold) > 0 means the rule fires
+        self.sign = np.array([1.0 if r["op"] == ">" else -1.0 for r in rules])
+        self.threshold = np.array([float(r["threshold"]) for r in rules])
+        self.hysteresis = np.array([float(r.get("hysteresis", 0)) for r in rules])
+        self.min_dwell = np.array([float(r.get("min_dwell", 0)) for r in rules])
+        self.severity = np.array([float(r.get("severity", 1)) for r in rules])
+
+        # suppress[i, j]: rule j being active hides rule i
+        self.suppress = np.zeros((len(rules), len(rules)), dtype=np.uint8)
+        for i, r in enumerate(rules):
+            for other in r.get("suppressed_by", []):
+                self.suppress[i, self.names.index(other)] = 1
+
+        emotion = profile.get("emotion", {})
+        self.neutral_at = float(emotion.get("neutral_at", 1))
+        self.sad_at = float(emotion.get("sad_at", 2))
+
+    def __len__(self):
+        return len(self.names)
+
+    def margins(self, values):
+        """(plants, 4) readings -> (plants, rules) signed distance past threshold"""
+        return (values[:, self.channel] - self.threshold) * self.sign
+
+    def effective(self, active):
+        """Drop rules hidden by a higher-priority active rule (e.g. dry vs NEEDS WATER)"""
+        blocked = (active.astype(np.uint8) @ self.suppress.T) > 0
+        return active & ~blocked
+
+    def emotions(self, active):
+        """(plants, rules) active mask -> (plants,) index into EMOTIONS"""
+        score = self.effective(active) @ self.severity
+        return (score >= self.neutral_at).astype(np.intp) + (score >= self.sad_at)
+
+    def issues(self, active_row):
+        return [name for name, on in zip(self.names, self.effective(active_row[None, :])[0]) if on]
+
+class RuleEngine:
+    """Stateful evaluation with hysteresis + dwell for a batch of plants"""
+
+    def __init__(self, profile=DEFAULT_PROFILE, plants=1, clock=time.monotonic):
+        self.rules = CompiledRules(profile)
+        self.plants = plants
+        self.clock = clock
+        n = len(self.rules)
+        self.state = np.zeros((plants, n), dtype=bool)
+        self.pending_since = np.full((plants, n), np.nan)
+        # -1 = not evaluated yet, so the first update reports every plant
+        self.emotion = np.full(plants, -1, dtype=np.intp)
+        self.initialized = False
+        self.changed_rules = np.zeros((plants, n), dtype=bool)
+
+    def update(self, values, now=None):
+        """Feed one (plants, 4) sample; returns list of emotion Transitions
+
+        NaN readings (e.g. faulted sensors) hold the current rule state.
+        """
+        now = self.clock() if now is None else now
+        values = np.asarray(values, dtype=np.float64).reshape(self.plants, len(CHANNELS))
+        margin = self.rules.margins(values)
+
+        enter = margin > 0
+        stay = margin >= -self.rules.hysteresis
+        candidate = np.where(self.state, stay, enter)
+        candidate = np.where(np.isnan(margin), self.state, candidate)
+
+        if not self.initialized:
+            # First sample: nothing to debounce against
+            commit = candidate != self.state
+            self.initialized = True
+        else:
+            differs = candidate != self.state
+            # A channel not sampled this round keeps its dwell timer running
+            self.pending_since[~differs & ~np.isnan(margin)] = np.nan
+            self.pending_since[differs & np.isnan(self.pending_since)] = now
+            with np.errstate(invalid="ignore"):
+                commit = differs & (now - self.pending_since >= self.rules.min_dwell)
+
+        self.state[commit] = candidate[commit]
+        self.pending_since[commit] = np.nan
+        self.changed_rules = commit
+
+        emotion = self.rules.emotions(self.state)
+        transitions = []
+        for plant in np.flatnonzero(emotion != self.emotion):
+            old = EMOTIONS[self.emotion[plant]] if self.emotion[plant] >= 0 else None
+            transitions.append(Transition(int(plant), old, EMOTIONS[emotion[plant]],
+                                          self.issues(plant), now))
+        self.emotion = emotion
+        return transitions
+
+    def issues(self, plant=0):
+        return self.rules.issues(self.state[plant])
+
+    def status(self, plant=0):
+        """(emotion, emoji, message) in the same shape as evaluate_plant_health()"""
+        return status_tuple(EMOTIONS[self.emotion[plant]], self.issues(plant))
+
+def status_tuple(emotion, issues):
+    if not issues:
+        message = "Perfect conditions!"
+    else:
+        message = ", ".join(issues[:2])
+    return emotion, EMOJI[emotion], message
+
+def evaluate_once(rules, values):
+    """Stateless evaluation (no hysteresis/dwell) -> list of (emotion, emoji, message)"""
+    values = np.atleast_2d(np.asarray(values, dtype=np.float64))
+    active = rules.margins(values) > 0
+    emotions = rules.emotions(active)
+    return [status_tuple(EMOTIONS[e], rules.issues(row)) for e, row in zip(emotions, active)]
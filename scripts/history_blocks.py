@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+"""
+Compressed Sensor History (Gorilla-style blocks)
+Long-term per-channel history as append-only compressed blocks:
+- timestamps (whole seconds, as in Gorilla) as delta-of-delta: a point
+  on the same cadence as the last costs 2 bits, a cadence change ~10
+- values XOR-ed with the previous value's float64 bits: an unchanged
+  reading costs 2 bits, a small change only its few differing bits
+- values are first rounded to the channel's resolution (e.g. 0.01 °C,
+  the BME280's own step), which leaves the float64 mantissas mostly
+  zeros, like Gorilla's integer gauges. resolution=None is lossless
+
+Unlike Gorilla's interleaved bit stream, each block is laid out in
+sections (fixed-width class codes first, then headers, then payloads),
+so every field offset is a cumsum and encode/decode is a handful of
+whole-array NumPy operations instead of a per-bit loop.
+
+Block:  header (n, window, t0, first value, resolution) + bit stream
+        [2-bit ts class x n-1][2-bit value class x n-1]
+        [12-bit own-window headers][payload fields, point by point]
+Store:  <dir>/<channel>.blk  concatenated blocks
+        <dir>/<channel>.idx  one record per block: time range, min/max,
+                             offset - queries skip blocks without decoding
+
+Usage:
+  python3 history_blocks.py bench --hours 24             # simulated adaptive day
+  python3 history_blocks.py bench --fixed 1              # a day polled at 1 Hz
+  python3 history_blocks.py bench --csv readings.csv     # bus_consumers.py export
+  python3 history_blocks.py query /home/root/history temp --last 3600
+"""
+
+import argparse
+import logging
+import os
+import struct
+import sys
+import time
+
+import numpy as np
+
+import monitor_log
+
+log = monitor_log.get("history")
+
+# Channel specs for plant_monitor.py --history; resolution in channel units
+PLANT_MONITOR_HISTORY = [
+    dict(name="temp", resolution=0.01),       # BME280 compensation step
+    dict(name="humidity", resolution=0.1),    # rules use 2 %RH hysteresis
+    dict(name="light", resolution=1.0),
+    dict(name="soil", resolution=0.1),
+]
+
+BLOCK_POINTS = 1024
+TS_UNIT_NS = 1_000_000_000  # timestamps kept in seconds
+
+_HEADER = struct.Struct("<IBBHqQd")  # n, window lead, window trail, pad, t0, first bits, resolution
+_INDEX = np.dtype([("t_first", "<i8"), ("t_last", "<i8"), ("vmin", "<f8"), ("vmax", "<f8"),
+                   ("offset", "<u8"), ("nbytes", "<u4"), ("count", "<u4")])
+
+# Delta-of-delta classes: zigzag payload bits (class 3 = two 32-bit fields)
+_TS_WIDTHS = np.array([0, 8, 20, 64])
+# Value classes: 0 = same bits, 1 = fits the block window, 2 = own window
+_OWN_HEADER_BITS = 12  # 6 bits leading zeros + 6 bits (length - 1)
+_LOW32 = np.uint64(0xFFFFFFFF)
+
+# === Bit fields ===
+def _bit_length(x):
+    """Bits needed for each uint64 (0 for 0); exact via two 32-bit halves"""
+    hi = (x >> np.uint64(32)).astype(np.float64)
+    lo = (x & _LOW32).astype(np.float64)
+    return np.where(hi > 0, 32 + np.frexp(hi)[1], np.frexp(lo)[1]).astype(np.int64)
+
+def _trailing_zeros(x):
+    lowest = x & (~x + np.uint64(1))
+    return np.where(x == 0, 64, _bit_length(lowest) - 1)
+
+def _pack(values, widths):
+    """Concatenate fields (each <= 32 bits, MSB first) into bytes"""
+    values = np.asarray(values, dtype=np.uint64).ravel()
+    widths = np.asarray(widths, dtype=np.int64).ravel()
+    keep = widths > 0
+    values, widths = values[keep], widths[keep]
+    ends = np.cumsum(widths)
+    total = int(ends[-1]) if len(ends) else 0
+    words = np.zeros(total // 64 + 2, dtype=np.uint64)
+    if total:
+        starts = ends - widths
+        word = starts >> 6
+        # k < 0: the field straddles into the next word by -k bits (at most
+        # 31). Fields never overlap, so OR-ing per word is exact
+        k = 64 - (starts & 63) - widths
+        spill = k < 0
+        hi = np.where(spill, values >> np.maximum(-k, 0).astype(np.uint64),
+                      values << np.maximum(k, 0).astype(np.uint64))
+        lo = np.where(spill, values << np.minimum(64 + k, 63).astype(np.uint64), np.uint64(0))
+        first = np.flatnonzero(np.r_[True, word[1:] != word[:-1]])
+        words[word[first]] |= np.bitwise_or.reduceat(hi, first)
+        if spill.any():
+            np.bitwise_or.at(words, word[spill] + 1, lo[spill])
+    return words.astype(">u8").tobytes()[:(total + 7) // 8], total
+
+def _words(buf):
+    """Bit stream -> big-endian 32-bit words (padded) for _unpack"""
+    padded = bytes(buf) + bytes(8 + (-len(buf)) % 4)
+    return np.frombuffer(padded, dtype=">u4").astype(np.uint64)
+
+def _unpack(words, start, widths):
+    """Read consecutive fields of the given widths (<= 32 bits) from bit `start`"""
+    widths = np.asarray(widths, dtype=np.int64)
+    offsets = start + np.cumsum(widths) - widths
+    # A field of <= 32 bits always lies inside the 64 bits starting at the
+    # 32-bit word that holds its first bit
+    k = offsets >> 5
+    window = (words[k] << np.uint64(32)) | words[k + 1]
+    shift = (64 - (offsets & 31) - widths).astype(np.uint64)
+    mask = (np.uint64(1) << widths.astype(np.uint64)) - np.uint64(1)
+    return (window >> np.minimum(shift, 63)) & mask, start + int(widths.sum())
+
+def _split64(x, width):
+    """A field of up to 64 bits as (hi, lo) fields of at most 32 bits"""
+    width = np.asarray(width, dtype=np.int64)
+    lo_w = np.minimum(width, 32)
+    hi_w = width - lo_w
+    return (x >> np.uint64(32)), x & _LOW32, hi_w, lo_w
+
+# === Block encode / decode ===
+def _zigzag(x):
+    return ((x << 1) ^ (x >> 63)).astype(np.uint64)
+
+def _unzigzag(u):
+    return (u >> np.uint64(1)).astype(np.int64) ^ -(u & np.uint64(1)).astype(np.int64)
+
+def _choose_window(lead, trail):
+    """Block-wide (lead, trail) window minimizing payload bits"""
+    if not len(lead):
+        return 64, 0
+    # Every (lead, trail) pair that occurs is a candidate; there are only a
+    # few dozen distinct values of each, so cost them all at once
+    L = np.unique(lead)[:, None, None]
+    T = np.unique(trail)[None, :, None]
+    fits = (lead >= L) & (trail >= T)
+    own_bits = _OWN_HEADER_BITS + 64 - lead - trail
+    cost = np.where(fits, 64 - L - T, own_bits).sum(axis=2)
+    i, j = np.unravel_index(np.argmin(cost), cost.shape)
+    return int(L[i, 0, 0]), int(T[0, j, 0])
+
+def encode_block(ts_ns, values, resolution=None):
+    """(int64 ns timestamps, float values) -> (bytes, index record fields)"""
+    ts = np.asarray(ts_ns, dtype=np.int64) // TS_UNIT_NS
+    x = np.asarray(values, dtype=np.float64)
+    n = len(ts)
+    if resolution:
+        x = np.round(x / resolution)
+    bits = x.view(np.uint64)
+
+    # Timestamps: delta-of-delta, first delta measured against 0
+    dod = np.diff(np.diff(ts), prepend=0)
+    zz = _zigzag(dod)
+    zbits = _bit_length(zz)
+    ts_cls = np.searchsorted(_TS_WIDTHS, zbits)
+    ts_hi, ts_lo, ts_hi_w, ts_lo_w = _split64(zz, _TS_WIDTHS[ts_cls])
+
+    # Values: XOR with the previous value's bits
+    xor = bits[1:] ^ bits[:-1]
+    nonzero = xor != 0
+    lead = 64 - _bit_length(xor)
+    trail = _trailing_zeros(xor)
+    L, T = _choose_window(lead[nonzero], trail[nonzero])
+    fits = nonzero & (lead >= L) & (trail >= T)
+    own = nonzero & ~fits
+    v_cls = np.where(own, 2, fits.astype(np.int64))
+    length = np.where(own, 64 - lead - trail, np.where(fits, 64 - L - T, 0))
+    shift = np.where(own, trail, T).astype(np.uint64)
+    v_hi, v_lo, v_hi_w, v_lo_w = _split64(np.where(nonzero, xor >> shift, 0).astype(np.uint64), length)
+    headers = (lead[own].astype(np.uint64) << np.uint64(6)) | (length[own] - 1).astype(np.uint64)
+
+    payload_values = np.stack([ts_hi, ts_lo, v_hi, v_lo], axis=1)
+    payload_widths = np.stack([ts_hi_w, ts_lo_w, v_hi_w, v_lo_w], axis=1)
+    stream, _ = _pack(np.concatenate([ts_cls, v_cls, headers, payload_values.ravel()]),
+                      np.concatenate([np.full(2 * (n - 1), 2), np.full(len(headers), _OWN_HEADER_BITS),
+                                      payload_widths.ravel()]))
+    head = _HEADER.pack(n, L, T, 0, int(ts[0]), int(bits[0]), float(resolution or 0.0))
+    vmin, vmax = (np.nanmin(values), np.nanmax(values)) if n else (np.nan, np.nan)
+    return head + stream, (int(ts[0]) * TS_UNIT_NS, int(ts[-1]) * TS_UNIT_NS, vmin, vmax)
+
+def decode_block(block):
+    """bytes -> (int64 ns timestamps, float64 values)"""
+    n, L, T, _, t0, first, resolution = _HEADER.unpack_from(block)
+    stream = _words(block[_HEADER.size:])
+    m = n - 1
+    classes, pos = _unpack(stream, 0, np.full(2 * m, 2))
+    ts_cls, v_cls = classes[:m].astype(np.int64), classes[m:].astype(np.int64)
+    own = v_cls == 2
+    headers, pos = _unpack(stream, pos, np.full(int(own.sum()), _OWN_HEADER_BITS))
+
+    lead = np.full(m, L, dtype=np.int64)
+    length = np.where(v_cls == 1, 64 - L - T, 0)
+    lead[own] = (headers >> np.uint64(6)).astype(np.int64)
+    length[own] = (headers & np.uint64(63)).astype(np.int64) + 1
+    _, _, ts_hi_w, ts_lo_w = _split64(np.zeros(m, dtype=np.uint64), _TS_WIDTHS[ts_cls])
+    _, _, v_hi_w, v_lo_w = _split64(np.zeros(m, dtype=np.uint64), length)
+    widths = np.stack([ts_hi_w, ts_lo_w, v_hi_w, v_lo_w], axis=1)
+    fields, _ = _unpack(stream, pos, widths.ravel())
+    fields = fields.reshape(m, 4)
+
+    zz = (fields[:, 0] << np.uint64(32)) | fields[:, 1]
+    deltas = np.cumsum(_unzigzag(zz))
+    ts = np.empty(n, dtype=np.int64)
+    ts[0] = t0
+    ts[1:] = t0 + np.cumsum(deltas)
+
+    shift = (64 - lead - length).astype(np.uint64)
+    xor = ((fields[:, 2] << np.uint64(32)) | fields[:, 3]) << shift
+    bits = np.empty(n, dtype=np.uint64)
+    bits[0] = first
+    bits[1:] = xor
+    values = np.bitwise_xor.accumulate(bits).view(np.float64)
+    if resolution:
+        values = values * resolution
+    return ts * TS_UNIT_NS, values
+
+# === Store ===
+class HistoryStore:
+    """Per-channel compressed history under one directory
+
+    Each channel has one open block that collects points in memory. It is
+    written out every `flush_interval` seconds (rewritten in place while
+    it grows, so a slow channel still ends up in full-size blocks) and
+    sealed at `block_points` points. A crash loses at most the points since
+    the last flush; one mid-flush can lose that channel's open block.
+    Queries see sealed blocks and the open block alike.
+
+    A failed write (disk full, read-only remount) never reaches the caller:
+    the points stay in memory and the write is retried at the next flush.
+    """
+
+    def __init__(self, path, specs=PLANT_MONITOR_HISTORY, block_points=BLOCK_POINTS,
+                 flush_interval=600.0):
+        self.path = path
+        self.block_points = block_points
+        self.flush_interval_ns = int(flush_interval * 1e9)
+        self.resolution = {s["name"]: s.get("resolution") for s in specs}
+        self.open_blocks = {name: ([], []) for name in self.resolution}
+        # (data offset, index slot) of each open block once it is on disk
+        self.written_at = dict.fromkeys(self.resolution)
+        self.dirty = set()
+        self.next_flush = None
+        self.write_failed = False  # hold off sealing until the next flush retries
+        self.write_errors = 0
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, channel, ext):
+        return os.path.join(self.path, f"{channel}.{ext}")
+
+    def append(self, names, values, ts_ns=None):
+        """One reading per channel at ts_ns (wall clock); NaN = not sampled"""
+        ts_ns = time.time_ns() if ts_ns is None else ts_ns
+        for name, value in zip(names, values):
+            if value == value and name in self.open_blocks:
+                ts, vs = self.open_blocks[name]
+                ts.append(ts_ns)
+                vs.append(value)
+                self.dirty.add(name)
+                if len(ts) >= self.block_points and not self.write_failed:
+                    self._write(name)
+        if self.next_flush is None:
+            self.next_flush = ts_ns + self.flush_interval_ns
+        elif ts_ns >= self.next_flush:
+            self.flush()
+            self.next_flush = ts_ns + self.flush_interval_ns
+
+    def flush(self):
+        self.write_failed = False
+        for name in list(self.dirty):
+            self._write(name)
+
+    def _write(self, name):
+        try:
+            self._write_block(name)
+        except OSError as e:
+            self.write_failed = True
+            self.write_errors += 1
+            monitor_log.event(log, logging.WARNING, "store_error", store="history",
+                              channel=name, error=str(e))
+
+    def _write_block(self, name):
+        ts, vs = self.open_blocks[name]
+        block, (t_first, t_last, vmin, vmax) = encode_block(ts, vs, self.resolution[name])
+        offset, slot = self.written_at[name] or (None, None)
+        with open(self._file(name, "blk"), "ab") as f:
+            end = f.tell()
+        with open(self._file(name, "blk"), "r+b") as f:
+            f.seek(end if offset is None else offset)
+            offset = f.tell()
+            f.write(block)
+            f.truncate()
+        record = np.array([(t_first, t_last, vmin, vmax, offset, len(block), len(ts))], dtype=_INDEX)
+        # Index after data: a crash in between leaves at worst an index
+        # entry for the previous size of this same block
+        with open(self._file(name, "idx"), "ab") as f:
+            slot = f.tell() // _INDEX.itemsize if slot is None else slot
+        with open(self._file(name, "idx"), "r+b") as f:
+            f.seek(slot * _INDEX.itemsize)
+            f.write(record.tobytes())
+            f.truncate()
+        if len(ts) >= self.block_points:
+            self.open_blocks[name] = ([], [])
+            self.written_at[name] = None
+        else:
+            self.written_at[name] = (offset, slot)
+        self.dirty.discard(name)
+
+    def index(self, channel):
+        """Block index records (structured array) for one channel"""
+        try:
+            with open(self._file(channel, "idx"), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return np.zeros(0, dtype=_INDEX)
+        return np.frombuffer(data[:len(data) // _INDEX.itemsize * _INDEX.itemsize], dtype=_INDEX)
+
+    def query(self, channel, start_ns=None, end_ns=None, vmin=None, vmax=None):
+        """(ts_ns, values) in [start_ns, end_ns]; vmin/vmax skip whole blocks
+        whose range cannot contain a matching value (points are not filtered)"""
+        start_ns = np.iinfo(np.int64).min if start_ns is None else start_ns
+        end_ns = np.iinfo(np.int64).max if end_ns is None else end_ns
+        idx = self.index(channel)
+        keep = (idx["t_last"] >= start_ns) & (idx["t_first"] <= end_ns)
+        if vmin is not None:
+            keep &= idx["vmax"] >= vmin
+        if vmax is not None:
+            keep &= idx["vmin"] <= vmax
+        if self.written_at.get(channel):
+            keep[self.written_at[channel][1]] = False  # served from memory below
+        parts = []
+        if keep.any():
+            with open(self._file(channel, "blk"), "rb") as f:
+                for rec in idx[keep]:
+                    f.seek(int(rec["offset"]))
+                    parts.append(decode_block(f.read(int(rec["nbytes"]))))
+        ts, vs = self.open_blocks.get(channel, ([], []))
+        if ts:
+            parts.append(decode_block(encode_block(ts, vs, self.resolution[channel])[0]))
+        if not parts:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        ts = np.concatenate([p[0] for p in parts])
+        vs = np.concatenate([p[1] for p in parts])
+        inside = (ts >= start_ns) & (ts <= end_ns)
+        return ts[inside], vs[inside]
+
+    def close(self):
+        self.flush()
+
+# === Benchmark ===
+def _simulated_day(hours, fixed=None):
+    """Governor-scheduled timestamps (with a few ms of wake-up jitter) per channel"""
+    import sampling
+    sample = sampling.simulate_day(hours)
+    if fixed:
+        gov = sampling.SamplingGovernor.fixed(
+            [s["name"] for s in sampling.PLANT_MONITOR_SAMPLING], fixed, now=0.0)
+    else:
+        gov = sampling.SamplingGovernor(sampling.PLANT_MONITOR_SAMPLING, now=0.0)
+    rng = np.random.default_rng(1)
+    series = {s["name"]: ([], []) for s in PLANT_MONITOR_HISTORY}
+    names = [s["name"] for s in PLANT_MONITOR_HISTORY]
+    t, end, epoch = 0.0, hours * 3600, time.time_ns()
+    while t < end:
+        due = gov.due(t)
+        x = sample(t)
+        # soil_raw -> % with the default full-range calibration
+        x[3] = 100 - x[3] / 1023 * 100
+        ts_ns = epoch + int((t + abs(rng.normal(0, 0.002))) * 1e9)
+        for i in np.flatnonzero(due):
+            series[names[i]][0].append(ts_ns)
+            series[names[i]][1].append(x[i])
+        gov.update(np.where(due, sample(t), np.nan), due, t)
+        t = gov.next_wakeup()
+    return series
+
+def _csv_series(path):
+    import csv
+    series = {s["name"]: ([], []) for s in PLANT_MONITOR_HISTORY}
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            for name, (ts, vs) in series.items():
+                ts.append(int(row["ts_ns"]))
+                vs.append(float(row[name]))
+    return series
+
+def bench(series, block_points):
+    resolution = {s["name"]: s["resolution"] for s in PLANT_MONITOR_HISTORY}
+    total_raw = total_blk = 0
+    print(f"{'channel':9s} {'points':>7s} {'raw':>9s} {'blocks':>9s} {'ratio':>6s} {'bits/pt':>7s} "
+          f"{'encode':>8s} {'decode':>8s} {'max err':>9s}")
+    for name, (ts, vs) in series.items():
+        ts, vs = np.array(ts, dtype=np.int64), np.array(vs)
+        if not len(ts):
+            continue
+        raw = len(ts) * 16  # int64 ns + float64
+        start = time.perf_counter()
+        blocks = [encode_block(ts[i:i + block_points], vs[i:i + block_points], resolution[name])[0]
+                  for i in range(0, len(ts), block_points)]
+        encode_s = time.perf_counter() - start
+        start = time.perf_counter()
+        decoded = [decode_block(b) for b in blocks]
+        decode_s = time.perf_counter() - start
+        got_ts = np.concatenate([d[0] for d in decoded])
+        got = np.concatenate([d[1] for d in decoded])
+        assert np.array_equal(got_ts, ts // TS_UNIT_NS * TS_UNIT_NS), f"{name}: timestamps differ"
+        size = sum(len(b) for b in blocks) + len(blocks) * _INDEX.itemsize
+        total_raw += raw
+        total_blk += size
+        print(f"{name:9s} {len(ts):7d} {raw:9d} {size:9d} {raw / size:5.1f}x {size * 8 / len(ts):7.2f} "
+              f"{encode_s * 1000:6.1f}ms {decode_s * 1000:6.1f}ms {np.abs(got - vs).max():9.2g}")
+    print(f"⚡ total {total_raw} -> {total_blk} bytes ({total_raw / total_blk:.1f}x smaller than raw int64+float64)")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gorilla-style compressed sensor history")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("bench", help="compression ratio and encode/decode speed")
+    p.add_argument("--hours", type=float, default=24.0, help="simulated day length")
+    p.add_argument("--fixed", type=float, metavar="SECONDS",
+                   help="simulate fixed-period polling instead of adaptive")
+    p.add_argument("--csv", help="recorded readings (bus_consumers.py export) instead")
+    p.add_argument("--block-points", type=int, default=BLOCK_POINTS)
+    p = sub.add_parser("query", help="print a channel's recent history")
+    p.add_argument("path")
+    p.add_argument("channel")
+    p.add_argument("--last", type=float, default=3600, help="seconds back from now")
+    args = parser.parse_args(argv)
+
+    if args.command == "bench":
+        series = _csv_series(args.csv) if args.csv else _simulated_day(args.hours, args.fixed)
+        bench(series, args.block_points)
+    else:
+        store = HistoryStore(args.path)
+        idx = store.index(args.channel)
+        ts, values = store.query(args.channel, start_ns=time.time_ns() - int(args.last * 1e9))
+        print(f"📚 {args.channel}: {len(idx)} blocks, {int(idx['count'].sum())} points stored")
+        for t, v in zip(ts, values):
+            print(f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(t / 1e9))} {v:.3f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+I2C Bus Discovery
+Finds what is on /dev/i2c-N and what it is:
+- probes with an SMBus quick write (address + R/W bit, no data) where the
+  adapter supports it, like i2cdetect; a 1-byte read only for the EEPROM
+  ranges (0x30-0x37, 0x50-0x5F) a quick write can disturb
+- fingerprints known parts: Bosch chip ID register 0xD0 (BME280 0x60,
+  BMP280 0x56-0x58, BME680 0x61), BH1750 (no ID register: acks its
+  power-on opcode and returns a 2-byte measurement), SSD1306 (status byte
+  read; SH1106 reports a different low nibble)
+- caches the topology as JSON, so at boot plant_monitor.py only re-checks
+  the cached devices (a handful of transactions) and rescans the whole
+  bus when that check fails or a device it needs is missing
+
+Usage:
+  python3 i2c_discovery.py scan            # probe + fingerprint, print a grid
+  python3 i2c_discovery.py scan --save     # ... and refresh the cache
+  python3 i2c_discovery.py show            # cached topology, verified against the bus
+"""
+
+import argparse
+import errno
+import json
+import os
+import struct
+import sys
+import time
+
+import bus_trace
+
+BUS = "/dev/i2c-1"
+TOPOLOGY_PATH = "/var/lib/homeai/i2c_topology.json"
+VERSION = 1
+
+# i2c-dev ioctls (linux/i2c-dev.h, linux/i2c.h)
+I2C_SLAVE = bus_trace.I2C_SLAVE
+I2C_FUNCS = bus_trace.I2C_FUNCS
+I2C_SMBUS = bus_trace.I2C_SMBUS
+I2C_FUNC_SMBUS_QUICK = 0x00010000
+I2C_SMBUS_WRITE = 0
+I2C_SMBUS_QUICK = 0
+# struct i2c_smbus_ioctl_data: read_write, command, size, data pointer (NULL for quick)
+_SMBUS_QUICK_WRITE = struct.pack("BBIP", I2C_SMBUS_WRITE, 0, I2C_SMBUS_QUICK, 0)
+
+FIRST, LAST = 0x08, 0x77  # 0x00-0x07 and 0x78-0x7F are reserved addresses
+READ_PROBE = set(range(0x30, 0x38)) | set(range(0x50, 0x60))
+
+BOSCH_IDS = {0x60: "bme280", 0x56: "bmp280", 0x57: "bmp280", 0x58: "bmp280", 0x61: "bme680"}
+
+# Roles plant_monitor.py drives -> parts that can fill them
+MONITOR_ROLES = {"oled": ("ssd1306", "sh1106"), "bme280": ("bme280",), "bh1750": ("bh1750",)}
+
+# === Probing ===
+def functionality(bus, fd):
+    buf = bytearray(struct.calcsize("L"))
+    try:
+        bus.ioctl(fd, I2C_FUNCS, buf)
+    except OSError:
+        return 0
+    return struct.unpack("L", buf)[0]
+
+def probe(bus, fd, addr, quick=True):
+    """-> True (acked), False (no device) or "busy" (claimed by a kernel driver)"""
+    try:
+        bus.ioctl(fd, I2C_SLAVE, addr)
+    except OSError as e:
+        if e.errno == errno.EBUSY:
+            return "busy"
+        raise
+    try:
+        if quick and addr not in READ_PROBE:
+            bus.ioctl(fd, I2C_SMBUS, _SMBUS_QUICK_WRITE)
+        else:
+            bus.read(fd, 1)
+    except OSError:
+        return False
+    return True
+
+def _read_reg(bus, fd, reg, n):
+    bus.write(fd, bytes([reg]))
+    return bus.read(fd, n)
+
+def _bosch(bus, fd):
+    chip = _read_reg(bus, fd, 0xD0, 1)[0]
+    part = BOSCH_IDS.get(chip)
+    return (part, f"chip id 0x{chip:02x}") if part else None
+
+def _bh1750(bus, fd):
+    bus.write(fd, bytes([0x01]))  # power on: a plain opcode, no register pointer
+    raw = struct.unpack(">H", bus.read(fd, 2))[0]
+    return "bh1750", f"last measurement {raw / 1.2:.0f}lux"
+
+def _oled(bus, fd):
+    status = bus.read(fd, 1)[0]
+    state = "off" if status & 0x40 else "on"
+    if status & 0x0F in (0x03, 0x06):
+        return "ssd1306", f"status 0x{status:02x}, display {state}"
+    if status & 0x0F == 0x08:
+        return "sh1106", f"status 0x{status:02x}, display {state}"
+    return "ssd1306", f"status 0x{status:02x} (unrecognised, assumed compatible)"
+
+FINGERPRINTS = {0x76: _bosch, 0x77: _bosch, 0x23: _bh1750, 0x5C: _bh1750, 0x3C: _oled, 0x3D: _oled}
+
+def fingerprint(bus, fd, addr):
+    """-> (part, detail); part is None for addresses without a known fingerprint"""
+    check = FINGERPRINTS.get(addr)
+    if check is None:
+        return None, ""
+    bus.ioctl(fd, I2C_SLAVE, addr)
+    try:
+        found = check(bus, fd)
+    except OSError as e:
+        return None, f"fingerprint failed ({os.strerror(e.errno or errno.EIO)})"
+    return found if found else (None, "unrecognised")
+
+def adapter_name(bus_path=BUS):
+    """Kernel adapter name, e.g. "bcm2835 (i2c@7e804000)": a new board or overlay changes it"""
+    try:
+        with open(f"/sys/class/i2c-dev/{os.path.basename(bus_path)}/name") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+# === Topology ===
+def scan(bus_path=BUS, bus=None, first=FIRST, last=LAST):
+    """Probe every address and fingerprint the ones that answer -> topology dict"""
+    bus = bus or bus_trace.OsBus()
+    start = time.perf_counter()
+    fd = bus.open(bus_path, os.O_RDWR)
+    try:
+        quick = bool(functionality(bus, fd) & I2C_FUNC_SMBUS_QUICK)
+        devices, busy = [], []
+        for addr in range(first, last + 1):
+            found = probe(bus, fd, addr, quick)
+            if found == "busy":
+                busy.append(addr)
+            elif found:
+                part, detail = fingerprint(bus, fd, addr)
+                devices.append({"addr": addr, "part": part, "detail": detail})
+    finally:
+        bus.close(fd)
+    return {"version": VERSION, "bus": bus_path, "adapter": adapter_name(bus_path),
+            "probe": "quick" if quick else "read", "scanned": round(time.time()),
+            "scan_ms": round((time.perf_counter() - start) * 1000, 1),
+            "devices": devices, "busy": busy}
+
+def verify(topology, bus_path=BUS, bus=None):
+    """Cached devices still answer with the same fingerprint (no full scan)"""
+    if topology.get("version") != VERSION or topology.get("bus") != bus_path:
+        return False
+    if topology.get("adapter") != adapter_name(bus_path):
+        return False
+    bus = bus or bus_trace.OsBus()
+    fd = bus.open(bus_path, os.O_RDWR)
+    try:
+        for device in topology["devices"]:
+            if device["part"] is None:
+                continue  # nothing to compare; a scan would find it the same way
+            if fingerprint(bus, fd, device["addr"])[0] != device["part"]:
+                return False
+    finally:
+        bus.close(fd)
+    return True
+
+def roles(topology, wanted=MONITOR_ROLES):
+    """{role: address} for each role some discovered part fills (lowest address wins)"""
+    found = {}
+    for device in sorted(topology["devices"], key=lambda d: d["addr"]):
+        for role, parts in wanted.items():
+            if device["part"] in parts:
+                found.setdefault(role, device["addr"])
+    return found
+
+def load(path=TOPOLOGY_PATH):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save(topology, path=TOPOLOGY_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".tmp", "w") as f:
+        json.dump(topology, f, indent=1)
+    os.replace(path + ".tmp", path)
+
+def discover(path=TOPOLOGY_PATH, bus_path=BUS, bus=None, rescan=False, wanted=MONITOR_ROLES):
+    """Cached topology if it still checks out and fills every wanted role,
+    else a fresh scan (saved when the cache is writable) -> (topology, source)"""
+    topology = None if rescan else load(path)
+    if topology is not None:
+        try:
+            if verify(topology, bus_path, bus) and len(roles(topology, wanted)) == len(wanted):
+                return topology, "cache"
+        except (OSError, KeyError, TypeError):
+            pass
+    topology = scan(bus_path, bus)
+    if path:
+        try:
+            save(topology, path)
+        except OSError:
+            pass  # read-only rootfs: still usable, just scanned again next boot
+    return topology, "scan"
+
+# === CLI ===
+def print_grid(topology):
+    devices = {d["addr"]: d for d in topology["devices"]}
+    busy = set(topology["busy"])
+    print("     " + "  ".join(f"{c:x}" for c in range(16)))
+    for row in range(0, 0x80, 16):
+        cells = []
+        for addr in range(row, row + 16):
+            if addr < FIRST or addr > LAST:
+                cells.append("  ")
+            elif addr in busy:
+                cells.append("UU")
+            else:
+                cells.append(f"{addr:02x}" if addr in devices else "--")
+        print(f"{row:02x}: " + " ".join(cells))
+
+def print_devices(topology):
+    for d in topology["devices"]:
+        print(f"   0x{d['addr']:02x}  {d['part'] or '?':8s} {d['detail']}")
+    for addr in topology["busy"]:
+        print(f"   0x{addr:02x}  (in use by a kernel driver)")
+    found = roles(topology)
+    missing = [role for role in MONITOR_ROLES if role not in found]
+    print("🌱 plant_monitor: " + ", ".join(f"{role} @ 0x{addr:02x}" for role, addr in found.items())
+          + (f" | ⚠️  missing {', '.join(missing)}" if missing else ""))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="I2C bus discovery and device fingerprinting")
+    parser.add_argument("--bus", default=BUS)
+    parser.add_argument("--cache", default=TOPOLOGY_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("scan", help="probe and fingerprint every address")
+    p.add_argument("--save", action="store_true", help="write the result to the cache")
+    sub.add_parser("show", help="print the cached topology and check it against the bus")
+    args = parser.parse_args(argv)
+
+    if args.command == "scan":
+        topology = scan(args.bus)
+        print(f"🔍 {args.bus} ({topology['adapter'] or 'unknown adapter'}): "
+              f"{topology['probe']} probes, {topology['scan_ms']:.1f}ms")
+        print_grid(topology)
+        print_devices(topology)
+        if args.save:
+            save(topology, args.cache)
+            print(f"💾 Topology -> {args.cache}")
+        return 0
+
+    topology = load(args.cache)
+    if topology is None:
+        print(f"❌ No cached topology at {args.cache}")
+        return 1
+    print(f"📋 {args.cache}: scanned {time.strftime('%Y-%m-%d %H:%M', time.localtime(topology['scanned']))}")
+    print_devices(topology)
+    start = time.perf_counter()
+    ok = verify(topology, args.bus)
+    print(f"{'✅ Still valid' if ok else '⚠️  Stale (next boot rescans)'} "
+          f"({(time.perf_counter() - start) * 1000:.1f}ms check)")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
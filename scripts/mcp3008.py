@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+MCP3008 ADC driver with batched, oversampled reads
+and per-channel two-point (dry/wet) soil calibration
+
+Usage:
+  python3 mcp3008.py read --channels 0,1 --oversample 8
+  python3 mcp3008.py calibrate --channel 0
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from filters import OversampleMean
+
+CALIBRATION_PATH = "/etc/homeai/soil_calibration.json"
+RAW_MAX = 1023
+
+def open_spi(bus=0, device=0, speed_hz=1350000):
+    import spidev
+    spi = spidev.SpiDev()
+    spi.open(bus, device)
+    spi.max_speed_hz = speed_hz
+    return spi
+
+class MCP3008:
+    """Batched reads of several channels into a preallocated (channels, oversample) array"""
+
+    def __init__(self, spi, channels=range(8), oversample=1):
+        self.spi = spi
+        self.channels = list(channels)
+        self.oversample = oversample
+        # One 3-byte conversion per sample: start bit, single-ended + channel, clock-out byte
+        self._tx = [[1, (8 + ch) << 4, 0] for ch in self.channels]
+        self.samples = np.zeros((len(self.channels), oversample), dtype=np.uint16)
+        self._mean = OversampleMean(len(self.channels))
+
+    def read_raw(self):
+        """Fill and return the (channels, oversample) raw sample array"""
+        xfer = self.spi.xfer2
+        samples = self.samples
+        for i, tx in enumerate(self._tx):
+            for k in range(self.oversample):
+                rx = xfer(tx)
+                samples[i, k] = ((rx[1] & 3) << 8) | rx[2]
+        return samples
+
+    def read_mean(self):
+        """Oversampled mean per channel (float, same units as raw)"""
+        return self._mean.process(self.read_raw())
+
+class TwoPointCalibration:
+    """Per-channel linear map: dry raw -> 0 %, wet raw -> 100 %"""
+
+    def __init__(self, dry, wet):
+        self.dry = np.asarray(dry, dtype=np.float64)
+        self.wet = np.asarray(wet, dtype=np.float64)
+        span = self.dry - self.wet
+        if np.any(span == 0):
+            raise ValueError("Calibration dry and wet values must differ")
+        self._scale = 100.0 / span
+
+    @classmethod
+    def default(cls, channels=1):
+        """Uncalibrated: full ADC range, same as the old 100 - raw/1023*100"""
+        return cls([RAW_MAX] * channels, [0] * channels)
+
+    @classmethod
+    def load(cls, path=CALIBRATION_PATH, channels=(0,)):
+        """Read {"0": {"dry": 850, "wet": 390}, ...}; missing channels use defaults"""
+        data = {}
+        if path and os.path.exists(path):
+            with open(path, "r") as f:
+                data = json.load(f)
+        dry = [data.get(str(ch), {}).get("dry", RAW_MAX) for ch in channels]
+        wet = [data.get(str(ch), {}).get("wet", 0) for ch in channels]
+        return cls(dry, wet)
+
+    def percent(self, raw, out=None):
+        """Raw ADC (scalar or per-channel array) -> moisture % clipped to 0..100"""
+        result = np.subtract(self.dry, raw, out=out)
+        np.multiply(result, self._scale, out=result)
+        return np.clip(result, 0.0, 100.0, out=result)
+
+def save_calibration(channel, dry, wet, path=CALIBRATION_PATH):
+    data = {}
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            data = json.load(f)
+    data[str(channel)] = {"dry": round(float(dry), 1), "wet": round(float(wet), 1)}
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+
+def measure(adc, seconds=3.0):
+    """Average a channel for a few seconds (used for calibration points)"""
+    values = []
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        values.append(adc.read_mean()[0])
+        time.sleep(0.02)
+    return float(np.median(values)), float(np.std(values))
+
+def cmd_read(args):
+    spi = open_spi()
+    adc = MCP3008(spi, args.channels, args.oversample)
+    calibration = TwoPointCalibration.load(args.calibration, args.channels)
+    try:
+        while True:
+            raw = adc.read_mean()
+            pct = calibration.percent(raw)
+            print("\r" + " ".join(f"CH{ch}:{r:6.1f}({p:5.1f}%)"
+                                  for ch, r, p in zip(args.channels, raw, pct)), end='')
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        print("\n✅ Done")
+    finally:
+        spi.close()
+
+def cmd_calibrate(args):
+    spi = open_spi()
+    adc = MCP3008(spi, [args.channel], args.oversample)
+    try:
+        input(f"🌵 Hold the CH{args.channel} probe in DRY air, then press Enter...")
+        dry, dry_sd = measure(adc)
+        print(f"    dry raw = {dry:.1f} (±{dry_sd:.1f})")
+        input("💧 Put the probe in WATER (up to the line), then press Enter...")
+        wet, wet_sd = measure(adc)
+        print(f"    wet raw = {wet:.1f} (±{wet_sd:.1f})")
+    finally:
+        spi.close()
+    save_calibration(args.channel, dry, wet, args.calibration)
+    print(f"✅ Saved CH{args.channel} calibration to {args.calibration}")
+
+def parse_channels(text):
+    return [int(c) for c in text.split(",")]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MCP3008 reader / soil calibration")
+    parser.add_argument("--calibration", default=CALIBRATION_PATH)
+    parser.add_argument("--oversample", type=int, default=8)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("read", help="print calibrated readings")
+    p.add_argument("--channels", type=parse_channels, default=[0])
+    p.set_defaults(func=cmd_read)
+
+    p = sub.add_parser("calibrate", help="record dry/wet raw values for a probe")
+    p.add_argument("--channel", type=int, default=0)
+    p.set_defaults(func=cmd_calibrate)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
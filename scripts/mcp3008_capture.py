@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+High-rate continuous MCP3008 capture
+Tight SPI loop in a dedicated thread -> double-buffered NumPy blocks
+-> consumer thread. Reports achieved rate, timing jitter and overruns.
+
+Usage:
+  python3 mcp3008_capture.py --channels 0 --rate 2000 --duration 5 --output probe.npz
+  python3 mcp3008_capture.py --channels 0,1 --duration 10          # as fast as possible
+"""
+
+import argparse
+import collections
+import json
+import queue
+import sys
+import threading
+import time
+
+import numpy as np
+
+from mcp3008 import open_spi
+
+class CaptureStats:
+    """Running interval statistics, updated once per block by the consumer"""
+
+    def __init__(self, period_ns=0, keep=200000):
+        self.period_ns = period_ns
+        self.samples = 0
+        self.blocks = 0
+        self.first_ts = None
+        self.last_ts = None
+        self._sum = 0.0
+        self._sumsq = 0.0
+        self.max_interval_ns = 0
+        self.late = 0
+        self._recent = collections.deque(maxlen=keep)
+
+    def add_block(self, ts):
+        if self.last_ts is not None:
+            intervals = np.diff(ts, prepend=self.last_ts)
+        else:
+            intervals = np.diff(ts)
+            self.first_ts = int(ts[0])
+        self.samples += len(ts)
+        self.blocks += 1
+        self.last_ts = int(ts[-1])
+        if len(intervals):
+            f = intervals.astype(np.float64)
+            self._sum += f.sum()
+            self._sumsq += (f * f).sum()
+            self.max_interval_ns = max(self.max_interval_ns, int(intervals.max()))
+            if self.period_ns:
+                self.late += int(np.count_nonzero(intervals > 2 * self.period_ns))
+            self._recent.extend(intervals.tolist())
+
+    def summary(self, overruns=0):
+        n = max(1, self.samples - 1)
+        mean = self._sum / n
+        std = np.sqrt(max(0.0, self._sumsq / n - mean * mean))
+        elapsed = (self.last_ts - self.first_ts) / 1e9 if self.samples > 1 else 0.0
+        recent = np.array(self._recent) if self._recent else np.zeros(1)
+        p50, p99 = np.percentile(recent, [50, 99])
+        return {
+            "samples": self.samples,
+            "blocks": self.blocks,
+            "overruns": overruns,
+            "elapsed_s": round(elapsed, 3),
+            "achieved_rate_hz": round((self.samples - 1) / elapsed, 1) if elapsed else 0.0,
+            "target_rate_hz": round(1e9 / self.period_ns, 1) if self.period_ns else None,
+            "interval_us": {
+                "mean": round(mean / 1000, 2),
+                "std": round(std / 1000, 2),
+                "p50": round(p50 / 1000, 2),
+                "p99": round(p99 / 1000, 2),
+                "max": round(self.max_interval_ns / 1000, 2),
+            },
+            "late_samples": self.late,
+        }
+
+class ContinuousCapture:
+    """Capture one or more channels at a fixed (or maximum) rate
+
+    Two preallocated blocks alternate: the capture thread fills one while
+    the consumer processes the other. If the consumer still holds the other
+    block when a block completes, that block is dropped and counted as an
+    overrun (capture never blocks on the consumer).
+    on_block(values, timestamps_ns) gets (block_size, channels) uint16 and
+    (block_size,) int64 CLOCK_MONOTONIC views - copy them to keep them.
+    """
+
+    def __init__(self, spi, channels=(0,), block_size=4096, rate_hz=None, on_block=None):
+        self.spi = spi
+        self.channels = list(channels)
+        self.block_size = block_size
+        self.period_ns = int(1e9 / rate_hz) if rate_hz else 0
+        self.on_block = on_block
+        self._tx = [[1, (8 + ch) << 4, 0] for ch in self.channels]
+        self._values = np.zeros((2, block_size, len(self.channels)), dtype=np.uint16)
+        self._ts = np.zeros((2, block_size), dtype=np.int64)
+        self._free = [threading.Event(), threading.Event()]
+        for event in self._free:
+            event.set()
+        self._ready = queue.Queue()
+        self._stop = threading.Event()
+        self._threads = []
+        self.overruns = 0
+        self.stats = CaptureStats(self.period_ns)
+
+    def _capture_loop(self):
+        xfer = self.spi.xfer2
+        txs = list(enumerate(self._tx))
+        clock = time.monotonic_ns
+        sleep = time.sleep
+        period = self.period_ns
+        size = self.block_size
+        buf = 0
+        values, ts = self._values[buf], self._ts[buf]
+        i = 0
+        next_t = clock()
+
+        while not self._stop.is_set():
+            if period:
+                # Sleep coarsely, then spin for the last ~1ms
+                while True:
+                    now = clock()
+                    if now >= next_t:
+                        break
+                    if next_t - now > 2_000_000:
+                        sleep((next_t - now - 1_000_000) / 1e9)
+                next_t += period
+                if now - next_t > 100 * period:
+                    next_t = now + period  # fell far behind: resync instead of bursting
+
+            ts[i] = clock()
+            row = values[i]
+            for c, tx in txs:
+                rx = xfer(tx)
+                row[c] = ((rx[1] & 3) << 8) | rx[2]
+            i += 1
+
+            if i == size:
+                other = 1 - buf
+                if self._free[other].is_set():
+                    self._free[buf].clear()
+                    self._ready.put(buf)
+                    buf = other
+                    values, ts = self._values[buf], self._ts[buf]
+                else:
+                    self.overruns += 1
+                i = 0
+
+        # Hand over the partial last block
+        if i:
+            self._free[buf].clear()
+            self._ready.put((buf, i))
+        self._ready.put(None)
+
+    def _consumer_loop(self):
+        while True:
+            item = self._ready.get()
+            if item is None:
+                break
+            buf, count = item if isinstance(item, tuple) else (item, self.block_size)
+            values, ts = self._values[buf][:count], self._ts[buf][:count]
+            self.stats.add_block(ts)
+            if self.on_block:
+                self.on_block(values, ts)
+            self._free[buf].set()
+
+    def start(self):
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name="adc-capture", daemon=True),
+            threading.Thread(target=self._consumer_loop, name="adc-consumer", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+
+    def summary(self):
+        summary = self.stats.summary(self.overruns)
+        summary["dropped_samples"] = self.overruns * self.block_size
+        return summary
+
+def parse_channels(text):
+    return [int(c) for c in text.split(",")]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="High-rate MCP3008 capture")
+    parser.add_argument("--channels", type=parse_channels, default=[0])
+    parser.add_argument("--rate", type=float, default=None, help="samples/s (default: max)")
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--block-size", type=int, default=4096)
+    parser.add_argument("--speed-hz", type=int, default=1350000, help="SPI clock")
+    parser.add_argument("--output", help="save samples + timestamps to .npz")
+    args = parser.parse_args(argv)
+
+    spi = open_spi(speed_hz=args.speed_hz)
+    blocks = []
+
+    def keep_block(values, ts):
+        if args.output:
+            blocks.append((values.copy(), ts.copy()))
+
+    capture = ContinuousCapture(spi, args.channels, args.block_size, args.rate, keep_block)
+    rate = f"{args.rate:.0f} Hz" if args.rate else "max rate"
+    print(f"⚡ Capturing CH{args.channels} at {rate} for {args.duration}s...", file=sys.stderr)
+    capture.start()
+    try:
+        time.sleep(args.duration)
+    except KeyboardInterrupt:
+        pass
+    capture.stop()
+    spi.close()
+
+    if args.output and blocks:
+        values = np.concatenate([b[0] for b in blocks])
+        ts = np.concatenate([b[1] for b in blocks])
+        np.savez(args.output, values=values, timestamps_ns=ts,
+                 channels=np.array(args.channels))
+        print(f"💾 Saved {len(ts)} samples to {args.output}", file=sys.stderr)
+
+    print(json.dumps(capture.summary(), indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
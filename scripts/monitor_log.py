@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Structured Monitor Log
+Events (raw samples, readings, faults, emotion changes) are logged as a name plus
+fields. The sampling thread only builds a LogRecord and drops it on a
+bounded queue (a full queue drops and counts, it never blocks); a
+listener thread does all formatting and I/O for the subscribers:
+- console: the familiar emoji lines, level-filtered and rate-limited
+  per event and device (suppressed repeats are counted on the next line shown)
+- JSON lines: one compact object per event, for journald-free logging,
+  jq and replay
+
+Usage:
+  python3 plant_monitor.py --console warning --log-json /var/log/homeai/monitor.jsonl
+  python3 monitor_log.py tail /var/log/homeai/monitor.jsonl --event reading
+  python3 monitor_log.py bench
+"""
+
+import argparse
+import json
+import logging
+import logging.handlers
+import math
+import os
+import queue
+import sys
+import threading
+import time
+
+LOGGER = "homeai"
+LEVELS = {"debug": logging.DEBUG, "info": logging.INFO, "warning": logging.WARNING,
+          "error": logging.ERROR}
+
+# Console line per event, rendered on the listener thread
+CONSOLE_FORMATS = {
+    "reading": lambda f: (f"{f['emoji']} {f['emotion'].upper():8s} | "
+                          f"🌡️  {f['temp']:5.1f}°C | "
+                          f"💧 {f['humidity']:4.0f}% | "
+                          f"💡 {f['light']:6.0f}lux | "
+                          f"🌱 {f['soil']:4.0f}% | "
+                          f"{f['message']}"),
+    "fault": lambda f: f"⚠️  Sensor fault: {'; '.join(f['faults'])}",
+    "bus_error": lambda f: f"⚠️  {f['device']}: {f['error']}",
+    "bus_guard": lambda f: f"🛡️  {f['device']}: {f['state']}",
+    "store_error": lambda f: f"⚠️  {f['store']} store: {f['error']}",
+    "alert_error": lambda f: f"⚠️  Alert email failed ({f['error']}), retrying in {f['retry_s']:.0f}s",
+    "emotion": lambda f: f"{f['emoji']} Now {f['emotion'].upper()} (was {f['was'] or 'starting'})",
+    "first_reading": lambda f: (f"⏱️  First valid reading {f['ms']:.1f}ms after start "
+                                f"(device init {f['init_ms']:.1f}ms)"),
+}
+
+def get(name):
+    return logging.getLogger(f"{LOGGER}.{name}")
+
+def event(logger, level, name, **fields):
+    """Log event `name` with JSON-able fields; a no-op unless a subscriber wants `level`"""
+    if logger.isEnabledFor(level):
+        logger.log(level, name, extra={"fields": fields})
+
+class RateLimitFilter(logging.Filter):
+    """Each event at most once per `interval` s, per device (or store) for
+    events that name one (errors always pass)"""
+
+    def __init__(self, interval):
+        super().__init__()
+        self.interval = interval
+        self.last = {}
+        self.suppressed = {}
+
+    def filter(self, record):
+        if record.levelno >= logging.ERROR or self.interval <= 0:
+            return True
+        fields = getattr(record, "fields", None) or {}
+        key = (record.msg, fields.get("device", fields.get("store")))
+        if record.created - self.last.get(key, -math.inf) < self.interval:
+            self.suppressed[key] = self.suppressed.get(key, 0) + 1
+            return False
+        self.last[key] = record.created
+        record.suppressed = self.suppressed.pop(key, 0)
+        return True
+
+class ConsoleFormatter(logging.Formatter):
+    def format(self, record):
+        fields = getattr(record, "fields", None)
+        render = CONSOLE_FORMATS.get(record.msg) if fields is not None else None
+        if render is not None:
+            line = render(fields)
+        elif fields is not None:
+            line = f"{record.msg} " + " ".join(f"{k}={v}" for k, v in fields.items())
+        else:
+            line = super().format(record)
+        suppressed = getattr(record, "suppressed", 0)
+        return f"{line}  (+{suppressed} more)" if suppressed else line
+
+def _json_value(value):
+    if isinstance(value, float):
+        return None if value != value else value
+    if isinstance(value, (list, tuple)):
+        return [_json_value(v) for v in value]
+    return value
+
+class JsonFormatter(logging.Formatter):
+    """One object per line: ts, level, src, event, then the event's fields (NaN -> null)"""
+
+    def format(self, record):
+        doc = {"ts": round(record.created, 3), "level": record.levelname,
+               "src": record.name.rpartition(".")[2]}
+        fields = getattr(record, "fields", None)
+        if fields is None:
+            doc["event"] = "log"
+            doc["message"] = record.getMessage()
+        else:
+            doc["event"] = record.msg
+            for key, value in fields.items():
+                doc[key] = _json_value(value)
+        if record.exc_info:
+            doc["exc"] = self.formatException(record.exc_info)
+        return json.dumps(doc, separators=(",", ":"), ensure_ascii=False)
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Hands the raw record over (QueueHandler would format it here, on the
+    sampling thread) and drops rather than blocks when the queue is full"""
+
+    def __init__(self, q):
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class MonitorLog:
+    """Route the `homeai` loggers through a queue to the chosen subscribers"""
+
+    def __init__(self, console="info", json_path=None, console_every=10.0,
+                 stream=None, maxsize=10000):
+        handlers = []
+        if console != "off":
+            handler = logging.StreamHandler(stream or sys.stdout)
+            handler.setLevel(LEVELS[console])
+            handler.setFormatter(ConsoleFormatter())
+            handler.addFilter(RateLimitFilter(console_every))
+            handlers.append(handler)
+        if json_path:
+            if json_path == "-":
+                handler = logging.StreamHandler(sys.stdout)
+            else:
+                os.makedirs(os.path.dirname(json_path) or ".", exist_ok=True)
+                handler = logging.FileHandler(json_path)
+            handler.setLevel(logging.DEBUG)
+            handler.setFormatter(JsonFormatter())
+            handlers.append(handler)
+        self.handler = _QueueHandler(queue.Queue(maxsize))
+        root = logging.getLogger(LOGGER)
+        root.handlers[:] = [self.handler]
+        root.propagate = False
+        # Nobody listening at a level -> event() returns before building a record
+        root.setLevel(min((h.level for h in handlers), default=logging.CRITICAL + 1))
+        self.listener = logging.handlers.QueueListener(self.handler.queue, *handlers,
+                                                       respect_handler_level=True)
+        self.listener.start()
+
+    @property
+    def dropped(self):
+        return self.handler.dropped
+
+    def stop(self):
+        """Drain the queue and close the subscribers"""
+        self.listener.stop()
+        for handler in self.listener.handlers:
+            handler.close()
+
+def tail(path, events=None, follow=False):
+    with open(path) as f:
+        while True:
+            line = f.readline()
+            if not line:
+                if not follow:
+                    return
+                time.sleep(0.5)
+                continue
+            doc = json.loads(line)
+            if events and doc["event"] not in events:
+                continue
+            render = CONSOLE_FORMATS.get(doc["event"])
+            stamp = time.strftime("%H:%M:%S", time.localtime(doc["ts"]))
+            if render is not None:
+                # null came from NaN, except where a field is legitimately empty
+                for fields in (doc, {k: math.nan if v is None else v for k, v in doc.items()}):
+                    try:
+                        print(f"{stamp} {render(fields)}")
+                        break
+                    except (KeyError, TypeError, ValueError):
+                        pass
+                else:
+                    print(f"{stamp} {line.rstrip()}")
+                continue
+            print(f"{stamp} {line.rstrip()}")
+
+def bench(n=20000, drain_every=0.02, drain_bytes=4096):
+    """Per-call cost on the sampling thread: print vs event(), with stdout a
+    pipe drained like a busy journald (drain_bytes every drain_every s)"""
+    fields = dict(emoji="😊", emotion="happy", temp=22.41, humidity=51.0, light=312.0,
+                  soil=47.0, message="All conditions optimal")
+    rfd, wfd = os.pipe()
+    stop = threading.Event()
+
+    def journald():
+        while not stop.is_set():
+            time.sleep(drain_every)
+            try:
+                os.read(rfd, drain_bytes)
+            except OSError:
+                return
+    threading.Thread(target=journald, daemon=True).start()
+    pipe = os.fdopen(wfd, "w", buffering=1)
+
+    def run(step):
+        costs = []
+        for _ in range(n):
+            t0 = time.perf_counter()
+            step()
+            costs.append(time.perf_counter() - t0)
+        costs.sort()
+        return costs[n // 2] * 1e6, costs[int(n * 0.99)] * 1e6, costs[-1] * 1e3
+
+    render = CONSOLE_FORMATS["reading"]
+    results = {"print": run(lambda: print(render(fields), file=pipe))}
+    log = MonitorLog(console="info", console_every=1.0, stream=pipe)
+    logger = get("bench")
+    results["event, console 1/s"] = run(lambda: event(logger, logging.INFO, "reading", **fields))
+    log.stop()
+    log = MonitorLog(console="warning", stream=pipe)
+    results["event, console warnings only"] = run(lambda: event(logger, logging.INFO, "reading", **fields))
+    log.stop()
+    stop.set()
+    print(f"📊 {n} status lines, stdout = pipe drained {drain_bytes}B / {drain_every * 1000:.0f}ms")
+    for name, (p50, p99, worst) in results.items():
+        print(f"   {name:30s} p50 {p50:6.1f}µs | p99 {p99:7.1f}µs | max {worst:7.2f}ms")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Structured monitor log")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("tail", help="pretty-print a JSON-lines log")
+    p.add_argument("path")
+    p.add_argument("--event", action="append", default=None, help="only these events")
+    p.add_argument("-f", "--follow", action="store_true")
+    p = sub.add_parser("bench", help="sampling-thread cost of print vs queued events")
+    p.add_argument("-n", type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    if args.command == "tail":
+        try:
+            tail(args.path, args.event, args.follow)
+        except KeyboardInterrupt:
+            pass
+    else:
+        bench(args.n)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
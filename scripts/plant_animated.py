@@ -5,10 +5,13 @@ Alternates between expressive face and sensor data
 """
 
 import os
-import fcntl
 import time
 import struct
+import threading
 import spidev
+import bus_trace
+import health_rules
+import reading_cache
 from emotion_faces_fixed import HAPPY_FACE, SAD_FACE, NEUTRAL_FACE
 from oled_graphics import FONT_5x7
 from sensor_icons import ICON_TEMP, ICON_HUMIDITY, ICON_LIGHT, ICON_SOIL
@@ -22,24 +25,27 @@ spi = spidev.SpiDev()
 spi.open(0, 0)
 spi.max_speed_hz = 1350000
 
+# I2C seam (see bus_trace.py)
+i2c = bus_trace.OsBus()
+
 # === OLED Functions ===
 def oled_cmd(fd, cmd):
-    fcntl.ioctl(fd, I2C_SLAVE, OLED_ADDR)
-    os.write(fd, bytes([0x00, cmd]))
+    i2c.ioctl(fd, I2C_SLAVE, OLED_ADDR)
+    i2c.write(fd, bytes([0x00, cmd]))
 
 def oled_data(fd, data):
-    fcntl.ioctl(fd, I2C_SLAVE, OLED_ADDR)
-    os.write(fd, bytes([0x40, data]))
+    i2c.ioctl(fd, I2C_SLAVE, OLED_ADDR)
+    i2c.write(fd, bytes([0x40, data]))
 
 def init_oled(fd):
-    fcntl.ioctl(fd, I2C_SLAVE, OLED_ADDR)
+    i2c.ioctl(fd, I2C_SLAVE, OLED_ADDR)
     for cmd in [0xAE, 0xD5, 0x80, 0xA8, 0x3F, 0xD3, 0x00, 0x40,
                 0x8D, 0x14, 0x20, 0x00, 0xA1, 0xC8, 0xDA, 0x12,
                 0x81, 0xCF, 0xD9, 0xF1, 0xDB, 0x40, 0xA4, 0xA6, 0xAF]:
         oled_cmd(fd, cmd)
 
 def clear_oled(fd):
-    fcntl.ioctl(fd, I2C_SLAVE, OLED_ADDR)
+    i2c.ioctl(fd, I2C_SLAVE, OLED_ADDR)
     oled_cmd(fd, 0x21); oled_cmd(fd, 0); oled_cmd(fd, 127)
     oled_cmd(fd, 0x22); oled_cmd(fd, 0); oled_cmd(fd, 7)
     for _ in range(128 * 8):
@@ -47,7 +53,7 @@ def clear_oled(fd):
 
 def display_bitmap(fd, bitmap):
     """Display full-screen bitmap"""
-    fcntl.ioctl(fd, I2C_SLAVE, OLED_ADDR)
+    i2c.ioctl(fd, I2C_SLAVE, OLED_ADDR)
     oled_cmd(fd, 0x21); oled_cmd(fd, 0); oled_cmd(fd, 127)
     oled_cmd(fd, 0x22); oled_cmd(fd, 0); oled_cmd(fd, 7)
     for byte in bitmap:
@@ -55,7 +61,7 @@ def display_bitmap(fd, bitmap):
 
 def draw_text(fd, text, x, page):
     """Draw text at position"""
-    fcntl.ioctl(fd, I2C_SLAVE, OLED_ADDR)
+    i2c.ioctl(fd, I2C_SLAVE, OLED_ADDR)
     oled_cmd(fd, 0x21); oled_cmd(fd, x); oled_cmd(fd, 127)
     oled_cmd(fd, 0x22); oled_cmd(fd, page); oled_cmd(fd, page)
     
@@ -67,7 +73,7 @@ def draw_text(fd, text, x, page):
 
 def draw_icon(fd, icon, x, page):
     """Draw 16x16 icon"""
-    fcntl.ioctl(fd, I2C_SLAVE, OLED_ADDR)
+    i2c.ioctl(fd, I2C_SLAVE, OLED_ADDR)
     oled_cmd(fd, 0x21); oled_cmd(fd, x); oled_cmd(fd, x + 15)
     oled_cmd(fd, 0x22); oled_cmd(fd, page); oled_cmd(fd, page)
     for byte in icon:
@@ -96,7 +102,7 @@ def display_sensors(fd, temp, humidity, light, soil):
     
     # Big progress bar for soil
     bar_len = int(soil * 1.1)
-    fcntl.ioctl(fd, I2C_SLAVE, OLED_ADDR)
+    i2c.ioctl(fd, I2C_SLAVE, OLED_ADDR)
     oled_cmd(fd, 0x21); oled_cmd(fd, 70); oled_cmd(fd, 127)
     oled_cmd(fd, 0x22); oled_cmd(fd, 4); oled_cmd(fd, 5)
     for _ in range(2):  # 2 pages tall
@@ -107,20 +113,20 @@ def display_sensors(fd, temp, humidity, light, soil):
 # (Copying them here for completeness)
 
 def read_bme_byte(fd, reg):
-    fcntl.ioctl(fd, I2C_SLAVE, BME280_ADDR)
-    os.write(fd, bytes([reg]))
+    i2c.ioctl(fd, I2C_SLAVE, BME280_ADDR)
+    i2c.write(fd, bytes([reg]))
     time.sleep(0.01)
-    return ord(os.read(fd, 1))
+    return ord(i2c.read(fd, 1))
 
 def read_bme_bytes(fd, reg, length):
-    fcntl.ioctl(fd, I2C_SLAVE, BME280_ADDR)
-    os.write(fd, bytes([reg]))
+    i2c.ioctl(fd, I2C_SLAVE, BME280_ADDR)
+    i2c.write(fd, bytes([reg]))
     time.sleep(0.01)
-    return os.read(fd, length)
+    return i2c.read(fd, length)
 
 def write_bme_byte(fd, reg, value):
-    fcntl.ioctl(fd, I2C_SLAVE, BME280_ADDR)
-    os.write(fd, bytes([reg, value]))
+    i2c.ioctl(fd, I2C_SLAVE, BME280_ADDR)
+    i2c.write(fd, bytes([reg, value]))
 
 def read_bme_calibration(fd):
     cal = {}
@@ -180,15 +186,15 @@ def read_bme280_calibrated(fd, cal):
     return temperature, humidity
 
 def init_bh1750(fd):
-    fcntl.ioctl(fd, I2C_SLAVE, BH1750_ADDR)
-    os.write(fd, bytes([0x01]))
+    i2c.ioctl(fd, I2C_SLAVE, BH1750_ADDR)
+    i2c.write(fd, bytes([0x01]))
     time.sleep(0.01)
-    os.write(fd, bytes([0x10]))
+    i2c.write(fd, bytes([0x10]))
     time.sleep(0.2)
 
 def read_bh1750(fd):
-    fcntl.ioctl(fd, I2C_SLAVE, BH1750_ADDR)
-    data = os.read(fd, 2)
+    i2c.ioctl(fd, I2C_SLAVE, BH1750_ADDR)
+    data = i2c.read(fd, 2)
     raw = struct.unpack('>H', data)[0]
     return raw / 1.2
 
@@ -198,32 +204,8 @@ def read_soil_moisture():
     moisture_percent = 100 - ((data / 1023.0) * 100)
     return moisture_percent
 
-def evaluate_plant_health(temp, humidity, light, soil):
-    issues = []
-    if temp < 15:
-        issues.append("too cold")
-    elif temp > 28:
-        issues.append("too hot")
-    if humidity < 30:
-        issues.append("air dry")
-    elif humidity > 70:
-        issues.append("air humid")
-    if light < 100:
-        issues.append("dark")
-    if soil < 20:
-        issues.append("needs water!")
-    elif soil < 40:
-        issues.append("soil dry")
-    
-    if len(issues) == 0:
-        return "happy", "😊"
-    elif len(issues) == 1 or (len(issues) == 2 and "soil dry" not in issues):
-        return "neutral", "😐"
-    else:
-        return "sad", "😢"
-
 def main():
-    fd = os.open('/dev/i2c-1', os.O_RDWR)
+    fd = i2c.open('/dev/i2c-1', os.O_RDWR)
     
     print("🌱" * 30)
     print("  ANIMATED PLANT MONITOR")
@@ -232,17 +214,27 @@ def main():
     init_oled(fd)
     bme_cal = init_bme280(fd)
     init_bh1750(fd)
+    # Same profile-driven thresholds as plant_monitor.py
+    rules = health_rules.RuleEngine(health_rules.DEFAULT_PROFILE)
+
+    # Sensors are re-read only once their cached value expires, not every frame
+    cache = reading_cache.default_cache()
+    i2c_lock = threading.Lock()  # both sensors switch the slave address on one fd
+    cache.register("bme280", lambda: read_bme280_calibrated(fd, bme_cal),
+                   ("temp", "humidity"), ttl=6, lock=i2c_lock)
+    cache.register("bh1750", lambda: read_bh1750(fd), ("light",), ttl=3, lock=i2c_lock)
+    cache.register("soil", read_soil_moisture, ("soil",), ttl=30)
     print("✅ All sensors initialized\n")
     
     show_face = True  # Alternate between face and data
     
     try:
         while True:
-            # Read sensors
-            temp, humidity = read_bme280_calibrated(fd, bme_cal)
-            light = read_bh1750(fd)
-            soil = read_soil_moisture()
-            emotion, emoji = evaluate_plant_health(temp, humidity, light, soil)
+            # Latest readings (bus read only for expired ones)
+            temp, humidity, light, soil = (cache.value(name, read_through=True)
+                                           for name in health_rules.CHANNELS)
+            rules.update([[temp, humidity, light, soil]])
+            emotion, emoji, _ = rules.status()
             
             if show_face:
                 # Show big expressive face
@@ -266,7 +258,7 @@ def main():
         clear_oled(fd)
         spi.close()
     
-    os.close(fd)
+    i2c.close(fd)
 
 if __name__ == "__main__":
     main()
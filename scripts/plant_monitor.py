@@ -8,96 +8,195 @@ COMPLETE Plant Monitor - ALL SENSORS
 """
 
 import os
-import fcntl
+import argparse
+import collections
+import concurrent.futures
+import logging
 import time
 import struct
-import spidev
+
+import bus_trace
+import bus_worker
+import monitor_log
+import realtime
 
 I2C_SLAVE = 0x0703
 OLED_ADDR = 0x3C
 BME280_ADDR = 0x76
 BH1750_ADDR = 0x23
+SOIL_CHANNEL = 0
+
+# NumPy-backed processing modules, bound by load_pipeline(). main() runs it
+# on a worker thread while the sensors settle, and the OLED/I2C helpers
+# below never need it.
+np = health_rules = anomaly = filters = mcp3008 = sampling = reading_cache = None
+
+def load_pipeline():
+    global np, health_rules, anomaly, filters, mcp3008, sampling, reading_cache
+    import numpy as np
+    import health_rules
+    import anomaly
+    import filters
+    import mcp3008
+    import sampling
+    import reading_cache
+
+# Bus seams: every I2C call goes through `i2c` (os/fcntl-style) and every
+# SPI transfer through `spi`, so bus_trace.py can record or replay them
+i2c = bus_trace.OsBus()
+
+# SPI for soil sensor (opened on first use, not at import)
+spi = None
 
-# SPI for soil sensor
-spi = spidev.SpiDev()
-spi.open(0, 0)
-spi.max_speed_hz = 1350000
+def get_spi():
+    global spi
+    if spi is None:
+        import spidev
+        dev = spidev.SpiDev()
+        dev.open(0, 0)  # only cached once open, so a failed open is retried
+        dev.max_speed_hz = 1350000
+        spi = dev
+    return spi
+
+# === I2C ===
+def open_i2c(addr, bus='/dev/i2c-1'):
+    """Own fd per device: the slave address is per open file, so devices
+    on separate fds can be driven from separate threads"""
+    fd = i2c.open(bus, os.O_RDWR)
+    i2c.ioctl(fd, I2C_SLAVE, addr)
+    return fd
 
 # === OLED Functions ===
-def oled_cmd(fd, cmd):
-    fcntl.ioctl(fd, I2C_SLAVE, OLED_ADDR)
-    os.write(fd, bytes([0x00, cmd]))
+OLED_CHUNK = 32  # data bytes per write: ~3 ms of bus at 100 kHz, the longest a sensor read waits
+
+def oled_window(fd, col0, col1, page0, page1):
+    """Column/page address window, one command transaction"""
+    i2c.ioctl(fd, I2C_SLAVE, OLED_ADDR)
+    i2c.write(fd, bytes([0x00, 0x21, col0, col1, 0x22, page0, page1]))
 
-def oled_data(fd, data):
-    fcntl.ioctl(fd, I2C_SLAVE, OLED_ADDR)
-    os.write(fd, bytes([0x40, data]))
+OLED_INIT = [0xAE, 0xD5, 0x80, 0xA8, 0x3F, 0xD3, 0x00, 0x40,
+             0x8D, 0x14, 0x20, 0x00, 0xA1, 0xC8, 0xDA, 0x12,
+             0x81, 0xCF, 0xD9, 0xF1, 0xDB, 0x40, 0xA4, 0xA6, 0xAF]
 
 def init_oled(fd):
-    fcntl.ioctl(fd, I2C_SLAVE, OLED_ADDR)
-    for cmd in [0xAE, 0xD5, 0x80, 0xA8, 0x3F, 0xD3, 0x00, 0x40,
-                0x8D, 0x14, 0x20, 0x00, 0xA1, 0xC8, 0xDA, 0x12,
-                0x81, 0xCF, 0xD9, 0xF1, 0xDB, 0x40, 0xA4, 0xA6, 0xAF]:
-        oled_cmd(fd, cmd)
-        time.sleep(0.001)
+    # One I2C transaction: control byte 0x00 followed by the whole command stream
+    i2c.ioctl(fd, I2C_SLAVE, OLED_ADDR)
+    i2c.write(fd, bytes([0x00] + OLED_INIT))
 
-def clear_oled(fd):
-    fcntl.ioctl(fd, I2C_SLAVE, OLED_ADDR)
-    oled_cmd(fd, 0x21); oled_cmd(fd, 0); oled_cmd(fd, 127)
-    oled_cmd(fd, 0x22); oled_cmd(fd, 0); oled_cmd(fd, 7)
-    for _ in range(128 * 8):
-        oled_data(fd, 0x00)
-
-def draw_emotion(fd, emotion):
-    """Draw emotion face on OLED"""
-    clear_oled(fd)
-    fcntl.ioctl(fd, I2C_SLAVE, OLED_ADDR)
-    
-    # Eyes
-    oled_cmd(fd, 0x21); oled_cmd(fd, 20); oled_cmd(fd, 108)
-    oled_cmd(fd, 0x22); oled_cmd(fd, 1); oled_cmd(fd, 2)
-    for _ in range(2):
-        for i in range(88):
-            if 10 <= i <= 20 or 68 <= i <= 78:
-                oled_data(fd, 0xFF)
-            else:
-                oled_data(fd, 0x00)
-    
-    # Mouth
-    oled_cmd(fd, 0x21); oled_cmd(fd, 20); oled_cmd(fd, 108)
-    oled_cmd(fd, 0x22); oled_cmd(fd, 4); oled_cmd(fd, 5)
-    
+def compose_emotion(emotion):
+    """Face as OLED column data: (eyes for pages 1-2, mouth for pages 4-5), 176 bytes each"""
+    eyes = bytes(0xFF if 10 <= i <= 20 or 68 <= i <= 78 else 0x00 for i in range(88)) * 2
+    blank = bytes(88)
     if emotion == "happy":
-        for i in range(88):
-            oled_data(fd, 0x01 if 20 <= i <= 68 else 0x00)
-        for i in range(88):
-            oled_data(fd, 0x00)
+        mouth = bytes(0x01 if 20 <= i <= 68 else 0x00 for i in range(88)) + blank
     elif emotion == "sad":
-        for i in range(88):
-            oled_data(fd, 0x00)
-        for i in range(88):
-            oled_data(fd, 0x80 if 20 <= i <= 68 else 0x00)
+        mouth = blank + bytes(0x80 if 20 <= i <= 68 else 0x00 for i in range(88))
     else:
-        for i in range(88):
-            oled_data(fd, 0x00)
-        for i in range(88):
-            oled_data(fd, 0xFF if 30 <= i <= 58 else 0x00)
+        mouth = blank + bytes(0xFF if 30 <= i <= 58 else 0x00 for i in range(88))
+    return eyes, mouth
+
+def compose_frame(emotion):
+    """Whole screen, page by page (8 x 128 bytes), face in columns 20-107"""
+    eyes, mouth = compose_emotion(emotion)
+    frame = bytearray(8 * 128)
+    for page, data in ((1, eyes[:88]), (2, eyes[88:]), (4, mouth[:88]), (5, mouth[88:])):
+        frame[page * 128 + 20:page * 128 + 108] = data
+    return bytes(frame)
+
+def frame_chunks(frame, shown=None, chunk=OLED_CHUNK):
+    """(page, column, data) for each chunk of `frame` that differs from `shown` (all without it)"""
+    for start in range(0, len(frame), chunk):
+        data = frame[start:start + chunk]
+        if shown is None or shown[start:start + chunk] != data:
+            yield start // 128, start % 128, data
+
+def write_chunk(fd, page, col, data):
+    """One chunk: its own window, then the data in one transaction"""
+    oled_window(fd, col, col + len(data) - 1, page, page)
+    i2c.write(fd, b"\x40" + data)
+
+def flush_frame(fd, frame, shown=None):
+    """Write the chunks of `frame` that differ from `shown` -> chunks written"""
+    count = 0
+    for page, col, data in frame_chunks(frame, shown):
+        write_chunk(fd, page, col, data)
+        count += 1
+    return count
+
+def clear_oled(fd):
+    flush_frame(fd, bytes(8 * 128))
+
+def draw_emotion(fd, emotion, shown=None):
+    """Draw emotion face on OLED (only what differs from the `shown` frame) -> frame"""
+    frame = compose_frame(emotion)
+    flush_frame(fd, frame, shown)
+    return frame
+
+class Display:
+    """The OLED face. Through a bus worker every changed chunk is its own
+    display-priority job, so sensor reads overtake a redraw in progress"""
+
+    def __init__(self, fd, worker=None, ready=True):
+        self.fd = fd
+        self.worker = worker
+        self.ready = ready  # False: re-init before the next redraw
+        self.shown = None  # frame on screen once queued chunks land (None = unknown)
+        self.emotion = None
+        self.pending = []
+
+    def _lost(self):
+        self.ready = False
+        self.shown = self.emotion = None
+
+    def poll(self):
+        """-> exception of a queued job that failed since the last poll, else None"""
+        error = None
+        for future in self.pending:
+            if future.done() and future.exception() is not None:
+                error = future.exception()
+        self.pending = [f for f in self.pending if not f.done()]
+        if error is not None:
+            self._lost()
+        return error
+
+    def show(self, emotion):
+        """Redraw if `emotion` isn't up yet; inline redraws raise OSError"""
+        if emotion == self.emotion:
+            return
+        frame = compose_frame(emotion)
+        if self.worker is None:
+            try:
+                if not self.ready:
+                    init_oled(self.fd)
+                    self.ready = True
+                flush_frame(self.fd, frame, self.shown)
+            except OSError:
+                self._lost()
+                raise
+        else:
+            submit = self.worker.submit
+            if not self.ready:
+                self.pending.append(submit(bus_worker.CONTROL, init_oled, self.fd))
+                self.ready = True
+            self.pending += [submit(bus_worker.DISPLAY, write_chunk, self.fd, page, col, data)
+                             for page, col, data in frame_chunks(frame, self.shown)]
+        self.shown, self.emotion = frame, emotion
 
 # === BME280 Functions ===
+# Register reads need no settle time; only a fresh measurement does
 def read_bme_byte(fd, reg):
-    fcntl.ioctl(fd, I2C_SLAVE, BME280_ADDR)
-    os.write(fd, bytes([reg]))
-    time.sleep(0.01)
-    return ord(os.read(fd, 1))
+    i2c.ioctl(fd, I2C_SLAVE, BME280_ADDR)
+    i2c.write(fd, bytes([reg]))
+    return ord(i2c.read(fd, 1))
 
 def read_bme_bytes(fd, reg, length):
-    fcntl.ioctl(fd, I2C_SLAVE, BME280_ADDR)
-    os.write(fd, bytes([reg]))
-    time.sleep(0.01)
-    return os.read(fd, length)
+    i2c.ioctl(fd, I2C_SLAVE, BME280_ADDR)
+    i2c.write(fd, bytes([reg]))
+    return i2c.read(fd, length)
 
 def write_bme_byte(fd, reg, value):
-    fcntl.ioctl(fd, I2C_SLAVE, BME280_ADDR)
-    os.write(fd, bytes([reg, value]))
+    i2c.ioctl(fd, I2C_SLAVE, BME280_ADDR)
+    i2c.write(fd, bytes([reg, value]))
 
 def read_bme_calibration(fd):
     cal = {}
@@ -147,11 +246,16 @@ def compensate_humidity(adc_H, t_fine, cal):
     
     return (v_x1_u32r >> 12) / 1024.0
 
-def init_bme280(fd):
+def init_bme280(fd, timeout=0.05):
+    """-> calibration; timeout=0 skips waiting for the first conversion"""
     write_bme_byte(fd, 0xF2, 0x01)
     write_bme_byte(fd, 0xF4, 0x27)
-    time.sleep(0.1)
-    return read_bme_calibration(fd)
+    # Calibration NVM reads overlap the first conversion (~10 ms at 1x oversampling)
+    cal = read_bme_calibration(fd)
+    deadline = time.monotonic() + timeout
+    while read_bme_byte(fd, 0xF3) & 0x08 and time.monotonic() < deadline:
+        time.sleep(0.002)  # status.measuring
+    return cal
 
 def read_bme280_calibrated(fd, cal):
     data = read_bme_bytes(fd, 0xF7, 8)
@@ -163,113 +267,537 @@ def read_bme280_calibrated(fd, cal):
 
 # === BH1750 Functions ===
 def init_bh1750(fd):
-    fcntl.ioctl(fd, I2C_SLAVE, BH1750_ADDR)
-    os.write(fd, bytes([0x01]))
-    time.sleep(0.01)
-    os.write(fd, bytes([0x10]))
-    time.sleep(0.2)
+    i2c.ioctl(fd, I2C_SLAVE, BH1750_ADDR)
+    i2c.write(fd, bytes([0x01]))
+    # A one-time low-res conversion (24 ms max) gives a usable first reading
+    # long before the first high-res one (180 ms max)
+    i2c.write(fd, bytes([0x23]))
+    time.sleep(0.024)
+    lux = read_bh1750(fd)
+    start_bh1750(fd)
+    return lux
+
+def start_bh1750(fd):
+    """Power on into continuous high-res mode (first result after 180 ms)"""
+    i2c.ioctl(fd, I2C_SLAVE, BH1750_ADDR)
+    i2c.write(fd, bytes([0x01]))
+    i2c.write(fd, bytes([0x10]))
+    return True
 
 def read_bh1750(fd):
-    fcntl.ioctl(fd, I2C_SLAVE, BH1750_ADDR)
-    data = os.read(fd, 2)
+    i2c.ioctl(fd, I2C_SLAVE, BH1750_ADDR)
+    data = i2c.read(fd, 2)
     raw = struct.unpack('>H', data)[0]
     return raw / 1.2
 
 # === Soil Moisture Functions ===
+def read_soil_raw():
+    """Raw 10-bit MCP3008 CH0 value"""
+    adc = get_spi().xfer2([1, (8 + SOIL_CHANNEL) << 4, 0])
+    return ((adc[1] & 3) << 8) + adc[2]
+
+def soil_percent(raw, calibration=None):
+    """Raw ADC -> moisture % using the probe's dry/wet calibration (default: full range)"""
+    if calibration is None:
+        load_pipeline()
+        calibration = mcp3008.TwoPointCalibration.default()
+    return float(calibration.percent(raw)[0])
+
 def read_soil_moisture():
     """Read soil sensor via MCP3008 CH0"""
-    adc = spi.xfer2([1, (8 + 0) << 4, 0])
-    data = ((adc[1] & 3) << 8) + adc[2]
-    moisture_percent = 100 - ((data / 1023.0) * 100)
-    return moisture_percent
+    return soil_percent(read_soil_raw())
 
 # === Plant Health Logic ===
+_default_rules = None
+
 def evaluate_plant_health(temp, humidity, light, soil):
-    """Comprehensive plant health evaluation"""
-    issues = []
-    
-    if temp < 15:
-        issues.append("too cold")
-    elif temp > 28:
-        issues.append("too hot")
-    
-    if humidity < 30:
-        issues.append("air too dry")
-    elif humidity > 70:
-        issues.append("air too humid")
-    
-    if light < 100:
-        issues.append("too dark")
-    elif light > 50000:
-        issues.append("too bright")
-    
-    # SOIL is the most critical!
-    if soil < 20:
-        issues.append("🚨 NEEDS WATER!")
-    elif soil < 40:
-        issues.append("soil getting dry")
-    
-    if len(issues) == 0:
-        return "happy", "😊", "Perfect conditions!"
-    elif len(issues) == 1:
-        return "neutral", "😐", f"{issues[0]}"
-    else:
-        return "sad", "😢", f"{', '.join(issues[:2])}"
+    """Comprehensive plant health evaluation (default profile, no hysteresis)"""
+    global _default_rules
+    if _default_rules is None:
+        load_pipeline()
+        _default_rules = health_rules.CompiledRules(health_rules.DEFAULT_PROFILE)
+    return health_rules.evaluate_once(_default_rules, [temp, humidity, light, soil])[0]
+
+def cache_ttls(fixed_interval=None):
+    """A reading goes stale if its sensor misses more than one slow-poll period"""
+    load_pipeline()
+    return {name: 2 * (fixed_interval or spec["max_period"])
+            for spec, name in zip(sampling.PLANT_MONITOR_SAMPLING, health_rules.CHANNELS)}
 
-def main():
-    fd = os.open('/dev/i2c-1', os.O_RDWR)
+Step = collections.namedtuple("Step", "clean flags screened transitions emotion emoji message")
+
+class Pipeline:
+    """Per-wakeup processing shared by main() and replay.py
+
+    raw readings -> fault screening -> light/soil filters + soil calibration
+    -> latest-value cache -> health rules (hysteresis + dwell). `now` is the
+    caller's clock (monotonic live, virtual in replay).
+    """
+
+    def __init__(self, profile=None, soil_calibration=None, soil_filter="median:5,kalman:0.05:4",
+                 light_filter="ewma:0.5", ttls=None, cache=None, clock=time.monotonic):
+        load_pipeline()
+        self.clock = clock
+        self.soil_cal = mcp3008.TwoPointCalibration.load(
+            soil_calibration or mcp3008.CALIBRATION_PATH, [SOIL_CHANNEL])
+        self.soil_filter = filters.FilterPipeline.from_spec(soil_filter, channels=1)
+        self.light_filter = filters.FilterPipeline.from_spec(light_filter, channels=1)
+        # Faulty/outlier samples become NaN, which the rule engine ignores
+        self.detector = anomaly.SensorFaultDetector(anomaly.PLANT_MONITOR_CHANNELS)
+        self.rules = health_rules.RuleEngine(profile or health_rules.DEFAULT_PROFILE, clock=clock)
+        self.cache = cache if cache is not None else reading_cache.ReadingCache(
+            clock=lambda: int(self.clock() * 1e9))
+        for name, ttl in (ttls or {}).items():
+            self.cache.set_ttl(name, ttl)
+
+    def step(self, raw, now=None):
+        """One wakeup's raw readings (NaN = not sampled) -> Step"""
+        now = self.clock() if now is None else now
+        flags = self.detector.update(raw, now)
+        screened = self.detector.clean(raw, flags)
+        # Smooth the noisy channels, then calibrate soil raw -> %
+        clean = screened.copy()
+        clean[2] = self.light_filter.process(clean[2:3])[0]
+        clean[3] = soil_percent(self.soil_filter.process(clean[3:4])[0], self.soil_cal)
+        return self.evaluate(clean, now, flags, screened)
+
+    def evaluate(self, clean, now=None, flags=None, screened=None):
+        """Already-conditioned values (e.g. a readings export) -> Step"""
+        now = self.clock() if now is None else now
+        self.cache.put_many(health_rules.CHANNELS, clean, int(now * 1e9))
+        # Channels not sampled this round are NaN and hold their rule state
+        transitions = self.rules.update(clean, now)
+        emotion, emoji, message = self.rules.status()
+        return Step(clean, flags, screened, transitions, emotion, emoji, message)
+
+    def latest(self):
+        """(temp, humidity, light, soil): last good value per channel"""
+        return tuple(self.cache.value(name) for name in health_rules.CHANNELS)
+
+    def stale(self):
+        return [name for name in health_rules.CHANNELS if self.cache.stale(name)]
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Complete plant monitor")
+    # Defaults that live in NumPy-backed modules are filled in by main()
+    parser.add_argument("--profile", default=None,
+                        help="species profile name (profiles/<name>.json) or path")
+    parser.add_argument("--soil-calibration", default=None,
+                        help="dry/wet calibration JSON written by 'mcp3008.py calibrate'")
+    parser.add_argument("--oversample", type=int, default=8,
+                        help="MCP3008 conversions averaged per soil reading")
+    parser.add_argument("--soil-filter", default="median:5,kalman:0.05:4",
+                        help="filter stages for the raw soil channel ('none' to disable)")
+    parser.add_argument("--light-filter", default="ewma:0.5",
+                        help="filter stages for the light channel ('none' to disable)")
+    parser.add_argument("--health-model", default=None,
+                        help="learned health model (.npz MLP or .tflite) instead of fixed thresholds")
+    parser.add_argument("--health-window", type=int, default=20,
+                        help="readings per window fed to the health model")
+    parser.add_argument("--fixed-interval", type=float, default=None, metavar="SECONDS",
+                        help="poll every sensor at this fixed period instead of adaptively")
+    parser.add_argument("--publish", nargs="?", const=True, default=None,
+                        metavar="BUS", help="publish readings to the shared-memory readings bus")
+    parser.add_argument("--history", metavar="DIR", default=None,
+                        help="keep compressed long-term history (history_blocks.py) in DIR")
+    parser.add_argument("--db", metavar="PATH", default=None,
+                        help="also store readings in an SQLite database (readings_db.py)")
+    parser.add_argument("--db-flush", type=float, default=60.0, metavar="SECONDS",
+                        help="seconds of readings written per SQLite transaction")
+    parser.add_argument("--uplink", metavar="HOST[:PORT]", default=None,
+                        help="push readings to a fleet aggregator (fleet.py)")
+    parser.add_argument("--uplink-spool", metavar="DIR", default=None,
+                        help="store-and-forward spool for --uplink (default /var/spool/homeai/uplink)")
+    parser.add_argument("--alert-email", metavar="ADDR", action="append", default=None,
+                        help="email health-state changes here (alerts.py; repeatable)")
+    parser.add_argument("--smtp", metavar="HOST[:PORT]", default="localhost:25",
+                        help="SMTP relay for --alert-email (login from HOMEAI_SMTP_USER/_PASSWORD)")
+    parser.add_argument("--smtp-starttls", action="store_true",
+                        help="upgrade the SMTP connection with STARTTLS")
+    parser.add_argument("--alert-window", type=float, default=900.0, metavar="SECONDS",
+                        help="hold a plant flapping back into a state reported this recently")
+    parser.add_argument("--console", choices=("debug", "info", "warning", "error", "off"),
+                        default="info", help="console log level (monitor_log.py)")
+    parser.add_argument("--console-every", type=float, default=10.0, metavar="SECONDS",
+                        help="show each kind of console line at most this often")
+    parser.add_argument("--log-json", metavar="PATH", default=None,
+                        help="also log readings and events as JSON lines ('-' = stdout)")
+    parser.add_argument("--no-oled", action="store_true",
+                        help="leave the OLED to a separate display process")
+    parser.add_argument("--i2c-topology", metavar="PATH", default=None,
+                        help="cached I2C topology (default /var/lib/homeai/i2c_topology.json)")
+    parser.add_argument("--rescan-i2c", action="store_true",
+                        help="probe the whole I2C bus even if the cached topology checks out")
+    parser.add_argument("--fixed-addresses", action="store_true",
+                        help="skip I2C discovery: OLED 0x3C, BME280 0x76, BH1750 0x23")
+    parser.add_argument("--no-bus-guard", action="store_true",
+                        help="no I2C timeouts/retries/circuit breakers (bus_guard.py)")
+    parser.add_argument("--no-bus-worker", action="store_true",
+                        help="drive I2C from the loop itself instead of a prioritised bus thread")
+    parser.add_argument("--realtime", choices=("fifo", "rr"), default=None,
+                        help="run the sampling loop under SCHED_FIFO/SCHED_RR (needs root)")
+    parser.add_argument("--rt-priority", type=int, default=50,
+                        help="real-time priority (1-99) for --realtime")
+    parser.add_argument("--rt-cpu", type=int, default=None,
+                        help="pin the sampling loop to this core")
+    parser.add_argument("--mlock", action="store_true",
+                        help="lock all pages in RAM so the loop never page-faults")
+    return parser.parse_args(argv)
+
+def configure_i2c(args):
+    """Point the drivers at the addresses i2c_discovery.py found (cached
+    topology, rescanned only when stale); a missing OLED means --no-oled"""
+    global OLED_ADDR, BME280_ADDR, BH1750_ADDR
+    import i2c_discovery
+    start = time.perf_counter()
+    try:
+        topology, source = i2c_discovery.discover(args.i2c_topology or i2c_discovery.TOPOLOGY_PATH,
+                                                  bus=i2c, rescan=args.rescan_i2c)
+    except OSError as e:
+        print(f"⚠️  I2C discovery failed ({e}), using the default addresses")
+        return
+    found = i2c_discovery.roles(topology)
+    OLED_ADDR = found.get("oled", OLED_ADDR)
+    BME280_ADDR = found.get("bme280", BME280_ADDR)
+    BH1750_ADDR = found.get("bh1750", BH1750_ADDR)
+    print(f"✅ I2C topology from {source} in {(time.perf_counter() - start) * 1000:.1f}ms: "
+          f"OLED 0x{OLED_ADDR:02x}, BME280 0x{BME280_ADDR:02x}, BH1750 0x{BH1750_ADDR:02x}")
+    if "oled" not in found and not args.no_oled:
+        print("⚠️  No OLED found, running without display")
+        args.no_oled = True
+    for role in ("bme280", "bh1750"):
+        if role not in found:
+            print(f"⚠️  No {role.upper()} found, trying its default address")
+
+def init_devices(tasks):
+    """Run {name: fn} bring-up tasks concurrently -> ({name: result}, {name: seconds})
+
+    Each task sleeps through its own settle times, so they overlap; I2C and
+    SPI transfers release the GIL and run truly in parallel.
+    """
+    def timed(fn):
+        start = time.perf_counter()
+        return fn(), time.perf_counter() - start
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(tasks)) as pool:
+        futures = {name: pool.submit(timed, fn) for name, fn in tasks.items()}
+    results = {name: f.result()[0] for name, f in futures.items()}
+    timings = {name: f.result()[1] for name, f in futures.items()}
+    return results, timings
+
+def main(argv=None):
+    global i2c
+    start = time.perf_counter()
+    args = parse_args(argv)
     
     print("🌱" * 30)
     print("   COMPLETE PLANT MONITOR - ALL SENSORS")
     print("🌱" * 30)
     
     print("\nInitializing sensors...")
-    init_oled(fd)
-    print("✅ OLED Display ready")
-    
-    bme_cal = init_bme280(fd)
-    print("✅ BME280 (temp/humidity) ready")
+    if not args.fixed_addresses:
+        configure_i2c(args)
+    guard = None
+    if not args.no_bus_guard:
+        # Retries, timeouts and a circuit breaker per device: a bad OLED
+        # cable costs the sensors a bounded delay instead of the process
+        import bus_guard
+        i2c = guard = bus_guard.GuardedBus(i2c)
+    fds = {name: open_i2c(addr) for name, addr in
+           (("oled", OLED_ADDR), ("bme280", BME280_ADDR), ("bh1750", BH1750_ADDR))}
+    oled_fd, bme_fd, bh_fd = fds["oled"], fds["bme280"], fds["bh1750"]
+
+    def init_soil():
+        load_pipeline()  # waits for the import running on the "pipeline" task
+        adc = mcp3008.MCP3008(get_spi(), [SOIL_CHANNEL], oversample=args.oversample)
+        adc.read_mean()  # first conversion primes the ADC sample-and-hold
+        return adc
+
+    def init_display():
+        try:
+            init_oled(oled_fd)
+            return True
+        except OSError as e:
+            print(f"⚠️  OLED not answering ({e}), retrying at the next redraw")
+            return False
+
+    def init_sensor(name, init):
+        # A missing sensor leaves its channels NaN (faulted) and is
+        # re-initialised when next due, instead of failing the start-up
+        def task():
+            try:
+                return init()
+            except OSError as e:
+                print(f"⚠️  {name.upper()} not answering ({e}), retrying when next due")
+                return None
+        return task
+
+    tasks = {"pipeline": load_pipeline,
+             "bme280": init_sensor("bme280", lambda: init_bme280(bme_fd)),
+             "bh1750": init_sensor("bh1750", lambda: init_bh1750(bh_fd)),
+             "mcp3008": init_sensor("mcp3008", init_soil)}
+    if not args.no_oled:
+        tasks["oled"] = init_display
+    init_start = time.perf_counter()
+    devices, timings = init_devices(tasks)
+    init_total = time.perf_counter() - init_start
+    bme_cal, soil_adc = devices["bme280"], devices["mcp3008"]
+    bh_ready = devices["bh1750"] is not None
+    failed = {name for name in ("bme280", "bh1750", "mcp3008") if devices[name] is None}
+    if devices.get("oled") is False:
+        failed.add("oled")
+    for name, seconds in timings.items():
+        if name in failed:
+            print(f"⚠️  {name:8s} failed after {seconds * 1000:6.1f}ms")
+        else:
+            print(f"✅ {name:8s} ready in {seconds * 1000:6.1f}ms")
+    print(f"✅ All devices up in {init_total * 1000:.1f}ms (concurrent)")
     
-    init_bh1750(fd)
-    print("✅ BH1750 (light) ready")
+    # Latest cleaned values go in the process-wide cache for every consumer
+    pipeline = Pipeline(args.profile, args.soil_calibration, args.soil_filter, args.light_filter,
+                        ttls=cache_ttls(args.fixed_interval), cache=reading_cache.default_cache())
+    rules = pipeline.rules
+    soil_cal = pipeline.soil_cal
+    print(f"✅ Soil calibration: dry {soil_cal.dry[0]:.0f} / wet {soil_cal.wet[0]:.0f}")
+    print(f"✅ Health rules: {rules.rules.species} profile ({len(rules.rules)} rules)")
+
+    health_model = None
+    if args.health_model:
+        # TFLite only gets imported when a .tflite model is actually used
+        import health_model as hm
+        health_model = hm.load_health_model(args.health_model, batch_size=1)
+        window = getattr(health_model, "window", None) or args.health_window
+        history = hm.WindowBuffer(plants=1, length=window)
+        print(f"✅ Health model loaded ({args.health_model}, window {window})")
+
+    # Per-sensor poll periods follow signal activity (fast on change, slow when stable)
+    if args.fixed_interval:
+        governor = sampling.SamplingGovernor.fixed(
+            [s["name"] for s in sampling.PLANT_MONITOR_SAMPLING], args.fixed_interval)
+        print(f"✅ Sampling: fixed {args.fixed_interval:g}s")
+    else:
+        governor = sampling.SamplingGovernor(sampling.PLANT_MONITOR_SAMPLING)
+        print("✅ Sampling: adaptive (" + ", ".join(
+            f"{s['name']} {s['min_period']}-{s['max_period']}s"
+            for s in sampling.PLANT_MONITOR_SAMPLING) + ")")
+
+    bus = None
+    if args.publish:
+        import readings_bus
+        name = readings_bus.DEFAULT_NAME if args.publish is True else args.publish
+        bus = readings_bus.BusWriter(readings_bus.PLANT_MONITOR_CHANNELS, name=name)
+        print(f"✅ Publishing to readings bus '{name}' (record {bus.head})")
+
+    # Long-term stores get the sampled channels only (NaN = not sampled).
+    # A failing store is logged and retried; it never stops the sampling
+    stores = {}
+    store_errors = (OSError,)
+    if args.history:
+        import history_blocks
+        stores["history"] = history_blocks.HistoryStore(args.history)
+        print(f"✅ Compressed history in {args.history}")
+    if args.db:
+        import readings_db
+        stores["db"] = readings_db.ReadingsDB(args.db, flush_interval=args.db_flush)
+        store_errors += (readings_db.sqlite3.Error,)
+        print(f"✅ SQLite store {args.db} (one transaction per {args.db_flush:g}s)")
+    if args.uplink:
+        import fleet
+        uplink = fleet.Uplink(args.uplink, spool_dir=args.uplink_spool or fleet.SPOOL_DIR)
+        stores["uplink"] = uplink
+        print(f"✅ Uplink to {args.uplink} as '{uplink.node}' "
+              f"({len(uplink.spool.pending())} frames spooled)")
+    alerts = None
+    if args.alert_email:
+        import alerts as alerts_mod
+        host, _, port = args.smtp.partition(":")
+        sender = alerts_mod.SmtpSender(host, int(port or 25), recipients=args.alert_email,
+                                       user=os.environ.get("HOMEAI_SMTP_USER"),
+                                       password=os.environ.get("HOMEAI_SMTP_PASSWORD"),
+                                       starttls=args.smtp_starttls)
+        alerts = alerts_mod.AlertQueue(sender, window=args.alert_window)
+        print(f"✅ Alert emails to {', '.join(args.alert_email)} via {host}:{port or 25}")
     
-    print("✅ MCP3008 + Soil sensor ready")
+    # Formatting and console/file I/O run on the log listener thread; the
+    # loop only queues events
+    logs = monitor_log.MonitorLog(args.console, args.log_json, args.console_every)
+    log = monitor_log.get("plant_monitor")
+
+    def bus_error(name, e):
+        # Refused by an open breaker: already reported when it opened
+        refused = guard is not None and isinstance(e, bus_guard.DeviceUnavailable)
+        monitor_log.event(log, logging.DEBUG if refused else logging.WARNING, "bus_error",
+                          device=name, error=str(e))
+
+    def read_sensor(name, read, on_i2c=True):
+        """Sensor read (I2C ones ahead of any queued display chunks), or None
+        (-> NaN, a faulted sample) on a bus error"""
+        try:
+            if worker is None or not on_i2c:
+                return read()
+            return worker.call(bus_worker.SENSOR, read)
+        except OSError as e:
+            bus_error(name, e)
+            return None
+
+    # Real-time mode goes on last, once every import and allocation of the
+    # start-up path is done (those pages get locked and the GC frozen)
+    if args.realtime or args.rt_cpu is not None or args.mlock:
+        realtime.print_realtime(realtime.enable_realtime(
+            args.realtime, args.rt_priority, args.rt_cpu, args.mlock))
+    jitter = realtime.JitterHistogram()
+
+    # Started after real-time mode, so the bus thread inherits its policy and CPU
+    worker = None if args.no_bus_worker else bus_worker.BusWorker("i2c-1")
+    display = None
+    if not args.no_oled:
+        # A failed init is retried before the next redraw
+        display = Display(oled_fd, worker, ready=devices.get("oled") is True)
     
     print("\n" + "=" * 80)
     print("Monitoring ALL parameters... (Ctrl+C to stop)")
     print("=" * 80 + "\n")
     
+    shown_emotion = None
+    first_reading = None
     try:
         while True:
-            # Read all 4 sensors
-            temp, humidity = read_bme280_calibrated(fd, bme_cal)
-            light = read_bh1750(fd)
-            soil = read_soil_moisture()
-            
-            # Evaluate plant health
-            emotion, emoji, message = evaluate_plant_health(temp, humidity, light, soil)
-            
-            # Display emotion on OLED
-            draw_emotion(fd, emotion)
+            # Absolute monotonic deadline: no drift, and lateness is measurable
+            wakeup = governor.next_wakeup()
+            if wakeup > time.monotonic():
+                realtime.sleep_until(wakeup)
+                jitter.record(time.monotonic() - wakeup)
+            due = governor.due()
+
+            # Read only the sensors that are due; the rest stay NaN (= not sampled)
+            raw = [float("nan")] * 4
+            if due[0] or due[1]:
+                due[0] = due[1] = True  # one BME280 read gives both
+                if bme_cal is None:
+                    # Not initialised yet: this sample stays NaN, the next one reads
+                    bme_cal = read_sensor("bme280", lambda: init_bme280(bme_fd, timeout=0))
+                else:
+                    values = read_sensor("bme280", lambda: read_bme280_calibrated(bme_fd, bme_cal))
+                    if values is not None:
+                        raw[0], raw[1] = values
+            if due[2]:
+                if not bh_ready:
+                    bh_ready = read_sensor("bh1750", lambda: start_bh1750(bh_fd)) is not None
+                else:
+                    lux = read_sensor("bh1750", lambda: read_bh1750(bh_fd))
+                    if lux is not None:
+                        raw[2] = lux
+            if due[3]:
+                if soil_adc is None:
+                    soil_adc = read_sensor("mcp3008", init_soil, on_i2c=False)
+                else:
+                    mean = read_sensor("mcp3008", soil_adc.read_mean, on_i2c=False)
+                    if mean is not None:
+                        raw[3] = float(mean[0])
+
+            # The raw samples make a --log-json file replayable (replay.py)
+            monitor_log.event(log, logging.DEBUG, "sample", raw=raw)
+
+            # Screen, filter, cache and evaluate health (hysteresis + dwell)
+            step = pipeline.step(raw)
+            flags, clean = step.flags, step.clean
+            if flags.any():
+                monitor_log.event(log, logging.WARNING, "fault",
+                                  faults=pipeline.detector.describe(flags))
+            governor.update(step.screened, due)
+            if stores:
+                now_ns = time.time_ns()
+                for name, store in stores.items():
+                    try:
+                        store.append(health_rules.CHANNELS, clean, now_ns)
+                    except store_errors as e:
+                        monitor_log.event(log, logging.WARNING, "store_error", store=name,
+                                          error=str(e))
+            temp, humidity, light, soil = pipeline.latest()
+            if alerts is not None:
+                # Queued only: the SMTP round trips happen on the alert worker
+                for transition in step.transitions:
+                    alerts.submit(transition)
+            emotion, emoji, message = step.emotion, step.emoji, step.message
+            crossing = rules.changed_rules[0] | ~np.isnan(rules.pending_since[0])
+            if crossing.any():
+                # Sample faster around a threshold crossing so the dwell resolves quickly
+                governor.boost(rules.rules.channel[crossing])
+            latest = [temp, humidity, light, soil]
+            # NaN = a channel without a valid reading yet (or expired): keep it out of the window
+            if health_model is not None and not flags.any() and not np.isnan(latest).any():
+                history.push([latest])
+                if history.full:
+                    emotion, emoji, confidence = hm.classify(health_model, history.windows())[0]
+                    message = f"model {confidence:.0%} | {message}"
+            stale = pipeline.stale()
+            if stale:
+                message += f" | stale: {', '.join(stale)}"
             
-            # Print comprehensive status
-            print(f"{emoji} {emotion.upper():8s} | "
-                  f"🌡️  {temp:5.1f}°C | "
-                  f"💧 {humidity:4.0f}% | "
-                  f"💡 {light:6.0f}lux | "
-                  f"🌱 {soil:4.0f}% | "
-                  f"{message}")
+            if bus is not None:
+                bus.publish([temp, humidity, light, soil, health_rules.EMOTIONS.index(emotion)],
+                            flags=int(np.bitwise_or.reduce(flags)))
+            if first_reading is None and not np.isnan([temp, humidity, light, soil]).any():
+                first_reading = time.perf_counter() - start
+                monitor_log.event(log, logging.INFO, "first_reading", ms=first_reading * 1000,
+                                  init_ms=init_total * 1000)
+
+            if emotion != shown_emotion:
+                monitor_log.event(log, logging.INFO, "emotion", emotion=emotion, emoji=emoji,
+                                  was=shown_emotion)
+                shown_emotion = emotion
+            # Only the chunks that change are redrawn, when the committed
+            # emotion changes (or a redraw failed); display faults never stop sensing
+            if display is not None:
+                error = display.poll()
+                if error is not None:
+                    bus_error("oled", error)
+                try:
+                    display.show(emotion)
+                except OSError as e:
+                    bus_error("oled", e)
+            if guard is not None:
+                for addr, state in guard.state_changes():
+                    monitor_log.event(log, logging.WARNING, "bus_guard",
+                                      device=bus_trace.device_name(addr) if addr else "bus",
+                                      state=state)
             
-            time.sleep(3)
+            # Full status once per wakeup (so log volume follows activity);
+            # the console shows it at most every --console-every seconds
+            monitor_log.event(log, logging.INFO, "reading", emoji=emoji, emotion=emotion,
+                              temp=temp, humidity=humidity, light=light, soil=soil,
+                              message=message)
             
     except KeyboardInterrupt:
+        logs.stop()
         print("\n\n" + "🌱" * 30)
         print("   Complete plant monitor stopped")
         print("🌱" * 30)
-        clear_oled(fd)
-        spi.close()
+        print(jitter.render())
+        if worker is not None:
+            worker.stop()  # lets queued display chunks finish first
+            print(worker.render())
+        if guard is not None:
+            print(guard.render())
+        if display is not None:
+            try:
+                clear_oled(oled_fd)
+            except OSError:
+                pass
+        if spi is not None:
+            spi.close()
     
-    os.close(fd)
+    if bus is not None:
+        bus.close()
+    for name, store in stores.items():
+        try:
+            store.close()
+        except store_errors as e:
+            print(f"⚠️  {name} store: {e}")  # the log listener has stopped by now
+    if alerts is not None:
+        alerts.close()
+    for fd in fds.values():
+        i2c.close(fd)
 
 if __name__ == "__main__":
     main()
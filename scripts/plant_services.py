@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Plant Services Supervisor
+Runs the sensor daemon and the readings-bus consumers as separate
+processes, each optionally pinned to its own core, and restarts any that
+exit (with backoff). The sensor daemon keeps sampling while a consumer
+is down; a restarted daemon reattaches to the same shared-memory ring.
+
+Usage:
+  python3 plant_services.py
+  python3 plant_services.py --model /home/root/models/health_mlp.npz --export readings.csv
+"""
+
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import readings_bus
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MAX_BACKOFF = 30.0
+STABLE_AFTER = 60.0  # a run this long resets the backoff
+
+class Service:
+    def __init__(self, name, argv, cpu=None):
+        self.name = name
+        self.argv = [sys.executable] + argv
+        self.cpu = cpu
+        self.proc = None
+        self.started = 0.0
+        self.backoff = 1.0
+        self.restart_at = 0.0
+        self.restarts = 0
+
+    def start(self):
+        cpu = self.cpu
+
+        def pin():
+            if cpu is not None:
+                os.sched_setaffinity(0, {cpu})
+        self.proc = subprocess.Popen(self.argv, cwd=HERE, preexec_fn=pin)
+        self.started = time.monotonic()
+        where = f" on CPU {cpu}" if cpu is not None else ""
+        print(f"▶️  {self.name} (pid {self.proc.pid}){where}")
+
+    def poll(self, now):
+        """Restart the process if it exited and its backoff has passed"""
+        if self.proc is not None:
+            code = self.proc.poll()
+            if code is None:
+                return
+            ran = now - self.started
+            self.backoff = 1.0 if ran > STABLE_AFTER else min(self.backoff * 2, MAX_BACKOFF)
+            self.restart_at = now + self.backoff
+            self.proc = None
+            print(f"⚠️  {self.name} exited ({code}) after {ran:.0f}s, restarting in {self.backoff:.0f}s")
+        elif now >= self.restart_at:
+            self.restarts += 1
+            self.start()
+
+    def stop(self):
+        if self.proc is not None and self.proc.poll() is None:
+            self.proc.send_signal(signal.SIGINT)
+            try:
+                self.proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+
+def build_services(args):
+    daemon = ["plant_monitor.py", "--publish", args.bus, "--no-oled"] + args.monitor_args
+    services = [
+        Service("sensors", daemon, cpu=args.sensor_cpu),
+        Service("display", ["bus_consumers.py", "--bus", args.bus, "display"], cpu=args.consumer_cpu),
+    ]
+    if args.model:
+        services.append(Service("inference", ["bus_consumers.py", "--bus", args.bus, "inference",
+                                              "--model", args.model], cpu=args.inference_cpu))
+    if args.export:
+        services.append(Service("export", ["bus_consumers.py", "--bus", args.bus, "export",
+                                           "--output", args.export], cpu=args.consumer_cpu))
+    return services
+
+def _terminate(signum, frame):
+    raise KeyboardInterrupt
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run plant services as separate processes")
+    parser.add_argument("--bus", default=readings_bus.DEFAULT_NAME)
+    parser.add_argument("--model", help="also run the inference consumer with this model")
+    parser.add_argument("--export", metavar="CSV", help="also run the CSV export consumer")
+    parser.add_argument("--sensor-cpu", type=int, default=1)
+    parser.add_argument("--consumer-cpu", type=int, default=2)
+    parser.add_argument("--inference-cpu", type=int, default=3)
+    parser.add_argument("monitor_args", nargs=argparse.REMAINDER,
+                        help="extra plant_monitor.py arguments (after --)")
+    args = parser.parse_args(argv)
+    if args.monitor_args[:1] == ["--"]:
+        args.monitor_args = args.monitor_args[1:]
+
+    services = build_services(args)
+    for service in services:
+        service.start()
+    signal.signal(signal.SIGTERM, _terminate)  # systemd stop = Ctrl+C
+    try:
+        while True:
+            now = time.monotonic()
+            for service in services:
+                service.poll(now)
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping services...")
+    finally:
+        for service in reversed(services):
+            service.stop()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Zero-copy image preprocessing for TFLite
+Crop + resize + quantize camera frames straight into the
+interpreter's input tensor (no set_tensor() copy, no per-frame allocation)
+"""
+
+import numpy as np
+
+class InputPreprocessor:
+    """Writes frames directly into the interpreter input buffer
+
+    Usage:
+        prep = InputPreprocessor(interpreter)
+        prep.load(frame)          # frame: HxWx3 uint8 (any size)
+        interpreter.invoke()
+
+    Index maps and scratch arrays are built once per source frame size,
+    so steady-state load() only runs vectorized gathers/ufuncs with out=.
+    """
+
+    def __init__(self, interpreter, input_index=0, crop="center", mean=127.5, std=127.5):
+        detail = interpreter.get_input_details()[input_index]
+        _, self.height, self.width, self.channels = [int(d) for d in detail['shape']]
+        self.dtype = np.dtype(detail['dtype'])
+        self.crop = crop
+        # Only keep the accessor: holding a numpy view across invoke()
+        # makes tflite_runtime refuse to run
+        self._tensor = interpreter.tensor(detail['index'])
+
+        self._src_shape = None
+        self._rows = None
+        self._cols = None
+        self._row_scratch = None
+        self._pixels = np.empty((self.height, self.width, self.channels), dtype=np.uint8)
+        self._float_scratch = None
+
+        self._plan_quantization(detail.get('quantization', (0.0, 0)), mean, std)
+
+    def _plan_quantization(self, quantization, mean, std):
+        """Pick the cheapest pixel -> tensor conversion for this input dtype
+
+        Model input is real = (pixel - mean) / std. Everything folds into
+        tensor = pixel * gain + offset, and the common TFLite image-model
+        conventions collapse to a plain copy (uint8) or sign flip (int8).
+        """
+        scale, zero_point = quantization
+        if self.dtype == np.float32:
+            self.mode = "float"
+            self.gain = 1.0 / std
+            self.offset = -mean / std
+            return
+
+        if not scale:
+            scale, zero_point = 1.0, 0
+        self.gain = 1.0 / (std * scale)
+        self.offset = zero_point - mean * self.gain
+
+        if abs(self.gain - 1.0) < 0.01:
+            if self.dtype == np.uint8 and abs(self.offset) <= 1.0:
+                self.mode = "copy"
+                return
+            if self.dtype == np.int8 and abs(self.offset + 128) <= 1.0:
+                # pixel - 128 as int8 is just the top bit flipped
+                self.mode = "flip"
+                return
+
+        self.mode = "affine"
+        info = np.iinfo(self.dtype)
+        self._clip = (info.min, info.max)
+        self._float_scratch = np.empty(self._pixels.shape, dtype=np.float32)
+
+    def _plan(self, src_h, src_w):
+        """Precompute nearest-neighbour gather indices for a source size"""
+        crop_h, crop_w = src_h, src_w
+        top = left = 0
+        if self.crop == "center":
+            target = self.width / self.height
+            if src_w / src_h > target:
+                crop_w = int(round(src_h * target))
+                left = (src_w - crop_w) // 2
+            else:
+                crop_h = int(round(src_w / target))
+                top = (src_h - crop_h) // 2
+
+        # Sample at pixel centres of the crop box
+        self._rows = (top + (np.arange(self.height) + 0.5) * crop_h / self.height).astype(np.intp)
+        self._cols = (left + (np.arange(self.width) + 0.5) * crop_w / self.width).astype(np.intp)
+        np.minimum(self._rows, src_h - 1, out=self._rows)
+        np.minimum(self._cols, src_w - 1, out=self._cols)
+
+        self._row_scratch = np.empty((self.height, src_w, self.channels), dtype=np.uint8)
+        self._src_shape = (src_h, src_w)
+
+    def load(self, frame):
+        """Crop, resize and quantize frame into the input tensor"""
+        if frame.shape[:2] != self._src_shape:
+            self._plan(frame.shape[0], frame.shape[1])
+
+        # mode='clip' lets take() write straight into out= (mode='raise'
+        # buffers through a temporary); indices are already in range
+        np.take(frame, self._rows, axis=0, out=self._row_scratch, mode='clip')
+
+        view = self._tensor()[0]
+        if self.mode == "copy":
+            np.take(self._row_scratch, self._cols, axis=1, out=view, mode='clip')
+        else:
+            pixels = self._pixels
+            np.take(self._row_scratch, self._cols, axis=1, out=pixels, mode='clip')
+            if self.mode == "flip":
+                np.bitwise_xor(pixels, 0x80, out=view.view(np.uint8))
+            elif self.mode == "float":
+                np.multiply(pixels, self.gain, out=view)
+                view += self.offset
+            else:
+                scratch = self._float_scratch
+                np.multiply(pixels, self.gain, out=scratch)
+                scratch += self.offset
+                np.rint(scratch, out=scratch)
+                np.clip(scratch, self._clip[0], self._clip[1], out=scratch)
+                np.copyto(view, scratch, casting='unsafe')
+        del view
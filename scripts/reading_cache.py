@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Process-wide Latest-Reading Cache
+The sampler publishes every reading here; display, logging, API and
+alert code read the latest value without touching the I2C/SPI bus.
+
+- Reading: compact __slots__ record (name, value, ts_ns, expires_ns, seq)
+- per-channel TTLs; a reading past its TTL is reported as stale
+- read-through: get(name, read_through=True) re-reads the sensor only if
+  the cached value has expired (one bus read even with many waiting callers)
+
+Lookups are a dict get plus one clock read. Writers swap in a new record
+rather than mutating one, so readers never take a lock.
+
+Usage:
+  python3 reading_cache.py --bench 1000000
+"""
+
+import argparse
+import math
+import sys
+import threading
+import time
+
+DEFAULT_TTL = 10.0
+
+class Reading:
+    """One published value; immutable once in the cache"""
+
+    __slots__ = ("name", "value", "ts_ns", "expires_ns", "seq")
+
+    def __init__(self, name, value, ts_ns, expires_ns, seq):
+        self.name = name
+        self.value = value
+        self.ts_ns = ts_ns
+        self.expires_ns = expires_ns
+        self.seq = seq
+
+    # Age and staleness depend on the cache's clock (virtual under replay):
+    # ask the cache, see ReadingCache.stale()/age()
+
+    def __repr__(self):
+        return f"Reading({self.name}={self.value!r}, ts_ns={self.ts_ns}, seq={self.seq})"
+
+class _Source:
+    """A sensor that can be re-read on demand: reader() -> values for `channels`"""
+
+    __slots__ = ("name", "reader", "channels", "lock")
+
+    def __init__(self, name, reader, channels, lock):
+        self.name = name
+        self.reader = reader
+        self.channels = tuple(channels)
+        self.lock = lock
+
+class ReadingCache:
+    """Latest reading per channel name, with TTLs and optional read-through"""
+
+    def __init__(self, ttl=None, default_ttl=DEFAULT_TTL, clock=time.monotonic_ns):
+        self.clock = clock
+        self._ttl_ns = {name: int(t * 1e9) for name, t in (ttl or {}).items()}
+        self._default_ttl_ns = int(default_ttl * 1e9)
+        self._readings = {}
+        self._sources = {}
+        self._channel_source = {}
+        self._seq = 0
+        self._write_lock = threading.Lock()
+        self.refreshes = 0
+
+    def set_ttl(self, name, seconds):
+        self._ttl_ns[name] = int(seconds * 1e9)
+
+    def register(self, source, reader, channels, ttl=None, lock=None):
+        """Make channels re-readable for read-through gets
+
+        reader() must return one value per channel (a single value if there
+        is one channel). Pass a shared lock for sources that share a bus fd.
+        """
+        src = _Source(source, reader, channels, lock or threading.Lock())
+        self._sources[source] = src
+        for name in src.channels:
+            self._channel_source[name] = src
+            if ttl is not None:
+                self.set_ttl(name, ttl)
+
+    def put(self, name, value, ts_ns=None):
+        """Publish one value (NaN/None are ignored so the last good value ages out)"""
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            return
+        ts_ns = self.clock() if ts_ns is None else ts_ns
+        with self._write_lock:
+            self._seq += 1
+            self._readings[name] = Reading(name, value, ts_ns,
+                                           ts_ns + self._ttl_ns.get(name, self._default_ttl_ns),
+                                           self._seq)
+
+    def put_many(self, names, values, ts_ns=None):
+        ts_ns = self.clock() if ts_ns is None else ts_ns
+        for name, value in zip(names, values):
+            self.put(name, float(value), ts_ns)
+
+    def _read(self, src):
+        """Bus read + publish; caller holds src.lock"""
+        values = src.reader()
+        if len(src.channels) == 1:
+            values = (values,)
+        self.put_many(src.channels, values)
+        self.refreshes += 1
+
+    def refresh(self, source):
+        """Read a registered source now and publish its channels"""
+        src = self._sources[source]
+        with src.lock:
+            self._read(src)
+
+    def get(self, name, read_through=False):
+        """Latest Reading for a channel (or None); re-reads first if expired and asked to"""
+        reading = self._readings.get(name)
+        if not read_through or (reading is not None and self.clock() <= reading.expires_ns):
+            return reading
+        src = self._channel_source.get(name)
+        if src is None:
+            return reading
+        with src.lock:
+            # Somebody else may have refreshed it while we waited
+            reading = self._readings.get(name)
+            if reading is None or self.clock() > reading.expires_ns:
+                self._read(src)
+                reading = self._readings.get(name)
+        return reading
+
+    def value(self, name, default=float("nan"), read_through=False):
+        reading = self.get(name, read_through)
+        return default if reading is None else reading.value
+
+    def stale(self, name):
+        """True if the channel has no reading or its reading is past its TTL"""
+        reading = self._readings.get(name)
+        return reading is None or self.clock() > reading.expires_ns
+
+    def age(self, name):
+        """Seconds since the channel's latest reading was taken (inf if none)"""
+        reading = self._readings.get(name)
+        return math.inf if reading is None else (self.clock() - reading.ts_ns) / 1e9
+
+    def snapshot(self):
+        """Shallow copy {name: Reading} of everything currently cached"""
+        return dict(self._readings)
+
+_cache = None
+
+def default_cache():
+    """The process-wide cache shared by sampler and consumers"""
+    global _cache
+    if _cache is None:
+        _cache = ReadingCache()
+    return _cache
+
+def bench(n):
+    cache = ReadingCache({"temp": 60})
+    cache.put("temp", 21.5)
+    get = cache.get
+    start = time.perf_counter_ns()
+    for _ in range(n):
+        get("temp")
+    per_get = (time.perf_counter_ns() - start) / n
+
+    calls = [0]
+
+    def fake_bme280():
+        calls[0] += 1
+        time.sleep(0.01)  # about one calibrated BME280 read
+        return 21.5, 48.0
+    cache.register("bme280", fake_bme280, ("temp", "humidity"), ttl=0.05)
+    start = time.perf_counter()
+    while time.perf_counter() - start < 0.5:
+        get("humidity", read_through=True)
+    print(f"⚡ get(): {per_get:.0f} ns per lookup")
+    print(f"⚡ read-through, TTL 50 ms over 0.5 s: {calls[0]} bus reads")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Latest-reading cache")
+    parser.add_argument("--bench", type=int, default=1000000, metavar="LOOKUPS")
+    args = parser.parse_args(argv)
+    bench(args.bench)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Shared-Memory Readings Bus
+The sensor daemon (plant_monitor.py --publish) writes every reading into
+a fixed ring in multiprocessing.shared_memory; display, inference and
+export processes map the same segment and read it directly - no sockets,
+no pickling, and a slow or crashed consumer never blocks acquisition.
+
+Layout (little endian):
+  header  [0:256)  magic, version, capacity, channels, head (records
+                   written so far), writer pid, channel names (JSON)
+  slots   capacity x (seq u64, ts_ns i64, flags u32, pad u32, values f64[channels])
+
+Seqlock per slot: the writer stores seq = 2n+1 (odd, "writing") before
+touching record n and seq = 2n+2 after. A reader copies the slots it
+wants and keeps only those whose seq was 2n+2 both before and after the
+copy; anything else was overwritten (lapped) or mid-write.
+NumPy stores carry no memory barriers, so on weakly ordered CPUs this is
+best effort - at worst a reader sees one torn float, never a crash.
+
+Usage:
+  python3 readings_bus.py dump              # follow the live bus
+  python3 readings_bus.py bench --records 100000
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+DEFAULT_NAME = "homeai_readings"
+DEFAULT_CAPACITY = 4096
+MAGIC = b"HAIRBUS1"
+VERSION = 1
+HEADER_SIZE = 256
+
+# What plant_monitor.py --publish writes per record (emotion = index into
+# health_rules.EMOTIONS); sensor values are the latest cached readings
+PLANT_MONITOR_CHANNELS = ("temp", "humidity", "light", "soil", "emotion")
+_HEADER = np.dtype([("magic", "S8"), ("version", "<u4"), ("capacity", "<u4"),
+                    ("channels", "<u4"), ("pad", "<u4"), ("head", "<u8"),
+                    ("writer_pid", "<u8"), ("names", "S216")])
+
+def slot_dtype(channels):
+    return np.dtype([("seq", "<u8"), ("ts_ns", "<i8"), ("flags", "<u4"),
+                     ("pad", "<u4"), ("values", "<f8", (channels,))])
+
+def _header_view(shm):
+    """Writable record view of the header"""
+    return np.ndarray((1,), dtype=_HEADER, buffer=shm.buf)[0]
+
+class _Mapping:
+    """Header + slot views over one shared memory segment"""
+
+    def _map(self, shm):
+        self.shm = shm
+        self.header = _header_view(shm)
+        self.capacity = int(self.header["capacity"])
+        self.names = tuple(json.loads(self.header["names"].decode()))
+        self.slots = np.ndarray((self.capacity,), dtype=slot_dtype(len(self.names)),
+                                buffer=shm.buf, offset=HEADER_SIZE)
+
+    @property
+    def head(self):
+        """Number of records written since the bus was created"""
+        return int(self.header["head"])
+
+    def close(self):
+        # Views must go before the mapping can be closed
+        self.header = self.slots = None
+        self.shm.close()
+
+class BusWriter(_Mapping):
+    """Single producer; reattaches to an existing compatible ring after a restart"""
+
+    def __init__(self, names, name=DEFAULT_NAME, capacity=DEFAULT_CAPACITY):
+        names = list(names)
+        encoded = json.dumps(names).encode()
+        if len(encoded) > _HEADER["names"].itemsize:
+            raise ValueError("Channel names too long for the bus header")
+        size = HEADER_SIZE + capacity * slot_dtype(len(names)).itemsize
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            fresh = True
+        except FileExistsError:
+            shm = shared_memory.SharedMemory(name=name)
+            header = _header_view(shm)
+            fresh = not (header["magic"] == MAGIC and header["version"] == VERSION
+                         and header["capacity"] == capacity
+                         and header["names"] == encoded and shm.size >= size)
+            del header
+            if fresh:
+                # Stale layout from an older build: start over
+                shm.close()
+                shm.unlink()  # attaching registered it, so this balances out
+                shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+
+        if fresh:
+            header = _header_view(shm)
+            header["capacity"] = capacity
+            header["channels"] = len(names)
+            header["names"] = encoded
+            header["head"] = 0
+            header["version"] = VERSION
+            header["magic"] = MAGIC
+            del header
+        # The ring outlives the daemon (a restarted daemon reattaches and
+        # consumers keep their mapping), so keep it away from the resource tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+        self._map(shm)
+        self.header["writer_pid"] = os.getpid()
+
+    def publish(self, values, flags=0, ts_ns=None):
+        """Append one record (one value per channel; NaN = no reading)"""
+        n = int(self.header["head"])
+        slot = self.slots[n % self.capacity]
+        slot["seq"] = 2 * n + 1
+        slot["ts_ns"] = time.monotonic_ns() if ts_ns is None else ts_ns
+        slot["flags"] = flags
+        slot["values"] = values
+        slot["seq"] = 2 * n + 2
+        self.header["head"] = n + 1
+        return n
+
+    def unlink(self):
+        """Remove the ring for good (SharedMemory.unlink expects it to be tracked)"""
+        resource_tracker.register(self.shm._name, "shared_memory")
+        self.shm.unlink()
+
+class BusReader(_Mapping):
+    """Any number of independent consumers, each with its own cursor"""
+
+    def __init__(self, name=DEFAULT_NAME, wait=None):
+        deadline = None if wait is None else time.monotonic() + wait
+        while True:
+            try:
+                shm = shared_memory.SharedMemory(name=name)
+                break
+            except FileNotFoundError:
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.2)
+        # Python 3.10 registers attached segments too and would unlink the
+        # ring when this consumer exits
+        resource_tracker.unregister(shm._name, "shared_memory")
+        while _header_view(shm)["magic"] != MAGIC:
+            time.sleep(0.01)  # writer is still initializing a fresh ring
+        self._map(shm)
+        self.cursor = self.head
+        self.lost = 0
+
+    def index(self, channel):
+        return self.names.index(channel)
+
+    def latest(self):
+        """Newest complete record (a 0-d structured copy) or None"""
+        for _ in range(10):
+            n = self.head
+            if n == 0:
+                return None
+            rec, valid = self._copy(np.array([n - 1]))
+            if valid[0]:
+                return rec[0]
+        return None
+
+    def read_new(self, limit=None):
+        """Records written since the last call -> structured array (oldest first)
+
+        Records overwritten before this reader got to them are skipped and
+        counted in self.lost.
+        """
+        head = self.head
+        start = max(self.cursor, head - self.capacity)
+        self.lost += start - self.cursor
+        if limit is not None:
+            head = min(head, start + limit)
+        if head <= start:
+            return self.slots[:0].copy()
+        recs, valid = self._copy(np.arange(start, head))
+        self.lost += int(np.count_nonzero(~valid))
+        self.cursor = head
+        return recs[valid]
+
+    def _copy(self, indices):
+        expected = (2 * indices + 2).astype(np.uint64)
+        pos = indices % self.capacity
+        recs = self.slots[pos]  # fancy indexing = one copy
+        after = self.slots["seq"][pos]
+        return recs, (recs["seq"] == expected) & (after == expected)
+
+def follow(reader, interval):
+    print(f"📡 {reader.shm.name}: {reader.capacity} slots, channels {', '.join(reader.names)}, "
+          f"writer pid {int(reader.header['writer_pid'])}")
+    try:
+        while True:
+            for rec in reader.read_new():
+                values = " ".join(f"{n}={v:.2f}" for n, v in zip(reader.names, rec["values"]))
+                print(f"{rec['seq'] // 2 - 1:8d} | flags {rec['flags']:#04x} | {values}")
+            if reader.lost:
+                print(f"⚠️  lost {reader.lost} records (reader too slow)")
+                reader.lost = 0
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+
+def _bench_consumer(name, records, results):
+    reader = BusReader(name, wait=5)
+    reader.cursor = 0
+    got, torn, checks = 0, 0, 0
+    while reader.cursor < records:
+        recs = reader.read_new()
+        got += len(recs)
+        # Every published row is (k, k, ..., k): a mixed row would be a torn read
+        values = recs["values"]
+        torn += int(np.count_nonzero(values.min(axis=1) != values.max(axis=1)))
+        checks += 1
+    results.put((got, reader.lost, torn, checks))
+    reader.close()
+
+def bench(records, channels=5):
+    """Writer here, reader in a second process, both flat out"""
+    import multiprocessing
+    name = f"homeai_bench_{os.getpid()}"
+    writer = BusWriter([f"ch{i}" for i in range(channels)], name=name)
+    results = multiprocessing.Queue()
+    consumer = multiprocessing.Process(target=_bench_consumer, args=(name, records, results))
+    consumer.start()
+    row = np.zeros(channels)
+    try:
+        time.sleep(0.5)  # let the consumer attach
+        start = time.perf_counter()
+        for k in range(records):
+            row[:] = k
+            writer.publish(row)
+        write_s = time.perf_counter() - start
+        got, lost, torn, checks = results.get(timeout=60)
+        consumer.join()
+    finally:
+        writer.close()
+        writer.unlink()
+    print(f"⚡ publish: {write_s / records * 1e6:.2f}µs/record ({records} records)")
+    print(f"⚡ consumer: {got} received, {lost} lapped, {torn} torn, {checks} polls")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Shared-memory readings bus")
+    parser.add_argument("--name", default=DEFAULT_NAME)
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("dump", help="follow records as they are published")
+    p.add_argument("--interval", type=float, default=0.5)
+    p = sub.add_parser("bench", help="cross-process throughput on a private ring")
+    p.add_argument("--records", type=int, default=100000)
+    args = parser.parse_args(argv)
+
+    if args.command == "bench":
+        bench(args.records)
+    else:
+        reader = BusReader(args.name, wait=None)
+        follow(reader, args.interval)
+        reader.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+SQLite Readings Store
+Optional backend for sites that want ad-hoc SQL over the plant history.
+- readings is a WITHOUT ROWID table keyed (channel, ts): rows are stored
+  clustered in key order, so "one channel over a time range" is a single
+  contiguous B-tree range scan with no separate index to consult
+- WAL journal + synchronous=NORMAL: readers (dashboards, sqlite3 shell)
+  never block the sampler, and a commit is one sequential WAL append
+- append() only buffers; rows go to disk in one transaction per flush
+  interval through the same prepared INSERT (executemany into a temp
+  staging table), not one transaction (and one 4 KB WAL page) per reading
+- an hourly rollup (count/sum/min/max) is upserted in the same
+  transaction, so hour- and day-sized dashboard buckets read a few
+  hundred rollup rows instead of scanning every reading
+- a (channel, ts) already stored is a duplicate (replay, backfill, a
+  re-pushed uplink frame): the first value is kept and the rollup counts
+  each reading once
+
+Schema:
+  channels(id INTEGER PRIMARY KEY, name TEXT UNIQUE)
+  readings(channel INTEGER, ts INTEGER ms since epoch, value REAL,
+           PRIMARY KEY (channel, ts)) WITHOUT ROWID
+  hourly(channel INTEGER, hour INTEGER ts / 3600000, n, total, min, max,
+         PRIMARY KEY (channel, hour)) WITHOUT ROWID
+
+Usage:
+  python3 readings_db.py bench --days 30            # ingest rate + dashboard query latency
+  python3 readings_db.py latest /home/root/readings.db
+  sqlite3 /home/root/readings.db "SELECT ... FROM readings ..."
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+import numpy as np
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS channels (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS readings (
+    channel INTEGER NOT NULL,
+    ts INTEGER NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (channel, ts)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS hourly (
+    channel INTEGER NOT NULL,
+    hour INTEGER NOT NULL,
+    n INTEGER NOT NULL,
+    total REAL NOT NULL,
+    min REAL NOT NULL,
+    max REAL NOT NULL,
+    PRIMARY KEY (channel, hour)
+) WITHOUT ROWID;
+"""
+
+STAGING = """
+CREATE TEMP TABLE IF NOT EXISTS batch (
+    channel INTEGER NOT NULL,
+    ts INTEGER NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (channel, ts)
+) WITHOUT ROWID;
+"""
+
+# Fixed SQL text: sqlite3 keeps one prepared statement per distinct string
+STAGE = "INSERT OR IGNORE INTO batch (channel, ts, value) VALUES (?, ?, ?)"
+DROP_STORED = ("DELETE FROM batch WHERE EXISTS (SELECT 1 FROM readings r "
+               "WHERE r.channel = batch.channel AND r.ts = batch.ts)")
+INSERT = "INSERT INTO readings (channel, ts, value) SELECT channel, ts, value FROM batch"
+LATEST = "SELECT ts, value FROM readings WHERE channel = ? ORDER BY ts DESC LIMIT 1"
+RANGE = "SELECT ts, value FROM readings WHERE channel = ? AND ts BETWEEN ? AND ?"
+BUCKETS = ("SELECT ts / ? * ? AS bucket, MIN(value), AVG(value), MAX(value), COUNT(*) "
+           "FROM readings WHERE channel = ? AND ts BETWEEN ? AND ? GROUP BY bucket")
+ROLLUP = ("INSERT INTO hourly (channel, hour, n, total, min, max) "
+          "SELECT channel, ts / 3600000 AS hour, COUNT(*), SUM(value), MIN(value), MAX(value) "
+          "FROM batch WHERE true GROUP BY channel, hour "
+          "ON CONFLICT (channel, hour) DO UPDATE SET n = n + excluded.n, "
+          "total = total + excluded.total, min = MIN(min, excluded.min), "
+          "max = MAX(max, excluded.max)")
+HOURLY_BUCKETS = ("SELECT hour / ? * ? AS bucket, MIN(min), SUM(total) / SUM(n), MAX(max), SUM(n) "
+                  "FROM hourly WHERE channel = ? AND hour BETWEEN ? AND ? GROUP BY bucket")
+PRUNE = "DELETE FROM readings WHERE channel = ? AND ts < ?"
+HOUR_MS = 3600 * 1000
+
+class ReadingsDB:
+    """Batched writer + time-range queries over one SQLite file"""
+
+    def __init__(self, path, flush_interval=60.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        # Autocommit off at the driver level; flush() opens one explicit
+        # transaction per batch
+        self.conn = sqlite3.connect(path, isolation_level=None, cached_statements=32)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA temp_store=MEMORY")  # the staging table never hits disk
+        self.conn.executescript(SCHEMA)
+        self.conn.executescript(STAGING)
+        self.channel_ids = dict(self.conn.execute("SELECT name, id FROM channels"))
+        self.pending = []
+        self.next_flush = time.monotonic() + flush_interval
+
+    def channel_id(self, name):
+        if name not in self.channel_ids:
+            cur = self.conn.execute("INSERT INTO channels (name) VALUES (?)", (name,))
+            self.channel_ids[name] = cur.lastrowid
+        return self.channel_ids[name]
+
+    def append(self, names, values, ts_ns=None):
+        """One reading per channel at ts_ns (wall clock); NaN = not sampled"""
+        ts = (time.time_ns() if ts_ns is None else ts_ns) // 1_000_000
+        for name, value in zip(names, values):
+            if value == value:
+                self.pending.append((self.channel_id(name), ts, float(value)))
+        if time.monotonic() >= self.next_flush:
+            self.flush()
+
+    def extend(self, channel, ts_ns, values):
+        """Many readings of one channel at once (e.g. a fleet uplink frame)"""
+        cid = self.channel_id(channel)
+        ts_ms = (np.asarray(ts_ns, dtype=np.int64) // 1_000_000).tolist()
+        self.pending.extend(zip([cid] * len(ts_ms), ts_ms, np.asarray(values, dtype=np.float64).tolist()))
+        if time.monotonic() >= self.next_flush:
+            self.flush()
+
+    def flush(self):
+        self.next_flush = time.monotonic() + self.flush_interval
+        if not self.pending:
+            return 0
+        # pending is only cleared once committed: a locked database or a full
+        # disk raises here and the batch is retried at the next flush
+        rows = self.pending
+        with self.conn:  # BEGIN ... COMMIT (ROLLBACK on error)
+            self.conn.execute("BEGIN")
+            self.conn.executemany(STAGE, rows)
+            # Only readings new to the store go in, and only they reach the rollup
+            self.conn.execute(DROP_STORED)
+            added = self.conn.execute(INSERT).rowcount
+            self.conn.execute(ROLLUP)
+            self.conn.execute("DELETE FROM batch")
+        self.pending = []
+        return added
+
+    # === Queries (ts in ms since epoch) ===
+    def latest(self):
+        """{channel: (ts_ms, value)} for every channel"""
+        out = {}
+        for name, cid in self.channel_ids.items():
+            row = self.conn.execute(LATEST, (cid,)).fetchone()
+            if row is not None:
+                out[name] = row
+        return out
+
+    def range(self, channel, start_ms, end_ms):
+        """Raw readings of one channel -> (int64 ts_ms, float64 values)"""
+        rows = self.conn.execute(RANGE, (self.channel_ids[channel], start_ms, end_ms)).fetchall()
+        data = np.array(rows, dtype=np.float64).reshape(-1, 2)
+        return data[:, 0].astype(np.int64), data[:, 1]
+
+    def buckets(self, channel, start_ms, end_ms, bucket_s):
+        """Per-bucket (start_ms, min, mean, max, count) rows, e.g. hourly for a week
+
+        Whole-hour buckets come from the hourly rollup (and cover the whole
+        hours that start_ms..end_ms touch); anything else scans readings.
+        """
+        cid = self.channel_ids[channel]
+        if bucket_s % 3600 == 0:
+            hours = int(bucket_s // 3600)
+            rows = self.conn.execute(HOURLY_BUCKETS, (hours, hours, cid, start_ms // HOUR_MS,
+                                                      end_ms // HOUR_MS)).fetchall()
+            return [(bucket * HOUR_MS,) + tuple(rest) for bucket, *rest in rows]
+        width = int(bucket_s * 1000)
+        return self.conn.execute(BUCKETS, (width, width, cid, start_ms, end_ms)).fetchall()
+
+    def prune(self, older_than_s):
+        """Drop readings older than older_than_s seconds (all channels);
+        the hourly rollup is kept"""
+        cutoff = time.time_ns() // 1_000_000 - int(older_than_s * 1000)
+        with self.conn:
+            self.conn.execute("BEGIN")
+            for cid in self.channel_ids.values():
+                self.conn.execute(PRUNE, (cid, cutoff))
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+# === Benchmark ===
+def _timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return result, np.median(times) * 1000
+
+def _remove_db(path):
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+def _bytes_written():
+    """Bytes this process has passed to write() so far (Linux)"""
+    try:
+        with open("/proc/self/io") as f:
+            return int(next(line for line in f if line.startswith("wchar")).split()[1])
+    except (OSError, StopIteration):
+        return 0
+
+def bench(path, days, period, batch_seconds):
+    import health_rules
+    _remove_db(path)
+    db = ReadingsDB(path, flush_interval=float("inf"))
+    names = health_rules.CHANNELS
+    rng = np.random.default_rng(0)
+    steps = int(days * 86400 / period)
+    start_ms = time.time_ns() // 1_000_000 - steps * int(period * 1000)
+    ts = start_ms + np.arange(steps, dtype=np.int64) * int(period * 1000)
+    values = np.array([22.0, 50.0, 300.0, 55.0]) + np.cumsum(rng.normal(0, 0.05, (steps, 4)), axis=0)
+
+    # Ingest the way the sampling loop does: append per wake-up, one
+    # transaction per flush interval
+    per_batch = max(1, int(batch_seconds / period))
+    written = _bytes_written()
+    start = time.perf_counter()
+    for i in range(steps):
+        db.append(names, values[i], int(ts[i]) * 1_000_000)
+        if (i + 1) % per_batch == 0:
+            db.flush()
+    db.flush()
+    ingest_s = time.perf_counter() - start
+    written = _bytes_written() - written
+    rows = steps * len(names)
+    print(f"⚡ ingest: {rows} rows in {ingest_s:.1f}s = {rows / ingest_s:,.0f} rows/s, "
+          f"{written / rows:.0f} bytes written/row ({per_batch * len(names)} rows per "
+          f"{batch_seconds:g}s flush)")
+
+    # The same rows one committed transaction each, for comparison
+    single = ReadingsDB(path + ".single", flush_interval=0.0)
+    n = min(steps, 2000)
+    written = _bytes_written()
+    start = time.perf_counter()
+    for i in range(n):
+        single.append(names, values[i], int(ts[i]) * 1_000_000)
+    single_s = time.perf_counter() - start
+    written = _bytes_written() - written
+    single.close()
+    _remove_db(path + ".single")
+    print(f"⚡ per-reading commits: {n * len(names) / single_s:,.0f} rows/s, "
+          f"{written / (n * len(names)):.0f} bytes written/row")
+
+    end_ms = int(ts[-1])
+    day = 86400 * 1000
+    queries = [
+        ("latest value, all channels", lambda: db.latest()),
+        ("temp, last hour (raw)", lambda: db.range("temp", end_ms - 3600 * 1000, end_ms)),
+        ("temp, last 24 h (raw)", lambda: db.range("temp", end_ms - day, end_ms)),
+        ("temp, 24 h in 5 min buckets", lambda: db.buckets("temp", end_ms - day, end_ms, 300)),
+        ("soil, 7 days hourly min/avg/max", lambda: db.buckets("soil", end_ms - 7 * day, end_ms, 3600)),
+        (f"light, {days:g} days daily min/avg/max",
+         lambda: db.buckets("light", end_ms - int(days * day), end_ms, 86400)),
+    ]
+    for label, fn in queries:
+        result, ms = _timed(fn, 20)
+        count = len(result[0]) if isinstance(result, tuple) else len(result)
+        print(f"   {label:34s} {ms:8.2f}ms ({count} rows)")
+    db.close()
+    print(f"💾 {path}: {os.path.getsize(path) / rows:.1f} bytes/row")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SQLite readings store")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("bench", help="ingest rate and dashboard query latency")
+    p.add_argument("--db", default="/tmp/readings_bench.db")
+    p.add_argument("--days", type=float, default=30.0)
+    p.add_argument("--period", type=float, default=3.0, help="seconds between readings")
+    p.add_argument("--flush", type=float, default=60.0, help="seconds of readings per transaction")
+    p = sub.add_parser("latest", help="latest reading per channel")
+    p.add_argument("db")
+    args = parser.parse_args(argv)
+
+    if args.command == "bench":
+        bench(args.db, args.days, args.period, args.flush)
+    else:
+        db = ReadingsDB(args.db)
+        for name, (ts, value) in db.latest().items():
+            print(f"{name:9s} {value:10.3f}  {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ts / 1000))}")
+        db.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
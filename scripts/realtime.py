@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Real-time Sampling Support
+- enable_realtime(): SCHED_FIFO/SCHED_RR priority, CPU pinning,
+  mlockall() page locking, GC freeze - each step optional and reported
+- sleep_until(): absolute CLOCK_MONOTONIC deadline via clock_nanosleep
+  (TIMER_ABSTIME), so wake-up targets never accumulate drift
+- JitterHistogram: wake-up lateness per cycle, log2 buckets in µs
+
+Usage:
+  python3 realtime.py --period 0.01 --seconds 10                  # normal
+  sudo python3 realtime.py --period 0.01 --seconds 10 --rt fifo --cpu 3 --load 4
+"""
+
+import argparse
+import ctypes
+import errno
+import gc
+import math
+import os
+import sys
+import time
+
+CLOCK_MONOTONIC = 1
+TIMER_ABSTIME = 1
+MCL_CURRENT = 1
+MCL_FUTURE = 2
+POLICIES = {"fifo": os.SCHED_FIFO, "rr": os.SCHED_RR}
+
+class _Timespec(ctypes.Structure):
+    _fields_ = [("tv_sec", ctypes.c_long), ("tv_nsec", ctypes.c_long)]
+
+# The interpreter already links libc; CDLL(None) avoids ctypes.util (~10ms import)
+_libc = ctypes.CDLL(None, use_errno=True)
+try:
+    _clock_nanosleep = _libc.clock_nanosleep
+    _clock_nanosleep.argtypes = [ctypes.c_int, ctypes.c_int,
+                                 ctypes.POINTER(_Timespec), ctypes.POINTER(_Timespec)]
+except AttributeError:
+    _clock_nanosleep = None
+
+def sleep_until(deadline):
+    """Sleep until time.monotonic() >= deadline (seconds, absolute)"""
+    if _clock_nanosleep is None:
+        delay = deadline - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        return
+    sec = int(deadline)
+    ts = _Timespec(sec, int((deadline - sec) * 1e9))
+    # ctypes drops the GIL for the call. A signal interrupts it with EINTR:
+    # sleep again toward the same absolute deadline (Python signal handlers,
+    # e.g. Ctrl+C, still run between the calls)
+    while _clock_nanosleep(CLOCK_MONOTONIC, TIMER_ABSTIME, ctypes.byref(ts), None) == errno.EINTR:
+        pass
+
+def enable_realtime(policy=None, priority=50, cpu=None, lock_memory=False, freeze_gc=True):
+    """Apply the requested real-time settings to this process
+
+    Each step is attempted independently; returns a list of (step, ok, detail)
+    so the caller can report what actually took effect (most need root or
+    CAP_SYS_NICE / CAP_IPC_LOCK).
+    """
+    results = []
+    if cpu is not None:
+        try:
+            os.sched_setaffinity(0, {cpu})
+            results.append(("affinity", True, f"CPU {cpu}"))
+        except OSError as e:
+            results.append(("affinity", False, e.strerror))
+    if policy:
+        try:
+            os.sched_setscheduler(0, POLICIES[policy], os.sched_param(priority))
+            results.append(("scheduler", True, f"SCHED_{policy.upper()} priority {priority}"))
+        except OSError as e:
+            results.append(("scheduler", False, e.strerror))
+    if lock_memory:
+        if _libc.mlockall(MCL_CURRENT | MCL_FUTURE) == 0:
+            results.append(("mlockall", True, "current + future pages"))
+        else:
+            results.append(("mlockall", False, os.strerror(ctypes.get_errno())))
+    if freeze_gc:
+        # Everything allocated during start-up moves to a generation the
+        # collector never scans again, which shortens later GC pauses
+        gc.collect()
+        gc.freeze()
+        results.append(("gc", True, f"{gc.get_freeze_count()} objects frozen"))
+    return results
+
+def print_realtime(results):
+    for step, ok, detail in results:
+        print(f"{'✅' if ok else '⚠️ '} RT {step}: {detail}")
+
+class JitterHistogram:
+    """Wake-up lateness (actual - target) in log2 µs buckets"""
+
+    def __init__(self, buckets=24):
+        self.counts = [0] * buckets
+        self.n = 0
+        self.total = 0.0
+        self.worst = 0.0
+
+    def record(self, lateness):
+        us = max(0.0, lateness * 1e6)
+        bucket = 0 if us < 1 else min(len(self.counts) - 1, int(math.log2(us)) + 1)
+        self.counts[bucket] += 1
+        self.n += 1
+        self.total += us
+        self.worst = max(self.worst, us)
+
+    def percentile(self, p):
+        """Upper bound (µs) of the bucket holding the p-th percentile"""
+        target = p / 100 * self.n
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= target:
+                return 2 ** i
+        return 0
+
+    def summary(self):
+        if not self.n:
+            return "no samples"
+        return (f"{self.n} wake-ups | mean {self.total / self.n:.0f}µs | "
+                f"p50 <{self.percentile(50)}µs | p99 <{self.percentile(99)}µs | "
+                f"max {self.worst:.0f}µs")
+
+    def render(self, width=40):
+        lines = [f"⏱️  Wake-up jitter: {self.summary()}"]
+        peak = max(self.counts) or 1
+        for i, count in enumerate(self.counts):
+            if count:
+                lo = 0 if i == 0 else 2 ** (i - 1)
+                bar = "#" * max(1, round(count / peak * width))
+                lines.append(f"   {lo:>8}-{2 ** i:<8}µs {count:7d} {bar}")
+        return "\n".join(lines)
+
+def _burn(stop_at):
+    # Background load (stands in for TFLite inference). Forked children
+    # inherit the RT policy and pinning, so drop both first
+    os.sched_setscheduler(0, os.SCHED_OTHER, os.sched_param(0))
+    os.sched_setaffinity(0, range(os.cpu_count()))
+    x = 0
+    while time.monotonic() < stop_at:
+        x += 1
+
+def measure(period, seconds, load=0):
+    import multiprocessing
+    stop_at = time.monotonic() + seconds + 0.5
+    hogs = [multiprocessing.Process(target=_burn, args=(stop_at,), daemon=True)
+            for _ in range(load)]
+    for hog in hogs:
+        hog.start()
+    hist = JitterHistogram()
+    deadline = time.monotonic() + period
+    end = deadline + seconds
+    while deadline < end:
+        sleep_until(deadline)
+        hist.record(time.monotonic() - deadline)
+        deadline += period
+    for hog in hogs:
+        hog.join()
+    return hist
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Real-time wake-up jitter test")
+    parser.add_argument("--period", type=float, default=0.01, help="seconds per cycle")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--rt", choices=sorted(POLICIES), help="real-time scheduling policy")
+    parser.add_argument("--priority", type=int, default=50)
+    parser.add_argument("--cpu", type=int, default=None, help="pin to this core")
+    parser.add_argument("--mlock", action="store_true", help="lock all pages in RAM")
+    parser.add_argument("--load", type=int, default=0, help="CPU hog processes to run alongside")
+    args = parser.parse_args(argv)
+
+    print_realtime(enable_realtime(args.rt, args.priority, args.cpu, args.mlock))
+    print(f"⚡ {args.seconds:g}s at {1 / args.period:g} Hz with {args.load} hog(s)...")
+    print(measure(args.period, args.seconds, args.load).render())
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Faster-than-real-time Replay
+Feeds a recorded readings log through the stages the live loop uses, on a
+virtual clock and as fast as the CPU allows:
+fault screening + filters + health rules (plant_monitor.Pipeline), OLED
+face composition and the alert queue (coalescing/rate limits on virtual
+time, emails collected instead of sent).
+
+Recordings:
+- monitor_log JSON lines (plant_monitor.py --log-json) with "sample"
+  events: raw readings, so filters and calibration re-run too
+- JSON lines without samples, bus_consumers.py export CSV, readings_db.py
+  SQLite: already-filtered values, replayed from the health rules on
+
+Recorded emotions (JSON "reading" events, CSV labels) are compared with
+the replayed ones, so a rule or filter change shows exactly what it moves
+(--check fails on any difference); --out writes the replayed labels as an
+export CSV (backfill, e.g. for health_model.py training).
+
+Usage:
+  python3 replay.py /var/log/homeai/monitor.jsonl
+  python3 replay.py readings.csv --profile succulent --check
+  python3 replay.py readings.db --out relabelled.csv
+  python3 replay.py --simulate 28                # four simulated weeks
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+import alerts
+import health_rules
+import plant_monitor
+
+class CollectingSender:
+    """SmtpSender stand-in: keeps (virtual time, subject, body) instead of mailing"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.sent = []
+        self.idle_close = 60.0
+
+    def send(self, subject, body):
+        self.sent.append((self.clock(), subject, body))
+
+    def idle(self, now):
+        pass
+
+    def close(self):
+        pass
+
+# === Recordings -> (ts seconds, (n, 4) values, raw?, recorded emotions or None) ===
+def load_jsonl(path):
+    samples, sample_ts, recorded = [], [], []
+    readings, reading_ts, reading_emotions = [], [], []
+    with open(path) as f:
+        for line in f:
+            doc = json.loads(line)
+            event = doc.get("event")
+            if event == "sample":
+                samples.append(doc["raw"])
+                sample_ts.append(doc["ts"])
+                recorded.append(None)
+            elif event == "reading":
+                readings.append([doc[name] for name in health_rules.CHANNELS])
+                reading_ts.append(doc["ts"])
+                reading_emotions.append(doc["emotion"])
+                # The reading logged right after a sample is that sample's outcome
+                if recorded and recorded[-1] is None:
+                    recorded[-1] = doc["emotion"]
+    if samples:
+        return np.array(sample_ts), np.array(samples, dtype=np.float64), True, recorded
+    return np.array(reading_ts), np.array(readings, dtype=np.float64), False, reading_emotions
+
+def load_csv(path, plant=None):
+    ts, rows, labels = [], [], []
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            plant = row["plant"] if plant is None else plant
+            if row["plant"] != str(plant):
+                continue
+            ts.append(int(row["ts_ns"]) / 1e9)
+            rows.append([float(row[name]) for name in health_rules.CHANNELS])
+            labels.append(row.get("label") or None)
+    return np.array(ts), np.array(rows, dtype=np.float64).reshape(-1, 4), False, labels
+
+def load_db(path):
+    import readings_db
+    db = readings_db.ReadingsDB(path)
+    series = {name: db.range(name, 0, 2**62) for name in health_rules.CHANNELS
+              if name in db.channel_ids}
+    db.close()
+    # One row per distinct timestamp, NaN where that channel wasn't sampled
+    ts_ms = np.unique(np.concatenate([ts for ts, _ in series.values()] or [np.zeros(0, np.int64)]))
+    values = np.full((len(ts_ms), 4), np.nan)
+    for col, name in enumerate(health_rules.CHANNELS):
+        if name in series:
+            ts, vs = series[name]
+            values[np.searchsorted(ts_ms, ts), col] = vs
+    return ts_ms / 1e3, values, False, None
+
+def simulate(days, seed=0):
+    """Governor-scheduled raw samples, as main() would have read them"""
+    import sampling
+    sample = sampling.simulate_day(hours=72.0, seed=seed)  # watered every third morning
+    gov = sampling.SamplingGovernor(sampling.PLANT_MONITOR_SAMPLING, now=0.0)
+    epoch = time.time() - days * 86400
+    ts, rows = [], []
+    t, end = 0.0, days * 86400
+    while t < end:
+        due = gov.due(t)
+        due[0] = due[1] = due[0] or due[1]
+        raw = np.where(due, sample(t), np.nan)
+        ts.append(epoch + t)
+        rows.append(raw)
+        gov.update(raw, due, t)
+        t = gov.next_wakeup()
+    return np.array(ts), np.array(rows), True, None
+
+def load(path, plant=None):
+    if path.endswith(".csv"):
+        return load_csv(path, plant)
+    if path.endswith((".db", ".sqlite")):
+        return load_db(path)
+    return load_jsonl(path)
+
+# === Replay ===
+def replay(ts, values, raw, args):
+    """Run every sample through the pipeline -> dict of results"""
+    clock = [float(ts[0]) if len(ts) else 0.0]
+    now_fn = lambda: clock[0]
+    pipeline = plant_monitor.Pipeline(args.profile, args.soil_calibration, args.soil_filter,
+                                      args.light_filter, ttls=plant_monitor.cache_ttls(),
+                                      clock=now_fn)
+    sender = CollectingSender(now_fn)
+    queue = alerts.AlertQueue(sender, window=args.alert_window, clock=now_fn, threaded=False)
+    process = pipeline.step if raw else pipeline.evaluate
+
+    n = len(ts)
+    emotions = np.empty(n, dtype=np.intp)
+    latest = np.empty((n, 4))
+    index = {name: i for i, name in enumerate(health_rules.EMOTIONS)}
+    transitions = frames = 0
+    shown = None
+    start = time.perf_counter()
+    for i in range(n):
+        now = clock[0] = float(ts[i])
+        step = process(values[i], now)
+        if step.transitions:
+            transitions += len(step.transitions)
+            for transition in step.transitions:
+                alert = alerts.make_alert(transition, now)
+                if alert is not None:
+                    queue.step(alert, now)
+        else:
+            queue.step(None, now)
+        message = step.message
+        stale = pipeline.stale()
+        if stale:
+            message += f" | stale: {', '.join(stale)}"
+        if step.emotion != shown:
+            plant_monitor.compose_frame(step.emotion)
+            frames += 1
+            shown = step.emotion
+        emotions[i] = index[step.emotion]
+        latest[i] = pipeline.latest()
+    queue.close()
+    elapsed = time.perf_counter() - start
+    return dict(emotions=emotions, latest=latest, transitions=transitions, frames=frames,
+                emails=sender.sent, alert_stats=queue.stats, elapsed=elapsed, message=message if n else "")
+
+def report(name, ts, raw, recorded, result):
+    n = len(ts)
+    span = float(ts[-1] - ts[0]) if n > 1 else 0.0
+    elapsed = result["elapsed"]
+    print(f"📼 {name}: {n:,} {'raw' if raw else 'filtered'} samples over {span / 86400:.1f} days")
+    print(f"⚡ Replayed in {elapsed:.2f}s: {n / elapsed:,.0f} samples/s "
+          f"({span / elapsed:,.0f}x real time)")
+    # Share of (virtual) time spent in each emotion
+    dt = np.diff(ts, append=ts[-1]) if n else np.zeros(0)
+    shares = np.bincount(result["emotions"], weights=dt, minlength=len(health_rules.EMOTIONS))
+    total = shares.sum() or 1.0
+    print("   " + " | ".join(f"{health_rules.EMOJI[e]} {e} {s / total:.1%}"
+                            for e, s in zip(health_rules.EMOTIONS, shares)))
+    print(f"   🔀 {result['transitions']} transitions | 🖼️  {result['frames']} face frames | "
+          f"📧 {len(result['emails'])} alert emails ({dict(result['alert_stats'])})")
+
+    if recorded is None or not any(r is not None for r in recorded):
+        return 0
+    known = np.array([r is not None for r in recorded])
+    was = np.array([health_rules.EMOTIONS.index(r) if r is not None else -1 for r in recorded])
+    differs = known & (was != result["emotions"])
+    if not differs.any():
+        print(f"✅ Matches the recorded emotions ({int(known.sum()):,} samples)")
+        return 0
+    first = int(np.flatnonzero(differs)[0])
+    when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts[first]))
+    print(f"⚠️  {int(differs.sum()):,} of {int(known.sum()):,} samples differ from the recording "
+          f"(first at {when}: recorded {health_rules.EMOTIONS[was[first]]}, "
+          f"replayed {health_rules.EMOTIONS[result['emotions'][first]]})")
+    return int(differs.sum())
+
+def write_export(path, ts, result, plant=0):
+    """Replayed labels in bus_consumers.py export format"""
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(("plant", "ts_ns") + health_rules.CHANNELS + ("label",))
+        for t, values, emotion in zip(ts, result["latest"], result["emotions"]):
+            if np.isnan(values).any():
+                continue
+            writer.writerow([plant, int(t * 1e9)] + [f"{v:.3f}" for v in values]
+                            + [health_rules.EMOTIONS[emotion]])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay recorded readings through the monitor pipeline")
+    parser.add_argument("recording", nargs="?", help="monitor_log .jsonl, export .csv or readings .db")
+    parser.add_argument("--simulate", type=float, metavar="DAYS", default=None,
+                        help="replay simulated raw samples instead of a recording")
+    parser.add_argument("--plant", default=None, help="plant column to replay from an export CSV")
+    parser.add_argument("--profile", default=None,
+                        help="species profile name (profiles/<name>.json) or path")
+    parser.add_argument("--soil-calibration", default=None,
+                        help="dry/wet calibration JSON written by 'mcp3008.py calibrate'")
+    parser.add_argument("--soil-filter", default="median:5,kalman:0.05:4")
+    parser.add_argument("--light-filter", default="ewma:0.5")
+    parser.add_argument("--alert-window", type=float, default=900.0, metavar="SECONDS")
+    parser.add_argument("--alerts", action="store_true", help="list the alert emails")
+    parser.add_argument("--out", metavar="CSV", help="write replayed labels (backfill)")
+    parser.add_argument("--check", action="store_true",
+                        help="exit 1 if any replayed emotion differs from the recording")
+    args = parser.parse_args(argv)
+    if not args.recording and args.simulate is None:
+        parser.error("give a recording or --simulate DAYS")
+
+    if args.simulate is not None:
+        name = f"simulated {args.simulate:g} days"
+        ts, values, raw, recorded = simulate(args.simulate)
+    else:
+        name = os.path.basename(args.recording)
+        ts, values, raw, recorded = load(args.recording, args.plant)
+    if not len(ts):
+        print(f"❌ No readings in {name}")
+        return 1
+
+    result = replay(ts, values, raw, args)
+    differences = report(name, ts, raw, recorded, result)
+    if args.alerts:
+        for t, subject, body in result["emails"]:
+            print(f"   {time.strftime('%m-%d %H:%M', time.localtime(t))} 📧 {subject}")
+    if args.out:
+        write_export(args.out, ts, result)
+        print(f"💾 Replayed labels -> {args.out}")
+    return 1 if args.check and differences else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Adaptive Sampling Governor
+Per-channel poll periods between [min_period, max_period], driven by
+how much the signal is actually doing:
+- a step bigger than the channel's deadband (e.g. watering, a cloud)
+  drops the period straight to min_period and holds it there for `hold` s
+- otherwise the period targets "one deadband of change per sample",
+  estimated from EWMA rate of change and EWMA variance, and backs off
+  geometrically (x backoff per quiet sample) toward max_period
+- boost() forces min_period from outside, e.g. on a rule threshold crossing
+
+Quiet sensors are read (and logged) rarely; busy ones at full rate.
+
+Usage:
+  python3 sampling.py --hours 24   # simulated day vs fixed 3 s polling
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+# Channel specs for plant_monitor.py: [temp, humidity, light, soil_raw]
+# periods/hold in seconds, deadband in channel units
+PLANT_MONITOR_SAMPLING = [
+    dict(name="temp", min_period=3, max_period=60, deadband=0.2),
+    dict(name="humidity", min_period=3, max_period=60, deadband=1.0),
+    dict(name="light", min_period=1, max_period=30, deadband=50),
+    # Soil drifts over hours, but stays fast for 10 min after watering
+    dict(name="soil_raw", min_period=3, max_period=300, deadband=5, hold=600),
+]
+
+def _spec_array(specs, key, default):
+    return np.array([float(s.get(key, default)) for s in specs])
+
+class SamplingGovernor:
+    """Per-channel adaptive poll scheduler; update() takes the channels just read"""
+
+    def __init__(self, specs, alpha=0.2, backoff=1.5, hold=30.0, slack=1.0, now=None):
+        self.names = [s.get("name", f"ch{i}") for i, s in enumerate(specs)]
+        n = len(specs)
+        self.min_period = _spec_array(specs, "min_period", 3)
+        self.max_period = np.maximum(_spec_array(specs, "max_period", 60), self.min_period)
+        self.deadband = _spec_array(specs, "deadband", 1)
+        self.hold = _spec_array(specs, "hold", hold)
+        self.alpha = alpha
+        self.backoff = backoff
+        self.slack = slack
+
+        now = time.monotonic() if now is None else now
+        # Start fast: nothing is known about the signals yet
+        self.period = self.min_period.copy()
+        self.next_due = np.full(n, now)
+        self.fast_until = np.full(n, now)
+        self.last = np.full(n, np.nan)
+        self.last_ts = np.full(n, np.nan)
+        self.mean = np.full(n, np.nan)
+        self.var = np.zeros(n)
+        self.rate = np.zeros(n)
+        self.samples = np.zeros(n, dtype=np.int64)
+
+    @classmethod
+    def fixed(cls, names, period, now=None):
+        """Non-adaptive governor: every channel at the same constant period"""
+        specs = [dict(name=name, min_period=period, max_period=period) for name in names]
+        return cls(specs, now=now)
+
+    def due(self, now=None):
+        """Bool mask of channels due now (or within `slack` s, to share the wakeup)"""
+        now = time.monotonic() if now is None else now
+        return self.next_due <= now + self.slack
+
+    def next_wakeup(self):
+        """Monotonic time of the earliest due channel"""
+        return float(self.next_due.min())
+
+    def sleep_time(self, now=None):
+        now = time.monotonic() if now is None else now
+        return max(0.0, self.next_wakeup() - now)
+
+    def update(self, values, sampled, now=None):
+        """Record the channels in `sampled` and reschedule them
+
+        NaN values (faulted samples) are rescheduled without touching the
+        statistics. Returns the bool mask of channels that saw a step.
+        """
+        now = time.monotonic() if now is None else now
+        x = np.asarray(values, dtype=np.float64)
+        sampled = np.asarray(sampled, dtype=bool)
+        seen = sampled & ~np.isnan(x)
+        have_last = seen & ~np.isnan(self.last)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            step = np.abs(x - self.last)
+            dt = np.maximum(now - self.last_ts, 1e-3)
+            rate = np.where(have_last, step / dt, 0.0)
+        jumped = have_last & (step > self.deadband)
+
+        a = self.alpha
+        self.rate = np.where(have_last, (1 - a) * self.rate + a * rate, self.rate)
+        first = seen & np.isnan(self.mean)
+        self.mean[first] = x[first]
+        diff = x - self.mean
+        incr = a * diff
+        self.mean = np.where(seen, self.mean + incr, self.mean)
+        self.var = np.where(seen, (1 - a) * (self.var + diff * incr), self.var)
+
+        # Time for the signal to move one deadband, either by trend or by spread
+        activity = np.maximum(self.rate, np.sqrt(self.var) / self.period)
+        with np.errstate(divide="ignore"):
+            target = self.deadband / activity
+        period = np.minimum(self.period * self.backoff, target)
+        period = np.clip(period, self.min_period, self.max_period)
+
+        self.fast_until[jumped] = now + self.hold[jumped]
+        fast = now < self.fast_until
+        period = np.where(fast, self.min_period, period)
+
+        # Reschedule from the deadline just served, not from when the read
+        # finished, so a steady channel keeps its cadence instead of drifting
+        # by the read time every cycle; resync to now after an overrun or an
+        # out-of-turn read
+        self.period = np.where(sampled, period, self.period)
+        on_time = (self.next_due > now - self.period) & (self.next_due <= now + self.slack)
+        anchor = np.where(on_time, self.next_due, now)
+        self.next_due = np.where(sampled, anchor + self.period, self.next_due)
+        self.last[seen] = x[seen]
+        self.last_ts[seen] = now
+        self.samples += sampled
+        return jumped
+
+    def boost(self, channels, now=None, hold=None):
+        """Force channels (bool mask or indices) back to min_period right away"""
+        now = time.monotonic() if now is None else now
+        mask = np.zeros(len(self.period), dtype=bool)
+        mask[channels] = True
+        until = now + (self.hold if hold is None else hold)
+        self.fast_until = np.where(mask, np.maximum(self.fast_until, until), self.fast_until)
+        self.period[mask] = self.min_period[mask]
+        self.next_due[mask] = np.minimum(self.next_due[mask], now + self.min_period[mask])
+
+    def describe(self):
+        """Current period per channel, e.g. 'temp 24s, light 1s'"""
+        return ", ".join(f"{name} {p:.0f}s" for name, p in zip(self.names, self.period))
+
+def simulate_day(hours=24.0, seed=0):
+    """Synthetic [temp, humidity, light, soil_raw] with clouds and one watering"""
+    rng = np.random.default_rng(seed)
+    clouds = rng.uniform(6, 18, 12) * 3600
+
+    def sample(t):
+        day = np.clip(np.sin((t / 3600 - 6) / 12 * np.pi), 0, None)
+        light = 20000 * day
+        if any(c <= t < c + 120 for c in clouds):
+            light *= 0.3
+        temp = 19 + 5 * day + rng.normal(0, 0.05)
+        humidity = 55 - 10 * day + rng.normal(0, 0.3)
+        # Dries slowly, jumps back when watered at 08:00
+        since = (t - 8 * 3600) % (hours * 3600)
+        soil = 800 - 250 * np.exp(-since / (10 * 3600)) + rng.normal(0, 1)
+        return np.array([temp, humidity, light + rng.normal(0, 5), soil])
+    return sample
+
+def compare(hours):
+    sample = simulate_day(hours)
+    gov = SamplingGovernor(PLANT_MONITOR_SAMPLING, now=0.0)
+    t, end = 0.0, hours * 3600
+    wakeups = 0
+    while t < end:
+        due = gov.due(t)
+        gov.update(np.where(due, sample(t), np.nan), due, t)
+        wakeups += 1
+        t = gov.next_wakeup()
+
+    fixed = int(end // 3)
+    print(f"⏱️  Simulated {hours:.0f}h: {wakeups} wakeups vs {fixed} at a fixed 3 s")
+    for name, count in zip(gov.names, gov.samples):
+        print(f"   {name:9s} {count:6d} reads ({count / fixed:5.1%} of fixed)")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Adaptive sampling governor")
+    parser.add_argument("--hours", type=float, default=24.0, help="simulated duration")
+    args = parser.parse_args(argv)
+    compare(args.hours)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Scene-change gate for plant image inference
+Cheap pre-filter that decides whether a frame needs a new TFLite run,
+or whether the last classification still describes the scene.
+
+Methods:
+- "diff":  mean absolute difference of block-averaged grayscale thumbnails
+- "phash": perceptual hash (8x8 low-frequency DCT of the thumbnail),
+           compared by Hamming distance
+"""
+
+import time
+
+import numpy as np
+
+DEFAULT_THRESHOLDS = {
+    "diff": 6.0,   # mean |delta| in gray levels (0-255), brightness-normalized
+    "phash": 6,    # differing bits out of 64
+}
+
+def _dct_matrix(n):
+    """Orthonormal DCT-II basis, so coeffs = D @ img @ D.T"""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    d = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    d[0] /= np.sqrt(2.0)
+    return d.astype(np.float32)
+
+class SceneGate:
+    """Skip inference when the scene hasn't changed since the last classified frame
+
+    Usage:
+        if gate.check(frame):
+            result = classify(frame)
+            gate.update(result)
+        else:
+            result = gate.last_result
+
+    Frames that look unchanged are still re-classified every refresh_frames
+    frames / refresh_seconds seconds. Those forced refreshes double as
+    audits: the fresh result is compared against the cached one to measure
+    how often skipping would have returned the same answer.
+    """
+
+    def __init__(self, method="diff", threshold=None, size=32,
+                 refresh_frames=30, refresh_seconds=10.0, same_result=None, clock=time.monotonic):
+        if method not in DEFAULT_THRESHOLDS:
+            raise ValueError(f"Unknown scene gate method '{method}'")
+        self.method = method
+        self.threshold = DEFAULT_THRESHOLDS[method] if threshold is None else threshold
+        self.size = size
+        self.refresh_frames = refresh_frames
+        self.refresh_seconds = refresh_seconds
+        self.same_result = same_result or (lambda a, b: a == b)
+        self.clock = clock
+
+        self._dct = _dct_matrix(size) if method == "phash" else None
+        self._shape = None
+        self._reference = None
+        self._pending = None
+        self._pending_forced = False
+        self.last_result = None
+        self._frames_since = 0
+        self._last_ts = 0.0
+        self.last_distance = 0.0
+
+        self.frames = 0
+        self.inferences = 0
+        self.skipped = 0
+        self.forced_refreshes = 0
+        self.audits = 0
+        self.agreements = 0
+
+    def _plan(self, h, w):
+        """Sample ~4x4 pixels per thumbnail block; indices built once per frame size"""
+        n = self.size
+        bh, bw = max(1, h // n), max(1, w // n)
+        row_off = np.arange(0, bh, max(1, bh // 4))
+        col_off = np.arange(0, bw, max(1, bw // 4))
+        self._rows = (np.arange(n)[:, None] * bh + row_off[None, :]).ravel()
+        self._cols = (np.arange(n)[:, None] * bw + col_off[None, :]).ravel()
+        np.minimum(self._rows, h - 1, out=self._rows)
+        np.minimum(self._cols, w - 1, out=self._cols)
+        self._block = (len(row_off), len(col_off))
+        self._shape = (h, w)
+
+    def signature(self, frame):
+        """Thumbnail (diff) or 64-bit boolean hash (phash) for a frame"""
+        if frame.shape[:2] != self._shape:
+            self._plan(frame.shape[0], frame.shape[1])
+        n = self.size
+        kr, kc = self._block
+        sample = frame.take(self._rows, axis=0).take(self._cols, axis=1)
+        if sample.ndim == 3:
+            sample = sample.reshape(n, kr, n, kc, -1)
+            thumb = sample.mean(axis=(1, 3, 4), dtype=np.float32)
+        else:
+            thumb = sample.reshape(n, kr, n, kc).mean(axis=(1, 3), dtype=np.float32)
+
+        if self.method == "diff":
+            # Remove global brightness so slow light changes don't count as motion
+            thumb -= thumb.mean()
+            return thumb
+
+        coeffs = self._dct @ thumb @ self._dct.T
+        low = coeffs[:8, :8].ravel()
+        return low > np.median(low[1:])
+
+    def distance(self, a, b):
+        if self.method == "diff":
+            return float(np.abs(a - b).mean())
+        return int(np.count_nonzero(a != b))
+
+    def check(self, frame):
+        """True if frame needs a fresh inference, False to reuse last_result"""
+        self.frames += 1
+        now = self.clock()
+        sig = self.signature(frame)
+
+        changed = True
+        if self._reference is not None and self.last_result is not None:
+            self.last_distance = self.distance(sig, self._reference)
+            changed = self.last_distance > self.threshold
+
+        forced = False
+        if not changed:
+            stale = (self.refresh_frames and self._frames_since >= self.refresh_frames) or \
+                    (self.refresh_seconds and now - self._last_ts >= self.refresh_seconds)
+            if not stale:
+                self._frames_since += 1
+                self.skipped += 1
+                return False
+            forced = True
+            self.forced_refreshes += 1
+
+        self._pending = (sig, now)
+        self._pending_forced = forced
+        return True
+
+    def update(self, result):
+        """Record the result of the inference that check() asked for"""
+        if self._pending is None:
+            raise RuntimeError("update() without a preceding check() == True")
+        if self._pending_forced and self.last_result is not None:
+            self.audits += 1
+            if self.same_result(result, self.last_result):
+                self.agreements += 1
+        self._reference, self._last_ts = self._pending
+        self._pending = None
+        self.last_result = result
+        self._frames_since = 0
+        self.inferences += 1
+
+    def metrics(self):
+        return {
+            "method": self.method,
+            "threshold": self.threshold,
+            "frames": self.frames,
+            "inferences": self.inferences,
+            "skipped": self.skipped,
+            "skip_rate": round(self.skipped / self.frames, 4) if self.frames else 0.0,
+            "forced_refreshes": self.forced_refreshes,
+            "audits": self.audits,
+            "agreement_rate": round(self.agreements / self.audits, 4) if self.audits else None,
+        }
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Test the YUYV -> RGB converter used by V4L2Source
+Random YUYV frames against a float BT.601 reference (no camera needed)
+"""
+
+import sys
+
+import numpy as np
+
+from frame_sources import YUYVConverter
+
+def reference(yuyv, width, height):
+    """Float BT.601 studio-swing YUYV -> RGB"""
+    pairs = yuyv.reshape(height, width // 2, 4).astype(np.float64)
+    y = pairs[:, :, [0, 2]].reshape(height, width) - 16
+    u = np.repeat(pairs[:, :, 1], 2, axis=1) - 128
+    v = np.repeat(pairs[:, :, 3], 2, axis=1) - 128
+    rgb = np.stack([1.164 * y + 1.596 * v,
+                    1.164 * y - 0.391 * u - 0.813 * v,
+                    1.164 * y + 2.018 * u], axis=2)
+    return np.clip(np.round(rgb), 0, 255)
+
+def test_matches_float_reference(width=64, height=48, frames=20, tolerance=2):
+    rng = np.random.default_rng(601)
+    converter = YUYVConverter(width, height)
+    out = np.empty((height, width, 3), dtype=np.uint8)
+    worst = 0
+    for _ in range(frames):
+        raw = rng.integers(0, 256, width * height * 2, dtype=np.uint8)
+        converter.convert(raw, out)
+        worst = max(worst, int(np.abs(out - reference(raw, width, height)).max()))
+    assert worst <= tolerance, f"max error {worst} > {tolerance}"
+    return worst
+
+def test_low_chroma_pixel():
+    # Y < 16 or U, V < 128 used to wrap in uint8 before widening
+    out = YUYVConverter(2, 1).convert(np.array([60, 100, 60, 100], np.uint8),
+                                      np.empty((1, 2, 3), np.uint8))
+    assert np.abs(out[0, 0].astype(int) - [6, 85, 0]).max() <= 2, out[0, 0]
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("  YUYV -> RGB Test - float BT.601 reference")
+    print("=" * 50)
+    try:
+        test_low_chroma_pixel()
+        worst = test_matches_float_reference()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    print(f"✅ YUYV converter matches the reference (max error {worst})")
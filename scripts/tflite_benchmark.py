@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+TFLite Benchmark Harness
+Sweeps models x num_threads x delegate on Raspberry Pi 5
+Reports latency percentiles, throughput, peak RSS and load time as JSON
+
+Usage:
+  python3 tflite_benchmark.py
+  python3 tflite_benchmark.py --threads 1,2,4 --iterations 500 --output bench.json
+  python3 tflite_benchmark.py --models /home/root/models/mobilenet_v1_1.0_224_quant.tflite
+"""
+
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import platform
+import queue as queue_mod
+import resource
+import sys
+import time
+
+MODELS_DIR = "/home/root/models"
+
+# "xnnpack" = TFLite default delegates (XNNPACK where the build has it)
+# "none"    = plain builtin kernels, default delegates disabled
+DELEGATES = ("xnnpack", "none")
+
+def log(msg):
+    """Progress goes to stderr so stdout stays pure JSON"""
+    print(msg, file=sys.stderr, flush=True)
+
+def peak_rss_kb():
+    """Peak resident set size of this process (KiB on Linux)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def delegate_available(delegate):
+    """Check if a delegate mode can be selected with this tflite_runtime"""
+    import tflite_runtime.interpreter as tflite
+    if delegate == "xnnpack":
+        return True
+    if delegate == "none":
+        # Without OpResolverType we can't switch XNNPACK off, so "none"
+        # would measure the same thing as the default
+        return hasattr(tflite, "OpResolverType")
+    return os.path.exists(delegate)
+
+def load_interpreter(model_path, num_threads, delegate):
+    """Create interpreter for one benchmark configuration"""
+    import tflite_runtime.interpreter as tflite
+
+    kwargs = {"model_path": model_path, "num_threads": num_threads}
+    if delegate == "none":
+        kwargs["experimental_op_resolver_type"] = \
+            tflite.OpResolverType.BUILTIN_WITHOUT_DEFAULT_DELEGATES
+    elif delegate != "xnnpack":
+        # Anything else is treated as an external delegate .so
+        kwargs["experimental_delegates"] = [tflite.load_delegate(delegate)]
+    return tflite.Interpreter(**kwargs)
+
+def make_input(detail):
+    """Random input matching the model's input tensor"""
+    import numpy as np
+
+    shape = detail['shape']
+    dtype = detail['dtype']
+    if dtype == np.uint8:
+        return np.random.randint(0, 256, shape, dtype=np.uint8)
+    if dtype == np.int8:
+        return np.random.randint(-128, 128, shape, dtype=np.int8)
+    return np.random.uniform(-1.0, 1.0, shape).astype(dtype)
+
+def run_config(model_path, num_threads, delegate, warmup, iterations):
+    """Benchmark one (model, threads, delegate) combination"""
+    import numpy as np
+
+    rss_before = peak_rss_kb()
+
+    start = time.perf_counter()
+    interpreter = load_interpreter(model_path, num_threads, delegate)
+    interpreter.allocate_tensors()
+    load_ms = (time.perf_counter() - start) * 1000
+
+    for detail in interpreter.get_input_details():
+        interpreter.set_tensor(detail['index'], make_input(detail))
+
+    for _ in range(warmup):
+        interpreter.invoke()
+
+    latencies = np.empty(iterations, dtype=np.float64)
+    clock = time.perf_counter_ns
+    invoke = interpreter.invoke
+    wall_start = clock()
+    for i in range(iterations):
+        t0 = clock()
+        invoke()
+        latencies[i] = clock() - t0
+    wall_s = (clock() - wall_start) / 1e9
+    latencies /= 1e6  # ns -> ms
+
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+    detail = interpreter.get_input_details()[0]
+    return {
+        "model": os.path.basename(model_path),
+        "model_size_kb": os.path.getsize(model_path) // 1024,
+        "input_dtype": np.dtype(detail['dtype']).name,
+        "input_shape": [int(d) for d in detail['shape']],
+        "num_threads": num_threads,
+        "delegate": delegate,
+        "warmup": warmup,
+        "iterations": iterations,
+        "load_time_ms": round(load_ms, 3),
+        "latency_ms": {
+            "min": round(float(latencies.min()), 3),
+            "mean": round(float(latencies.mean()), 3),
+            "p50": round(float(p50), 3),
+            "p90": round(float(p90), 3),
+            "p99": round(float(p99), 3),
+            "max": round(float(latencies.max()), 3),
+        },
+        "throughput_ips": round(iterations / wall_s, 2),
+        "peak_rss_kb": peak_rss_kb(),
+        "rss_growth_kb": peak_rss_kb() - rss_before,
+    }
+
+def _isolated_worker(queue, args):
+    try:
+        queue.put(("ok", run_config(*args)))
+    except Exception as e:
+        queue.put(("error", f"{type(e).__name__}: {e}"))
+
+def run_isolated(args, poll_s=1.0):
+    """Run one config in a fresh process so peak RSS isn't polluted by earlier runs"""
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_isolated_worker, args=(queue, args))
+    proc.start()
+    while True:
+        alive = proc.is_alive()
+        try:
+            status, payload = queue.get(timeout=poll_s)
+            break
+        except queue_mod.Empty:
+            if not alive:
+                # Segfault or OOM kill inside the runtime: nothing will be queued
+                proc.join()
+                raise RuntimeError(f"benchmark process died (exit code {proc.exitcode})")
+    proc.join()
+    if status != "ok":
+        raise RuntimeError(payload)
+    return payload
+
+def find_models(paths):
+    """Expand model paths, directories and globs into .tflite files"""
+    models = []
+    for path in paths:
+        if os.path.isdir(path):
+            models.extend(sorted(glob.glob(os.path.join(path, "*.tflite"))))
+        else:
+            models.extend(sorted(glob.glob(path)))
+    return models
+
+def parse_int_list(text):
+    return [int(x) for x in text.split(",") if x.strip()]
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="TFLite benchmark sweep")
+    parser.add_argument("--models", nargs="+", default=[MODELS_DIR],
+                        help="model files, globs or directories (default: %(default)s)")
+    parser.add_argument("--threads", type=parse_int_list, default=[1, 2, 4],
+                        help="comma separated num_threads values (default: 1,2,4)")
+    parser.add_argument("--delegates", default=",".join(DELEGATES),
+                        help="comma separated: xnnpack, none or path to delegate .so")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--frame-budget-ms", type=float, default=None,
+                        help="mark configs whose p99 fits this per-frame budget")
+    parser.add_argument("--no-isolate", action="store_true",
+                        help="run all configs in this process (peak RSS becomes cumulative)")
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    models = find_models(args.models)
+    if not models:
+        log(f"❌ No .tflite models found in {args.models}")
+        return 1
+
+    delegates = [d.strip() for d in args.delegates.split(",") if d.strip()]
+    results = []
+    skipped = []
+
+    for model in models:
+        for delegate in delegates:
+            if not delegate_available(delegate):
+                skipped.append({"model": os.path.basename(model), "delegate": delegate,
+                                "reason": "delegate not available"})
+                continue
+            for threads in args.threads:
+                log(f"⏱️  {os.path.basename(model)} | threads={threads} | delegate={delegate}")
+                config = (model, threads, delegate, args.warmup, args.iterations)
+                try:
+                    result = run_config(*config) if args.no_isolate else run_isolated(config)
+                except Exception as e:
+                    skipped.append({"model": os.path.basename(model), "delegate": delegate,
+                                    "num_threads": threads, "reason": str(e)})
+                    log(f"    ❌ {e}")
+                    continue
+                if args.frame_budget_ms is not None:
+                    result["meets_frame_budget"] = \
+                        result["latency_ms"]["p99"] <= args.frame_budget_ms
+                log(f"    p50 {result['latency_ms']['p50']:.2f}ms | "
+                    f"p99 {result['latency_ms']['p99']:.2f}ms | "
+                    f"{result['throughput_ips']:.1f} inf/s")
+                results.append(result)
+
+    report = {
+        "host": {
+            "machine": platform.machine(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+        },
+        "frame_budget_ms": args.frame_budget_ms,
+        "results": results,
+        "skipped": skipped,
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+        log(f"✅ Wrote {len(results)} results to {args.output}")
+    else:
+        print(text)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())